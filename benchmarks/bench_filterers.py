@@ -0,0 +1,100 @@
+"""Benchmarks the built-in glob filterers against the original
+fnmatch-based implementation.
+
+Usage: python bench_filterers.py [-n <number of paths>] [-p <number of patterns>]
+
+"""
+
+import sys
+import os
+import time
+import fnmatch
+import random
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fileprocessor.filterers import ExcludeListFilterer, IncludeListFilterer
+
+
+def generatePaths(numPaths, seed=0):
+	"""Return list of random absolute paths that look like a source tree."""
+	rand = random.Random(seed)
+	directories = [ "src", "lib", "node_modules", "build", ".git", "docs", "tests", "vendor" ]
+	extensions = [ "py", "c", "h", "js", "txt", "o", "png", "json" ]
+	paths = []
+	for i in range(numPaths):
+		depth = rand.randint(1, 6)
+		parts = [ rand.choice(directories) for _ in range(depth) ]
+		parts.append( "file{}.{}".format(i, rand.choice(extensions)) )
+		paths.append( "/data/" + "/".join(parts) )
+	return paths
+
+def generatePatterns(numPatterns, seed=0):
+	"""Return list of glob patterns, only a few of which match often."""
+	rand = random.Random(seed)
+	patterns = [ "*/node_modules/*", "*/.git/*", "*.o" ]
+	while len(patterns) < numPatterns:
+		patterns.append( "*/generated{}/*.{}".format(len(patterns),
+			rand.choice(["py", "c", "js"])) )
+	return patterns[:numPatterns]
+
+def originalExclude(excludeList, fileListing):
+	"""Original ExcludeListFilterer.filter(), kept for comparison."""
+	newListing = list(fileListing)
+	i = 0
+	while i < len(newListing):
+		filtered = False
+		for exclusion in excludeList:
+			if fnmatch.fnmatch(newListing[i], exclusion):
+				filtered = True
+				del newListing[i]
+				break
+		if not filtered:
+			i += 1
+	return newListing
+
+def originalInclude(includeList, fileListing):
+	"""Original IncludeListFilterer.filter(), kept for comparison."""
+	newListing = []
+	for elem in fileListing:
+		for pattern in includeList:
+			if fnmatch.fnmatch(elem, pattern):
+				newListing.append(elem)
+				break
+	return newListing
+
+def timeCall(function, *args):
+	"""Return (seconds taken, return value) of calling function with args."""
+	start = time.perf_counter()
+	result = function(*args)
+	return time.perf_counter() - start, result
+
+def main(numPaths, numPatterns):
+	"""Run the benchmarks and print the results."""
+	paths = generatePaths(numPaths)
+	patterns = generatePatterns(numPatterns)
+	print("{} paths, {} patterns".format(numPaths, numPatterns))
+
+	for name, original, filtererClass in (
+			("ExcludeListFilterer", originalExclude, ExcludeListFilterer),
+			("IncludeListFilterer", originalInclude, IncludeListFilterer)):
+		originalTime, expected = timeCall(original, patterns, paths)
+		constructionTime, filterer = timeCall(filtererClass, patterns)
+		compiledTime, result = timeCall(filterer.filter, paths)
+		if result != expected:
+			sys.exit("{} gave different results to the original implementation".format(name))
+		print("{}: original {:.3f}s, compiled {:.3f}s (+{:.3f}s to compile), {:.1f}x faster".format(
+			name, originalTime, compiledTime, constructionTime,
+			originalTime / (compiledTime + constructionTime)))
+
+if __name__ == "__main__":
+	# Parse command line arguments
+	numPaths = 100000
+	numPatterns = 200
+	arguments = sys.argv[1:]
+	for i in range(0, len(arguments) - 1):
+		if arguments[i] == "-n":
+			numPaths = int(arguments[i + 1])
+		elif arguments[i] == "-p":
+			numPatterns = int(arguments[i + 1])
+
+	main(numPaths, numPatterns)
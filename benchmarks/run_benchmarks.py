@@ -0,0 +1,302 @@
+"""Benchmarks each stage of the processing pipeline on a synthetic tree.
+
+Searching, filtering and extraction are timed separately, followed
+by whole runs of FileProcessor. Each benchmark is run several times
+and the fastest and median runs are reported, along with the number
+of files and megabytes processed per second. Results can be written
+to a JSON file, and compared against an earlier results file so
+regressions are flagged. Comparisons use the median run, need at
+least MIN_COMPARE_REPEATS repeats on both sides, and skip benchmarks
+whose median run took less than MIN_COMPARE_SECONDS, since timings
+that short are mostly noise. If any benchmark is slower than the
+baseline by more than the threshold, the script exits with status 1.
+
+Usage: python run_benchmarks.py [-t <tree directory>] [-o <results file>]
+	[-b <baseline results file>] [--threshold <fraction>] [-r <repeats>]
+	[-d <depth>] [-f <fan-out>] [-n <files per directory>]
+	[-s <size distribution>] [-m <mean size>]
+
+If no tree directory is given, a tree is generated in a temporary
+directory and deleted afterwards. Otherwise, the tree is generated
+in the given directory if it doesn't exist, and reused if it does.
+
+"""
+
+import sys
+import os
+import json
+import time
+import zlib
+import statistics
+import shutil
+import platform
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fileprocessor import FileProcessor
+from fileprocessor.fileinfo import FileInfo
+from fileprocessor.searchers import FileSearcher, IndexedSearcher
+from fileprocessor.filterers import (FilterChain, ExcludeListFilterer, ExtensionFilterer,
+	SizeFilterer)
+from fileprocessor.extractors import (ByteExtractor, MmapByteExtractor, ByteStreamExtractor,
+	TextExtractor, TextStreamExtractor)
+from treegen import generateTree, parseArguments, TREE_OPTIONS
+
+
+# Every extractor computes a CRC32 of the file, so each one has to
+# read all of the file's contents for the same, cheap amount of work
+
+class CRCByteExtractor(ByteExtractor):
+
+	def extractFromBytes(self, data):
+		return zlib.crc32(data)
+
+class CRCMmapByteExtractor(MmapByteExtractor):
+
+	def extractFromBuffer(self, buffer):
+		return zlib.crc32(buffer)
+
+class CRCByteStreamExtractor(ByteStreamExtractor):
+
+	def extractFromChunks(self, chunks):
+		crc = 0
+		for chunk in chunks:
+			crc = zlib.crc32(chunk, crc)
+		return crc
+
+class CRCTextExtractor(TextExtractor):
+
+	def extractFromString(self, data):
+		return zlib.crc32( data.encode("ascii") )
+
+class CRCTextStreamExtractor(TextStreamExtractor):
+
+	def extractFromStream(self, stream):
+		crc = 0
+		for line in stream:
+			crc = zlib.crc32(line.encode("ascii"), crc)
+		return crc
+
+
+# Stages whose throughput is also measured in MB/sec
+CONTENT_STAGES = { "extract", "pipeline" }
+# Fewest repeats, on both sides, a comparison against a baseline needs
+MIN_COMPARE_REPEATS = 3
+# Benchmarks whose median run is shorter than this many seconds, on
+# either side, are too noisy to compare against a baseline
+MIN_COMPARE_SECONDS = 0.05
+
+def timeRuns(function, repeats):
+	"""Return (fastest time, median time, return value) of calling function repeatedly.
+
+	Times are in seconds.
+
+	"""
+	times = []
+	for i in range(repeats):
+		start = time.perf_counter()
+		result = function()
+		times.append(time.perf_counter() - start)
+	return min(times), statistics.median(times), result
+
+def extractAll(extractor, paths):
+	for path in paths:
+		extractor.extract(path)
+	return paths
+
+def defineBenchmarks(rootDirectory, indexFilename):
+	"""Return list of (stage, name, function) triples, where function returns the files it processed.
+
+	The file listing each stage works on is produced up front, so
+	each benchmark only times its own stage.
+
+	"""
+	paths = FileSearcher(True).search(rootDirectory)
+	benchmarks = [
+		("search", "FileSearcher", lambda: FileSearcher(True).search(rootDirectory)),
+		("search", "FileSearcher (4 walkers)",
+			lambda: FileSearcher(True, walkers=4).search(rootDirectory))
+	]
+
+	# Build the index outside the timed runs, so only reuse is timed
+	with IndexedSearcher(indexFilename) as searcher:
+		searcher.rebuild(rootDirectory)
+	def searchIndexed():
+		with IndexedSearcher(indexFilename) as searcher:
+			return searcher.search(rootDirectory)
+	benchmarks.append( ("search", "IndexedSearcher (unchanged tree)", searchIndexed) )
+
+	for name, filterer in (
+			("ExcludeListFilterer", ExcludeListFilterer([ "*/dir0/*", "*.o", "*.png" ])),
+			("ExtensionFilterer", ExtensionFilterer([ "py", "c", "h" ]))):
+		benchmarks.append( ("filter", name, lambda filterer=filterer: filterer.filter(paths)) )
+	# Fresh FileInfo objects are used each time, so stat'ing files is timed too
+	sizeChain = FilterChain([ SizeFilterer(minSize=1024, maxSize=1024 * 1024) ])
+	benchmarks.append( ("filter", "SizeFilterer",
+		lambda: [ info.path for info in sizeChain.iterFilterInfo(map(FileInfo, paths)) ]) )
+
+	for extractor in (CRCByteExtractor(), CRCMmapByteExtractor(), CRCByteStreamExtractor(),
+			CRCTextExtractor(), CRCTextStreamExtractor()):
+		name = type(extractor).__bases__[0].__name__
+		benchmarks.append( ("extract", name, lambda extractor=extractor: extractAll(extractor, paths)) )
+
+	for executor in ("serial", "thread", "process"):
+		processor = FileProcessor(FileSearcher(True), [ ExtensionFilterer([ "py", "c", "h", "txt" ]) ],
+			CRCMmapByteExtractor(), executor=executor)
+		benchmarks.append( ("pipeline", "FileProcessor ({})".format(executor),
+			lambda processor=processor: list(processor.process(rootDirectory))) )
+	return benchmarks
+
+def runBenchmarks(rootDirectory, repeats):
+	"""Run all benchmarks on the tree in the given directory and return dictionary of results."""
+	sizes = {}
+	for path in FileSearcher(True).iterSearch(rootDirectory):
+		sizes[path] = os.path.getsize(path)
+	# Warm the page cache, so the first benchmark isn't penalised
+	extractAll(CRCByteExtractor(), list(sizes))
+
+	results = {}
+	indexDirectory = tempfile.mkdtemp()
+	try:
+		benchmarks = defineBenchmarks(rootDirectory, os.path.join(indexDirectory, "index.sqlite"))
+		for stage, name, function in benchmarks:
+			seconds, medianSeconds, processed = timeRuns(function, repeats)
+			result = {
+				"stage" : stage,
+				"seconds" : seconds,
+				"medianSeconds" : medianSeconds,
+				"files" : len(processed),
+				"bytes" : None,
+				"filesPerSecond" : len(processed) / seconds if seconds else None,
+				"medianFilesPerSecond" : len(processed) / medianSeconds if medianSeconds else None,
+				"mbPerSecond" : None
+			}
+			# Searching and filtering don't read the files' contents
+			if stage in CONTENT_STAGES:
+				result["bytes"] = sum( sizes[path] for path in processed )
+				if seconds:
+					result["mbPerSecond"] = result["bytes"] / (1024 * 1024) / seconds
+			results["{}: {}".format(stage, name)] = result
+			print("{:<45} {:>9.4f}s {:>8} files {:>12.0f} files/s {:>13}".format(
+				"{}: {}".format(stage, name), seconds, len(processed), result["filesPerSecond"] or 0,
+				"" if result["mbPerSecond"] is None else "{:.1f} MB/s".format(result["mbPerSecond"])))
+	finally:
+		shutil.rmtree(indexDirectory)
+	return results
+
+def compareResults(results, baseline, threshold):
+	"""Compare median throughput of each benchmark against a baseline.
+
+	Returns (regressions, skipped) pair, where regressions is a list
+	of (name, current files/sec, baseline files/sec) triples for
+	benchmarks which regressed, and skipped is a list of the names of
+	benchmarks which were too short to compare, or which have no
+	median in the baseline.
+
+	Arguments:
+	results -- Dictionary of results returned by runBenchmarks()
+	baseline -- Dictionary of results from an earlier run
+	threshold -- Fraction by which median throughput must drop to
+				 count as a regression (e.g. 0.2 for 20%)
+
+	"""
+	regressions = []
+	skipped = []
+	for name, result in sorted(results.items()):
+		previous = baseline.get(name)
+		if not previous:
+			continue
+		current = result.get("medianFilesPerSecond")
+		expected = previous.get("medianFilesPerSecond")
+		if (not current or not expected
+				or result["medianSeconds"] < MIN_COMPARE_SECONDS
+				or previous["medianSeconds"] < MIN_COMPARE_SECONDS):
+			skipped.append(name)
+			continue
+		if current < expected * (1 - threshold):
+			regressions.append( (name, current, expected) )
+	return regressions, skipped
+
+def main(options):
+	"""Generate the tree, run the benchmarks and report the results."""
+	if options["repeats"] < 1:
+		print("Number of repeats must be at least 1", file=sys.stderr)
+		return 2
+	baseline = None
+	if "baselineFilename" in options:
+		with open(options["baselineFilename"], "r") as f:
+			baseline = json.load(f)
+		if min(options["repeats"], baseline.get("repeats", 0)) < MIN_COMPARE_REPEATS:
+			print("Comparing against a baseline needs at least {} repeats on both sides"
+				" (this run: {}, baseline: {})".format(MIN_COMPARE_REPEATS, options["repeats"],
+				baseline.get("repeats")), file=sys.stderr)
+			return 2
+
+	treeOptions = { name : value for name, value in options.items()
+		if name in dict(TREE_OPTIONS.values()) }
+	rootDirectory = options.get("treeDirectory")
+	temporaryDirectory = None
+	if rootDirectory is None:
+		temporaryDirectory = tempfile.mkdtemp()
+		rootDirectory = os.path.join(temporaryDirectory, "tree")
+	try:
+		if not os.path.isdir(rootDirectory):
+			numFiles, totalBytes = generateTree(rootDirectory, **treeOptions)
+			print("Generated {} files ({:.1f} MB) in '{}'".format(numFiles,
+				totalBytes / (1024 * 1024), rootDirectory))
+		results = runBenchmarks(rootDirectory, options["repeats"])
+	finally:
+		if temporaryDirectory:
+			shutil.rmtree(temporaryDirectory)
+
+	if "outputFilename" in options:
+		report = {
+			"environment" : {
+				"python" : platform.python_version(),
+				"implementation" : platform.python_implementation(),
+				"platform" : platform.platform(),
+				"cpus" : os.cpu_count()
+			},
+			"tree" : treeOptions,
+			"repeats" : options["repeats"],
+			"results" : results
+		}
+		with open(options["outputFilename"], "w") as f:
+			json.dump(report, f, indent=2, sort_keys=True)
+
+	if baseline is not None:
+		if baseline.get("tree") != treeOptions:
+			print("Warning: baseline was run on a different tree ({})".format(baseline.get("tree")),
+				file=sys.stderr)
+		regressions, skipped = compareResults(results, baseline["results"], options["threshold"])
+		for name in skipped:
+			print("Not compared {}: median run shorter than {}s, or no baseline median".format(
+				name, MIN_COMPARE_SECONDS))
+		for name, current, previous in regressions:
+			print("REGRESSION {}: {:.0f} files/s, baseline {:.0f} files/s ({:.0%} slower)".format(
+				name, current, previous, 1 - current / previous))
+		if regressions:
+			return 1
+		print("No regressions against baseline")
+	return 0
+
+if __name__ == "__main__":
+	options = dict(TREE_OPTIONS)
+	options.update({
+		"-t" : ("treeDirectory", str),
+		"-o" : ("outputFilename", str),
+		"-b" : ("baselineFilename", str),
+		"-r" : ("repeats", int),
+		"--threshold" : ("threshold", float)
+	})
+	# Default to a tree of around 1,700 files, 28 MB in total
+	defaults = {
+		"depth" : 3,
+		"fanout" : 4,
+		"filesPerDirectory" : 20,
+		"sizeDistribution" : "lognormal",
+		"meanSize" : 16384,
+		"repeats" : 5,
+		"threshold" : 0.2
+	}
+	sys.exit( main(parseArguments(sys.argv[1:], options, defaults)) )
@@ -0,0 +1,138 @@
+"""Generates synthetic directory trees for benchmarking.
+
+Usage: python treegen.py -o <directory> [-d <depth>] [-f <fan-out>]
+	[-n <files per directory>] [-s <size distribution>] [-m <mean size>]
+
+"""
+
+import sys
+import os
+import math
+import random
+import string
+
+
+# Extensions given to generated files, roughly in proportion to how
+# often they appear in a source tree
+EXTENSIONS = [ "py", "py", "py", "c", "h", "js", "txt", "json", "o", "png" ]
+# Characters file contents are made up of
+CHARACTERS = string.ascii_letters + string.digits + "      \n"
+
+def fixedSizes(rand, meanSize):
+	"""Every file is exactly the mean size."""
+	while True:
+		yield meanSize
+
+def uniformSizes(rand, meanSize):
+	"""File sizes are spread evenly between zero and twice the mean size."""
+	while True:
+		yield rand.randint(0, 2 * meanSize)
+
+def lognormalSizes(rand, meanSize):
+	"""Mostly small files with a long tail of large ones, like real trees."""
+	# For a lognormal distribution, mean = exp(mu + sigma^2 / 2)
+	sigma = 1.5
+	mu = max(0.0, math.log(max(meanSize, 1)) - sigma * sigma / 2)
+	while True:
+		yield int( rand.lognormvariate(mu, sigma) )
+
+# Maps the names of the size distributions to the functions which
+# generate them
+SIZE_DISTRIBUTIONS = {
+	"fixed" : fixedSizes,
+	"uniform" : uniformSizes,
+	"lognormal" : lognormalSizes
+}
+
+def generateTree(rootDirectory, depth = 3, fanout = 4, filesPerDirectory = 20,
+				 sizeDistribution = "lognormal", meanSize = 16384, seed = 0):
+	"""Create a tree of directories and files with random contents.
+
+	Every directory above the given depth has 'fanout'
+	sub-directories, and every directory contains the same number of
+	files. The same arguments always generate the same tree.
+
+	Return (number of files, total size of files in bytes) tuple.
+
+	Arguments:
+	rootDirectory -- Directory to create the tree in. Created if it
+					 doesn't exist.
+
+	Keyword arguments:
+	depth -- Number of levels of sub-directories below the root. (default: 3)
+	fanout -- Number of sub-directories in each directory. (default: 4)
+	filesPerDirectory -- Number of files in each directory. (default: 20)
+	sizeDistribution -- Name of the distribution file sizes are taken
+						from. One of SIZE_DISTRIBUTIONS. (default: "lognormal")
+	meanSize -- Mean size of the files in bytes. (default: 16384)
+	seed -- Seed for the random number generator. (default: 0)
+
+	"""
+	if sizeDistribution not in SIZE_DISTRIBUTIONS:
+		raise ValueError("Unknown size distribution '{}'. Should be one of: {}".format(
+			sizeDistribution, ", ".join(sorted(SIZE_DISTRIBUTIONS))))
+	rand = random.Random(seed)
+	sizes = SIZE_DISTRIBUTIONS[sizeDistribution](rand, meanSize)
+	# Contents are sliced from one block of random ASCII text, so
+	# text extractors can read them too. Generating new contents for
+	# every file would dominate the time taken.
+	block = "".join( rand.choice(CHARACTERS) for _ in range(65536) ).encode("ascii")
+
+	numFiles = 0
+	totalBytes = 0
+	directories = [ (rootDirectory, 0) ]
+	while directories:
+		directory, level = directories.pop()
+		os.makedirs(directory, exist_ok=True)
+		for i in range(filesPerDirectory):
+			size = next(sizes)
+			path = os.path.join(directory, "file{}.{}".format(i, rand.choice(EXTENSIONS)))
+			with open(path, "wb") as f:
+				offset = rand.randrange(len(block))
+				remaining = size
+				while remaining > 0:
+					chunk = block[offset:offset + remaining]
+					f.write(chunk)
+					remaining -= len(chunk)
+					offset = 0
+			numFiles += 1
+			totalBytes += size
+		if level < depth:
+			for i in range(fanout):
+				directories.append( (os.path.join(directory, "dir{}".format(i)), level + 1) )
+	return numFiles, totalBytes
+
+def parseArguments(arguments, options, values):
+	"""Parse command line arguments of the form '-x <value>' into a dictionary.
+
+	Arguments:
+	arguments -- List of command line arguments
+	options -- Dictionary mapping flags to (name, type) pairs
+	values -- Dictionary of default values, which is updated
+
+	"""
+	for i in range(0, len(arguments) - 1):
+		if arguments[i] in options:
+			name, valueType = options[arguments[i]]
+			values[name] = valueType(arguments[i + 1])
+	return values
+
+# Command line flags which control the shape of the generated tree
+TREE_OPTIONS = {
+	"-d" : ("depth", int),
+	"-f" : ("fanout", int),
+	"-n" : ("filesPerDirectory", int),
+	"-s" : ("sizeDistribution", str),
+	"-m" : ("meanSize", int),
+	"--seed" : ("seed", int)
+}
+
+if __name__ == "__main__":
+	options = dict(TREE_OPTIONS)
+	options["-o"] = ("rootDirectory", str)
+	arguments = parseArguments(sys.argv[1:], options, {})
+	if "rootDirectory" not in arguments:
+		sys.exit(__doc__.strip())
+	numFiles, totalBytes = generateTree(**arguments)
+	print("Generated {} files ({:.1f} MB) in '{}'".format(numFiles,
+		totalBytes / (1024 * 1024), arguments["rootDirectory"]))
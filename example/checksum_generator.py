@@ -1,5 +1,6 @@
 """Generates checksums for every file within a directory (recursively),
-displaying those checksums through stdout.
+displaying those checksums through stdout or writing them to a JSON
+Lines file as they are generated.
 
 Created to provide an example of how to use the fileprocessor module.
 
@@ -7,39 +8,39 @@ Created to provide an example of how to use the fileprocessor module.
 
 import sys
 import hashlib
-from fileprocessor import FileProcessor, searchers, filterers, extractors
+from fileprocessor import FileProcessor, searchers, filterers, extractors, sinks
 
 class ChecksumGenerator(extractors.ByteStreamExtractor):
 
 	"""Generates """
 
-	def __init__(self, blockSize = 65536):
+	def __init__(self, blockSize = None):
 		"""Construct instance of ChecksumGenerator.
 
 		Keyword arguments:
 		blockSize -- Amount of data to read it at once when
 					 generating checksum. Should be fairly
 					 low if the machine does not have much
-					 memory. (default: 65536)
+					 memory. If None, a size suited to the
+					 filesystem is chosen. (default: None)
 
 		"""
 		self.blockSize = blockSize
 
-	def extractFromStream(self, data):
-		"""Generate and reutrn SHA-1 checksum from stream of byte data.
+	def extractFromChunks(self, chunks):
+		"""Generate and reutrn SHA-1 checksum from chunks of byte data.
 
 		Arguments:
-		data -- Byte stream containing data to generate checksum for
+		chunks -- Iterator of chunks of byte data to generate
+				  checksum for
 
 		"""
 		hasher = hashlib.sha1()
-		buff = data.read(self.blockSize)
-		while len(buff) > 0:
-			hasher.update(buff)
-			buff = data.read(self.blockSize)
+		for chunk in chunks:
+			hasher.update(chunk)
 		return hasher.hexdigest()
 
-def main(directoriesToSearch):
+def main(directoriesToSearch, outputFilename = None):
 	"""Run checksum generation process.
 
 	Arguments:
@@ -47,11 +48,24 @@ def main(directoriesToSearch):
 						   directories containing files
 						   to generate checksums for
 
+	Keyword arguments:
+	outputFilename -- Name of JSON Lines file to stream the
+					  checksums into. If None, every checksum is
+					  displayed once they have all been generated.
+					  (default: None)
+
 	"""
 	# Build components to use for file processor
 	searcher = searchers.FileSearcher(True)
 	extractor = ChecksumGenerator()
 	processor = FileProcessor(searcher, [], extractor)
+	# Write checksums to the output file as they're generated, so
+	# they don't all have to be kept in memory
+	if outputFilename:
+		with sinks.JSONLinesSink(outputFilename) as sink:
+			numWritten = processor.processInto(directoriesToSearch, sink)
+		print("Wrote {} checksums to '{}'".format(numWritten, outputFilename))
+		return
 	# Perofrm checksum generation and display every checksum
 	generatedChecksums = processor.process(directoriesToSearch)
 	for filename, checksum in generatedChecksums.items():
@@ -60,14 +74,17 @@ def main(directoriesToSearch):
 if __name__ == "__main__":
 	# Parse command line arguments
 	if len(sys.argv) < 3:
-		sys.exit("Usage: python {} {{-d <directory> }}".format(sys.argv[0]))
+		sys.exit("Usage: python {} {{-d <directory> }} [-o <output file>]".format(sys.argv[0]))
 	directoriesToSearch = [] # store all directories requesed 
+	outputFilename = None
 	for i in range(1, len(sys.argv)):
 		if sys.argv[i] == "-d" and i < (len(sys.argv) - 1):
 			i += 1 # go to next argumnet, the actual directory
 			directoriesToSearch.append( sys.argv[i] )
+		elif sys.argv[i] == "-o" and i < (len(sys.argv) - 1):
+			outputFilename = sys.argv[i + 1]
 
 	if len(directoriesToSearch) == 0:
 		sys.exit("No directories to search specified")
 
-	main(directoriesToSearch)
\ No newline at end of file
+	main(directoriesToSearch, outputFilename)
\ No newline at end of file
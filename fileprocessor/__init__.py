@@ -3,7 +3,17 @@ processing files."""
 
 import sys
 import os
-import collections
+import asyncio
+import functools
+import time
+import collections.abc
+
+from fileprocessor.executors import (SerialExecutor, ProcessExecutor, ThreadExecutor, BoundedExecutor,
+	ExtractionError, extractsInBatches)
+from fileprocessor.filterers import FilterChain
+from fileprocessor.fileinfo import FileInfo
+from fileprocessor.watchers import createWatcher
+from fileprocessor.instrumentation import RunStatistics, timedIterator
 
 
 # Constant which specifies which version of fileprocessor this is
@@ -34,11 +44,61 @@ def getSubModulesAndPackages():
 __all__ = getSubModulesAndPackages()
 
 
+def _toDirectoryList(rootDirectories):
+	"""Return given root directories as a list.
+
+	Raises a TypeError if rootDirectories is not a string or a
+	collection of strings.
+
+	Arguments:
+	rootDirectories -- Either a string containing the path to one
+					  directory or a collection containing multiple
+					  directories
+
+	"""
+	if isinstance(rootDirectories, str): # wrap single directory in a list
+		return [ rootDirectories ]
+	elif not isinstance(rootDirectories, collections.abc.Iterable):
+		raise TypeError("Path to root directory must be a string or collection of strings")
+	return list(rootDirectories)
+
+def _iterSearch(searcher, rootDirectory):
+	"""Return iterator over files found by searcher, searching lazily if supported."""
+	iterSearch = getattr(searcher, "iterSearch", None)
+	if iterSearch:
+		return iterSearch(rootDirectory)
+	return iter(searcher.search(rootDirectory))
+
+def _iterSearchInfo(searcher, rootDirectory):
+	"""Return iterator over FileInfo objects for files found by searcher."""
+	iterSearchInfo = getattr(searcher, "iterSearchInfo", None)
+	if iterSearchInfo:
+		return iterSearchInfo(rootDirectory)
+	return map(FileInfo, _iterSearch(searcher, rootDirectory))
+
+
+
 class FileProcessor:
 
 	"""Harness for searching, filtering and extracting data from files."""
 
-	def __init__(self, searcher, filterers, extractor):
+	# Maps the names of the executors which can be given to the
+	# constructor to the classes implementing them
+	EXECUTORS = {
+		"serial" : SerialExecutor,
+		"process" : ProcessExecutor,
+		"thread" : ThreadExecutor
+	}
+
+	# Batch limits used for extractors which override extractBatch(),
+	# if no batch size is given
+	DEFAULT_EXTRACT_BATCH_SIZE = 64
+	DEFAULT_MAX_BATCH_BYTES = 16 * 1024 * 1024
+
+	def __init__(self, searcher, filterers, extractor, executor = "serial",
+				 workers = None, batchSize = None, cache = None,
+				 deduplicator = None, instrumentation = None, profiler = None,
+				 maxInFlightBytes = None, maxQueuedResults = None, maxBatchBytes = None):
 		"""Construct new instance of FileProcessor.
 
 		Arguments:
@@ -51,10 +111,304 @@ class FileProcessor:
 		extractor -- Object which processes a single file and returns the
 					 desired data from it. Should be an instance of
 					 Extractor.
+
+		Keyword arguments:
+		executor -- Name of the strategy used to run the extractor.
+					"serial" extracts one file at a time in the calling
+					thread. "process" extracts files in parallel using
+					a pool of worker processes, in which case the
+					extractor must be picklable. "thread" extracts
+					files in parallel using a pool of threads, which
+					suits extractors bound by file I/O or that release
+					the GIL. Extractors whose 'threadSafe' attribute
+					is not True are only run on one file at a time.
+					(default: "serial")
+		workers -- Number of workers to use for parallel executors.
+				   If None, the number of CPUs is used. (default: None)
+		batchSize -- Number of files handed to a worker at once by
+					 parallel executors. Extractors which override
+					 Extractor.extractBatch() are given files in
+					 batches of this size by every executor. If None,
+					 the executor's default is used, or
+					 DEFAULT_EXTRACT_BATCH_SIZE for extractors which
+					 override extractBatch(). (default: None)
+		cache -- ExtractionCache (see fileprocessor.caches) used to
+				 store extracted data between runs. Files whose
+				 data is already cached, and which have not changed
+				 since, are not given to the extractor. If None,
+				 nothing is cached. (default: None)
+		deduplicator -- Deduplicator (see fileprocessor.deduplicators)
+						used to find files which are hard links to, or
+						copies of, files found earlier in the run. Data
+						is only extracted from the first of these files,
+						then given to the rest. It is reset at the start
+						of each run. If None, every file is extracted.
+						(default: None)
+		instrumentation -- Instrumentation (see
+						   fileprocessor.instrumentation) which collects
+						   statistics on each run and has its hooks
+						   called as files are processed. If None, runs
+						   are not instrumented, which costs nothing.
+						   (default: None)
+		profiler -- Profiler (see fileprocessor.profiling) which
+					measures the time and memory taken to extract
+					data from each file. Profiled runs always extract
+					one file at a time in the calling thread, whatever
+					executor is given. If None, nothing is profiled.
+					(default: None)
+		maxInFlightBytes -- Maximum total size in bytes of the files
+							being extracted at once, including files
+							whose data has been extracted but not yet
+							yielded. Files are admitted using their
+							sizes until this budget is reached. A file
+							larger than the whole budget is only
+							extracted once nothing else is in flight.
+							If None, the size of files is not limited.
+							(default: None)
+		maxQueuedResults -- Maximum number of files being extracted at
+							once, including files whose data is waiting
+							to be yielded. If None, only the executor's
+							own limit applies. (default: None)
+		maxBatchBytes -- Maximum total size in bytes of the files in
+						 a batch. A batch is handed over once it
+						 reaches this size, even if it has fewer than
+						 batchSize files. If None, batches are not
+						 limited by size, except for extractors which
+						 override extractBatch(), which use
+						 DEFAULT_MAX_BATCH_BYTES. (default: None)
+
 		"""
+		if executor not in self.EXECUTORS:
+			raise ValueError("Unknown executor '{}'. Should be one of: {}".format(
+				executor, ", ".join(sorted(self.EXECUTORS))))
 		self.searcher = searcher
 		self.filterers = filterers
 		self.extractor = extractor
+		self.executor = executor
+		self.workers = workers
+		self.batchSize = batchSize
+		self.cache = cache
+		self.deduplicator = deduplicator
+		self.instrumentation = instrumentation
+		self.profiler = profiler
+		self.maxInFlightBytes = maxInFlightBytes
+		self.maxQueuedResults = maxQueuedResults
+		self.maxBatchBytes = maxBatchBytes
+		# RunStatistics of the most recent run, if it was instrumented
+		self.statistics = None
+		# FilterChain used to combine the filterers in the most recent
+		# run, which records how each filterer performed
+		self.filterChain = None
+
+	def _createExecutor(self):
+		"""Return new executor which runs the extractor as configured."""
+		batchSize = self.batchSize
+		maxBatchBytes = self.maxBatchBytes
+		if extractsInBatches(self.extractor):
+			if batchSize is None:
+				batchSize = self.DEFAULT_EXTRACT_BATCH_SIZE
+			if maxBatchBytes is None:
+				maxBatchBytes = self.DEFAULT_MAX_BATCH_BYTES
+		elif self.executor == "serial":
+			# Batching files only helps extractors which use batches
+			# or parallel executors
+			batchSize = None
+			maxBatchBytes = None
+
+		if self.profiler is not None:
+			executor = SerialExecutor( self.profiler.wrap(self.extractor) )
+		else:
+			executorClass = self.EXECUTORS[self.executor]
+			if executorClass is SerialExecutor:
+				executor = executorClass(self.extractor, batchSize, maxBatchBytes)
+			else:
+				executor = executorClass(self.extractor, self.workers, batchSize, maxBatchBytes)
+		if self.maxInFlightBytes is not None or self.maxQueuedResults is not None:
+			executor = BoundedExecutor(executor, self.maxInFlightBytes, self.maxQueuedResults)
+		return executor
+
+	def iterprocess(self, rootDirectories):
+		"""Process one or more directories of files, yielding results as they finish.
+
+		Return an iterator over (path, data) pairs, where path is the
+		absolute path to a file and data is the data extracted from
+		it. Searching, filtering and extraction are chained lazily
+		where the components support it (see Searcher.iterSearch()
+		and Filterer.iterFilter()), so files are extracted while the
+		search is still running and memory use does not grow with
+		the number of files processed.
+
+		When using a parallel executor, an exception raised by the
+		extractor is re-raised as an ExtractionError, which contains
+		the path of the file the extractor failed on.
+
+		Arguments:
+		rootDirectories -- Either a string containing the path to one
+						  directory or a list containing multiple
+						  directories to process
+
+		"""
+		rootDirectories = _toDirectoryList(rootDirectories)
+		return self._iterprocess(rootDirectories)
+
+	def _iterprocess(self, rootDirectories):
+		self.filterChain = FilterChain(self.filterers)
+		if self.deduplicator is not None:
+			self.deduplicator.reset()
+		if self.profiler is not None:
+			self.profiler.start()
+		try:
+			with self._createExecutor() as executor:
+				if self.instrumentation is None:
+					self.statistics = None
+					yield from self._extractAll( executor, self._iterListing(rootDirectories) )
+				else:
+					yield from self._iterInstrumented(executor, rootDirectories)
+		finally:
+			if self.profiler is not None:
+				self.profiler.stop()
+			if self.cache is not None:
+				self.cache.flush()
+
+	def _iterInstrumented(self, executor, rootDirectories):
+		"""Yield (path, data) pairs for every file, recording statistics and calling hooks as it goes.
+
+		Each stage is wrapped in an iterator which times how long it
+		takes to produce each file. Stages pull files from the stages
+		before them, so the time of earlier stages is subtracted from
+		each stage's time once the run is over.
+
+		"""
+		instrumentation = self.instrumentation
+		statistics = RunStatistics()
+		self.statistics = statistics
+		start = time.perf_counter()
+		hitsBefore = self.cache.hits if self.cache is not None else 0
+		# Time spent producing filtered files, including searching,
+		# which is set once the listing is finished
+		listingSeconds = None
+
+		def iterSearched():
+			for directory in rootDirectories:
+				if not os.path.isdir(directory):
+					print("Directory '{}' does not exist".format(directory), file=sys.stderr)
+					statistics.search.errors += 1
+					continue
+				found = timedIterator(_iterSearchInfo(self.searcher, directory),
+					statistics.search, statistics)
+				yield from self.filterChain.iterFilterInfo(found)
+
+		def finishListing():
+			nonlocal listingSeconds
+			if listingSeconds is not None:
+				return
+			listingSeconds = statistics.filter.seconds
+			statistics.filter.seconds -= statistics.search.seconds
+			statistics.filter.filesIn = statistics.search.filesOut
+			statistics.filterers = self.filterChain.statistics
+
+		def iterStarted(fileListing):
+			for info in fileListing:
+				stat = info.tryStat()
+				if stat is not None:
+					statistics.extract.bytes += stat.st_size
+				instrumentation.onFileStart(info.path)
+				yield info
+			finishListing()
+			instrumentation.onStageDone(statistics.search)
+			instrumentation.onStageDone(statistics.filter)
+
+		filtered = timedIterator(iterSearched(), statistics.filter, statistics)
+		results = timedIterator(self._extractAll( executor, iterStarted(filtered) ),
+			statistics.extract, statistics)
+		try:
+			for path, data in results:
+				instrumentation.onFileDone(path, data)
+				yield path, data
+		finally:
+			finishListing()
+			statistics.extract.seconds -= listingSeconds
+			statistics.extract.filesIn = statistics.filter.filesOut
+			statistics.seconds = time.perf_counter() - start
+			if self.cache is not None:
+				statistics.cacheHits = self.cache.hits - hitsBefore
+			if self.deduplicator is not None:
+				statistics.duplicates = self.deduplicator.skipped
+			instrumentation.onStageDone(statistics.extract)
+			instrumentation.onRunDone(statistics)
+
+	def _extractAll(self, executor, fileListing):
+		"""Extract data from every file in listing, yielding (path, data) pairs.
+
+		Duplicate files are given their original's data and cached
+		data is yielded straight away. Other files are given to the
+		executor, and the data it extracts is cached.
+
+		"""
+		cache = self.cache
+		deduplicator = self.deduplicator
+		needsSizes = executor.needsSizes()
+		# Cache keys of files being extracted, taken before extraction
+		# starts so data is never cached against newer file contents
+		pendingKeys = {}
+		for info in fileListing:
+			path = info.path
+			# Reuse any metadata fetched while searching or filtering
+			if deduplicator is not None or cache is not None or needsSizes:
+				stat = info.tryStat()
+			if deduplicator is not None:
+				original = deduplicator.duplicateOf(path, stat)
+				if original is not None:
+					# If the original's data isn't ready yet, this is
+					# yielded along with the original's
+					found, data = deduplicator.dataFor(original)
+					if found:
+						yield path, data
+					continue
+			if cache is not None:
+				key = cache.key(path, self.extractor, stat)
+				found, data = cache.lookup(key)
+				if found:
+					yield from self._resolved(path, data)
+					continue
+				pendingKeys[path] = key
+			size = 0
+			if needsSizes and stat is not None:
+				# Files which can't be stat'd can't be read either, so
+				# the extractor will fail without using any memory
+				size = stat.st_size
+			while executor.full(size):
+				yield from self._collect(executor.results(wait=True), pendingKeys)
+			executor.submit(path, size)
+			yield from self._collect(executor.results(), pendingKeys)
+		while executor.pending():
+			yield from self._collect(executor.results(wait=True), pendingKeys)
+
+	def _collect(self, results, pendingKeys):
+		"""Yield (path, data) pairs from executor, caching the data if needed."""
+		for path, data in results:
+			if self.cache is not None:
+				self.cache.store(pendingKeys.pop(path, None), data)
+			yield from self._resolved(path, data)
+
+	def _resolved(self, path, data):
+		"""Yield (path, data) pair for a file, followed by any duplicates of it."""
+		yield path, data
+		if self.deduplicator is not None:
+			for duplicate in self.deduplicator.resolve(path, data):
+				yield duplicate, data
+
+	def _iterListing(self, rootDirectories):
+		"""Return iterator over FileInfo objects for the filtered files in all of the given directories."""
+		for directory in rootDirectories:
+			# If directory doesn't exist, report the issue and skip to the next one
+			if not os.path.isdir(directory):
+				print("Directory '{}' does not exist".format(directory), file=sys.stderr)
+				continue
+			# Search for the files in the directory and filter them,
+			# testing each file against all the filterers in one pass
+			fileListing = _iterSearchInfo(self.searcher, directory)
+			yield from self.filterChain.iterFilterInfo(fileListing)
 
 	def process(self, rootDirectories):
 		"""Process one or more directories of files in some way.
@@ -67,30 +421,285 @@ class FileProcessor:
 		it extracts from the files is determined by the objects
 		given to the FileProcessor instance in the constructor.
 
+		When using a parallel executor, an exception raised by the
+		extractor is re-raised as an ExtractionError, which contains
+		the path of the file the extractor failed on.
+
 		Arguments:
 		rootDirectories -- Either a string containing the path to one
 						  directory or a list containing multiple
 						  directories to process
 
 		"""
-		if isinstance(rootDirectories, str): # wrap single directory in a list
-			rootDirectories = [ rootDirectories ]
-		elif not isinstance(rootDirectories, collections.Iterable):
-			raise TypeError("Path to root directory must be a string or collection of strings")
+		return dict( self.iterprocess(rootDirectories) )
 
-		# Now process each directory, keepinga global dictionary of extracted data
-		data = {}
+	def processInto(self, rootDirectories, sink):
+		"""Process one or more directories of files, writing results to a sink as they finish.
+
+		Unlike process(), results are not kept in memory, so this
+		can be used for any number of files. The sink is flushed once
+		processing has finished, but not closed.
+
+		Return the number of results written to the sink.
+
+		Arguments:
+		rootDirectories -- Either a string containing the path to one
+						  directory or a list containing multiple
+						  directories to process
+		sink -- ResultSink (see fileprocessor.sinks) to write the
+				(path, data) pair of each file to
+
+		"""
+		numWritten = 0
+		try:
+			for path, data in self.iterprocess(rootDirectories):
+				sink.write(path, data)
+				numWritten += 1
+		finally:
+			# Keep whatever was extracted before any error
+			sink.flush()
+		return numWritten
+
+	def watch(self, rootDirectories, callback, debounce = 0.5, pollInterval = 1.0,
+			  stopEvent = None, initialPass = True, polling = False):
+		"""Process one or more directories, then keep processing files as they're created or modified.
+
+		After processing every file in the directories once, the
+		directories are watched (using inotify on Linux, or by
+		polling them otherwise) and only files which are created or
+		modified are filtered and extracted. A file is not extracted
+		until it has gone 'debounce' seconds without changing, so a
+		file that is rewritten many times in quick succession is only
+		extracted once. Sub-directories are watched if the searcher's
+		'recurse' attribute is True (or it doesn't have one), and
+		directories pruned by the filterers are not watched.
+
+		Data is passed to callback as each file is processed. This
+		blocks until stopEvent is set, so it's usually run in its own
+		thread. Exceptions raised by the extractor or callback stop
+		watching and are propagated.
+
+		Arguments:
+		rootDirectories -- Either a string containing the path to one
+						  directory or a list containing multiple
+						  directories to watch
+		callback -- Function called with the path to a file and the
+					data extracted from it each time a file is processed
+
+		Keyword arguments:
+		debounce -- Number of seconds a file must go unchanged before
+					it is extracted. (default: 0.5)
+		pollInterval -- Number of seconds between each scan when
+						polling, and the longest time taken to notice
+						stopEvent being set. (default: 1.0)
+		stopEvent -- threading.Event which stops watching when set. If
+					 None, watching continues until interrupted.
+					 (default: None)
+		initialPass -- If set to True, every file already in the
+					   directories is processed before watching starts.
+					   (default: True)
+		polling -- If set to True, directories are polled even if
+				   inotify is available. (default: False)
+
+		"""
+		rootDirectories = _toDirectoryList(rootDirectories)
 		for directory in rootDirectories:
-			# If directory doesn't exist, report the issue and skip to the next one
 			if not os.path.isdir(directory):
 				print("Directory '{}' does not exist".format(directory), file=sys.stderr)
+		self.filterChain = FilterChain(self.filterers)
+		recurse = getattr(self.searcher, "recurse", True)
+		# Start watching before the initial pass, so files which
+		# arrive during it are not missed
+		watcher = createWatcher( [ directory for directory in rootDirectories if os.path.isdir(directory) ],
+			recurse, pollInterval, self.filterChain, polling )
+		if self.profiler is not None:
+			self.profiler.start()
+		try:
+			with self._createExecutor() as executor:
+				if initialPass:
+					if self.deduplicator is not None:
+						self.deduplicator.reset()
+					for path, data in self._extractAll( executor, self._iterListing(rootDirectories) ):
+						callback(path, data)
+					if self.cache is not None:
+						self.cache.flush()
+				self._watch(executor, watcher, callback, debounce, pollInterval, stopEvent)
+		finally:
+			watcher.close()
+			if self.profiler is not None:
+				self.profiler.stop()
+			if self.cache is not None:
+				self.cache.flush()
+
+	def _watch(self, executor, watcher, callback, debounce, pollInterval, stopEvent):
+		"""Extract data from files reported by watcher once they stop changing, until stopEvent is set."""
+		# Maps paths of changed files to the time they last changed
+		pending = {}
+		while stopEvent is None or not stopEvent.is_set():
+			timeout = pollInterval
+			if pending:
+				nextReady = min( pending.values() ) + debounce - time.monotonic()
+				timeout = max(0, min(timeout, nextReady))
+			for path in watcher.poll(timeout):
+				pending[path] = time.monotonic()
+
+			now = time.monotonic()
+			ready = [ path for path, changed in pending.items() if now - changed >= debounce ]
+			if not ready:
 				continue
-			# Search for the files in the directory, filter the resultant list
-			# and then extract data from the files
-			fileListing = self.searcher.search(directory)
-			for filterer in self.filterers:
-				fileListing = filterer.filter(fileListing)
-			for path in fileListing:
-				data[path] = self.extractor.extract(path)
+			for path in ready:
+				del pending[path]
+			# Files may be deleted or renamed again before they're ready
+			fileListing = [ FileInfo(path) for path in ready if os.path.isfile(path) ]
+			if self.deduplicator is not None:
+				self.deduplicator.reset()
+			for path, data in self._extractAll( executor, self.filterChain.iterFilterInfo(fileListing) ):
+				callback(path, data)
+
+
+class AsyncFileProcessor:
+
+	"""Harness for searching, filtering and extracting data from files using asyncio.
+
+	Works like FileProcessor, but never blocks the event loop it
+	runs on. The components can either be instances of the async
+	abstracts (AsyncSearcher, AsyncFilterer and AsyncExtractor),
+	which are awaited directly, or normal components, which are run
+	in a thread pool. As with FileProcessor's thread executor, normal
+	extractors whose 'threadSafe' attribute is not True are only run
+	on one file at a time.
+
+	"""
+
+	# Default maximum number of files to extract data from at once
+	DEFAULT_CONCURRENCY = 16
+
+	def __init__(self, searcher, filterers, extractor,
+				 concurrency = DEFAULT_CONCURRENCY, threadPool = None):
+		"""Construct new instance of AsyncFileProcessor.
+
+		Arguments:
+		searcher -- Searcher or AsyncSearcher which returns a list of
+					all the files found in a directory.
+		filterers -- List of Filterer or AsyncFilterer objects which
+					 filter the file listing based on some criteria.
+		extractor -- Extractor or AsyncExtractor which processes a
+					 single file and returns the desired data from it.
+
+		Keyword arguments:
+		concurrency -- Maximum number of files to extract data from at
+					   once. (default: DEFAULT_CONCURRENCY)
+		threadPool -- concurrent.futures.Executor used to run normal,
+					  blocking components. If None, the event loop's
+					  default executor is used. (default: None)
+
+		"""
+		if concurrency < 1:
+			raise ValueError("Concurrency must be at least 1")
+		self.searcher = searcher
+		self.filterers = filterers
+		self.extractor = extractor
+		self.concurrency = concurrency
+		self.threadPool = threadPool
+
+	async def _call(self, function, *args):
+		"""Await function if it's a coroutine function, otherwise run it in the thread pool."""
+		if asyncio.iscoroutinefunction(function):
+			return await function(*args)
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(self.threadPool, functools.partial(function, *args))
 
+	async def _extract(self, path, semaphore, lock):
+		"""Extract data from single file, returning (path, data) pair."""
+		try:
+			if lock:
+				async with lock:
+					data = await self._call(self.extractor.extract, path)
+			else:
+				data = await self._call(self.extractor.extract, path)
+		except Exception as e:
+			raise ExtractionError(path, e) from e
+		finally:
+			semaphore.release()
+		return path, data
+
+	async def iterprocess(self, rootDirectories):
+		"""Process one or more directories of files, yielding results as they finish.
+
+		Asynchronously yields (path, data) pairs, where path is the
+		absolute path to a file and data is the data extracted from
+		it. Pairs are yielded in the order extraction finishes, so a
+		slow file does not hold back the results of other files.
+
+		An exception raised by the extractor is re-raised as an
+		ExtractionError, which contains the path of the file the
+		extractor failed on.
+
+		Arguments:
+		rootDirectories -- Either a string containing the path to one
+						  directory or a list containing multiple
+						  directories to process
+
+		"""
+		rootDirectories = _toDirectoryList(rootDirectories)
+
+		# The semaphore is acquired before a file is scheduled and
+		# released once it's been processed, so no more than
+		# 'concurrency' files are being extracted at once
+		semaphore = asyncio.Semaphore(self.concurrency)
+		if (not asyncio.iscoroutinefunction(self.extractor.extract)
+				and not getattr(self.extractor, "threadSafe", False)):
+			lock = asyncio.Lock()
+		else:
+			lock = None
+		pending = set()
+		try:
+			for directory in rootDirectories:
+				# If directory doesn't exist, report the issue and skip to the next one.
+				# Checking can block (e.g. on network mounts), so it's done off the loop.
+				if not await self._call(os.path.isdir, directory):
+					print("Directory '{}' does not exist".format(directory), file=sys.stderr)
+					continue
+				fileListing = await self._call(self.searcher.search, directory)
+				for filterer in self.filterers:
+					fileListing = await self._call(filterer.filter, fileListing)
+
+				for path in fileListing:
+					await semaphore.acquire()
+					pending.add( asyncio.ensure_future(self._extract(path, semaphore, lock)) )
+					# Hand back anything that finished while waiting for a slot
+					finished = [ task for task in pending if task.done() ]
+					for task in finished:
+						pending.discard(task)
+						yield task.result()
+
+			while pending:
+				finished, pending = await asyncio.wait(pending,
+					return_when=asyncio.FIRST_COMPLETED)
+				for task in finished:
+					yield task.result()
+		finally:
+			# Stop outstanding work if the caller stopped early or
+			# an extraction failed
+			for task in pending:
+				task.cancel()
+			if pending:
+				await asyncio.gather(*pending, return_exceptions=True)
+
+	async def process(self, rootDirectories):
+		"""Process one or more directories of files in some way.
+
+		Return a dictionary where the keys are the absolute paths
+		to the files and values are the data extracted from the
+		corresponding files.
+
+		Arguments:
+		rootDirectories -- Either a string containing the path to one
+						  directory or a list containing multiple
+						  directories to process
+
+		"""
+		data = {}
+		async for path, fileData in self.iterprocess(rootDirectories):
+			data[path] = fileData
 		return data
\ No newline at end of file
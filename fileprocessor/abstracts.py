@@ -1,5 +1,7 @@
 """Contains the abstract classes for the major components of the library."""
 
+from fileprocessor.fileinfo import FileInfo
+
 class Searcher:
 
 	"""Searches directory for files to process."""
@@ -13,6 +15,33 @@ class Searcher:
 		"""
 		raise NotImplementedError
 
+	def iterSearch(self, rootDirectory):
+		"""Search directory for files and return iterator over absolute paths to those files.
+
+		Subclasses which can find files incrementally should override
+		this so files can be processed before the search has finished.
+		By default, this just iterates over the list returned by search().
+
+		Arguments:
+		rootDirectory -- Root directory to start searching in.
+
+		"""
+		return iter(self.search(rootDirectory))
+
+	def iterSearchInfo(self, rootDirectory):
+		"""Search directory for files and return iterator over FileInfo objects for those files.
+
+		Subclasses which find files by listing directories should
+		override this to pass on the metadata in the listing, so it
+		doesn't need to be fetched again. By default, this wraps
+		each path returned by iterSearch() in a FileInfo.
+
+		Arguments:
+		rootDirectory -- Root directory to start searching in.
+
+		"""
+		return ( FileInfo(path) for path in self.iterSearch(rootDirectory) )
+
 class Filterer:
 
 	"""Filters lists of files based on some criteria."""
@@ -27,10 +56,76 @@ class Filterer:
 					   files to filter."""
 		raise NotImplementedError
 
+	def iterFilter(self, fileListing):
+		"""Filter iterable of files and return iterator over the files that passed the filter.
+
+		Subclasses which decide whether to keep each file on its own
+		should override this so the listing is filtered lazily. By
+		default, the whole listing is read into a list and passed to
+		filter().
+
+		Arguments:
+		fileListing -- An iterable containing the absolute paths of
+					   the files to filter."""
+		return iter(self.filter(list(fileListing)))
+
+	def accepts(self, path):
+		"""Return True if a single file passes the filter.
+
+		Subclasses which decide whether to keep each file on its own
+		should override this. FilterChain only tests files against
+		filterers one at a time if they do. By default, this passes
+		a list containing just the given file to filter().
+
+		Arguments:
+		path -- Absolute path of the file to test
+
+		"""
+		return len(self.filter([ path ])) > 0
+
+	def acceptsInfo(self, info):
+		"""Return True if a single file passes the filter, given its FileInfo.
+
+		Subclasses which use metadata such as the size or modification
+		time of files should override this, so the metadata found when
+		searching is reused. By default, this passes the file's path
+		to accepts().
+
+		Arguments:
+		info -- FileInfo of the file to test
+
+		"""
+		return self.accepts(info.path)
+
+	def prunes(self, directory):
+		"""Return True if no file inside a directory can pass the filter.
+
+		Searchers which support pruning (see FileSearcher) don't
+		search directories which are pruned, so subclasses which can
+		rule out whole directories should override this. It must only
+		return True if every file under the directory, at any depth,
+		would be rejected. By default, nothing is pruned.
+
+		Arguments:
+		directory -- Absolute path of the directory to test
+
+		"""
+		return False
+
 class Extractor:
 
 	"""Extracts data from files."""
 
+	# Set to True by subclasses whose extract() method can safely be
+	# called from multiple threads at once. FileProcessor's thread
+	# executor serialises calls to extractors which don't set this.
+	threadSafe = False
+
+	# Identifies the version of the data extracted. Subclasses should
+	# change this whenever the data they extract changes, so data
+	# cached by older versions (see extractorIdentity()) is not used.
+	version = None
+
 	def extract(self, filename):
 		"""Extract data from the file with the given filename.
 
@@ -40,5 +135,114 @@ class Extractor:
 		Arguments:
 		filename -- Name of the file to extract data from
 
+		"""
+		raise NotImplementedError
+
+	def extractBatch(self, paths):
+		"""Extract data from several files at once.
+
+		Returns list containing the data extracted from each file, in
+		the same order as the paths. By default, extract() is called
+		on each file in turn. Subclasses which can share work between
+		files, such as loading a model once or processing many small
+		files together, should override this. FileProcessor gives
+		files to such extractors in batches instead of one at a time.
+
+		Arguments:
+		paths -- List of names of the files to extract data from
+
+		"""
+		return [ self.extract(path) for path in paths ]
+
+def extractorIdentity(extractor):
+	"""Return string identifying the kind of data an extractor extracts.
+
+	This is made up of the extractor's fully qualified class name and
+	its 'version' attribute (see Extractor.version), so cached data
+	is not reused by a different extractor, or by a newer version of
+	the same extractor.
+
+	"""
+	extractorClass = type(extractor)
+	return "{}.{}:{}".format(extractorClass.__module__, extractorClass.__qualname__,
+		getattr(extractor, "version", None))
+
+class ResultSink:
+
+	"""Receives the data extracted from each file as it's produced.
+
+	Sinks can be used as context managers, which close them on exit.
+
+	"""
+
+	def write(self, path, data):
+		"""Record data extracted from a file.
+
+		Arguments:
+		path -- Absolute path to the file
+		data -- Data extracted from the file
+
+		"""
+		raise NotImplementedError
+
+	def flush(self):
+		"""Make sure everything written so far has reached its destination.
+
+		Does nothing by default, for sinks which don't buffer.
+
+		"""
+		pass
+
+	def close(self):
+		"""Flush the sink and release any resources it holds."""
+		self.flush()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self.close()
+		return False
+
+class AsyncSearcher:
+
+	"""Searches directory for files to process without blocking the event loop."""
+
+	async def search(self, rootDirectory):
+		"""Search directory for files and return list of absolute paths to those files.
+
+		Arguments:
+		rootDirectory -- Root directory to start searching in.
+
+		"""
+		raise NotImplementedError
+
+class AsyncFilterer:
+
+	"""Filters lists of files based on some criteria without blocking the event loop."""
+
+	async def filter(self, fileListing):
+		"""Filter list of files and return a NEW list containing only the files that passed the filter.
+
+		NOTE: This should not alter the original list given.
+
+		Arguments:
+		fileListing -- A list containing the absolute paths of the
+					   files to filter."""
+		raise NotImplementedError
+
+class AsyncExtractor:
+
+	"""Extracts data from files without blocking the event loop."""
+
+	async def extract(self, filename):
+		"""Extract data from the file with the given filename.
+
+		What this returns depends on what data is to be extracted.
+		This is determined by the concrete subclasses of AsyncExtractor.
+
+		Arguments:
+		filename -- Name of the file to extract data from
+
 		"""
 		raise NotImplementedError
\ No newline at end of file
@@ -0,0 +1,289 @@
+"""Contains classes for caching extracted data between runs."""
+
+import os
+import time
+import pickle
+import sqlite3
+import threading
+
+from fileprocessor.abstracts import Extractor, extractorIdentity
+
+
+class ExtractionCache:
+
+	"""Persistent cache of extracted data, stored in an SQLite database.
+
+	Data is stored against the path of the file it was extracted
+	from and the identity of the extractor that extracted it (see
+	extractorIdentity()). Each entry also records the size,
+	modification time and inode of the file when it was extracted.
+	A cached entry is only used if all three still match, so
+	modified or replaced files are extracted again.
+
+	If a maximum size is given, the least recently used entries are
+	evicted once the total size of the cached data exceeds it.
+
+	The number of cache hits, misses and evictions since the cache
+	was opened are stored in the 'hits', 'misses' and 'evictions'
+	attributes. Instances can be used from multiple threads.
+
+	"""
+
+	# Number of writes to make before committing them to disk
+	COMMIT_INTERVAL = 1000
+
+	def __init__(self, filename, maxBytes = None):
+		"""Construct instance of ExtractionCache, opening or creating the database.
+
+		Arguments:
+		filename -- Path to the SQLite database to store the cache in.
+					Created if it doesn't exist.
+
+		Keyword arguments:
+		maxBytes -- Maximum total size of the pickled data stored in
+					the cache. If None, the cache grows without limit.
+					(default: None)
+
+		"""
+		if maxBytes is not None and maxBytes < 0:
+			raise ValueError("Maximum cache size cannot be negative")
+		self.filename = filename
+		self.maxBytes = maxBytes
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+		self._lock = threading.RLock()
+		self._connection = sqlite3.connect(filename, check_same_thread=False)
+		self._connection.executescript("""
+			CREATE TABLE IF NOT EXISTS results (
+				path TEXT NOT NULL,
+				extractor TEXT NOT NULL,
+				size INTEGER NOT NULL,
+				mtime_ns INTEGER NOT NULL,
+				inode INTEGER NOT NULL,
+				data BLOB NOT NULL,
+				bytes INTEGER NOT NULL,
+				accessed INTEGER NOT NULL,
+				PRIMARY KEY (path, extractor)
+			);
+			CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+		""")
+		self._totalBytes = self._connection.execute(
+			"SELECT COALESCE(SUM(bytes), 0) FROM results").fetchone()[0]
+		self._uncommitted = 0
+		# Access times of entries which were hit, written out in
+		# bulk rather than with one UPDATE per hit
+		self._accessed = {}
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self.close()
+		return False
+
+	@property
+	def totalBytes(self):
+		"""Total size of the pickled data stored in the cache."""
+		return self._totalBytes
+
+	def key(self, path, extractor, stat = None):
+		"""Return key identifying the current contents of a file for a given extractor.
+
+		Returns None if the file cannot be stat'd, in which case
+		nothing can be cached for it.
+
+		Arguments:
+		path -- Path to the file
+		extractor -- Extractor which extracts data from the file
+
+		Keyword arguments:
+		stat -- Result of os.stat() for the file, if it's already
+				known. If None, the file is stat'd. (default: None)
+
+		"""
+		if stat is None:
+			try:
+				stat = os.stat(path)
+			except OSError:
+				return None
+		return (path, extractorIdentity(extractor), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+	def lookup(self, key):
+		"""Return (found, data) pair for the given key.
+
+		'found' is True if up-to-date data was cached for the key, in
+		which case 'data' contains the cached data. Otherwise, 'data'
+		is None.
+
+		Arguments:
+		key -- Key returned by key()
+
+		"""
+		if key is None:
+			with self._lock:
+				self.misses += 1
+			return False, None
+		path, identity, size, mtimeNs, inode = key
+		with self._lock:
+			row = self._connection.execute(
+				"SELECT size, mtime_ns, inode, data FROM results WHERE path = ? AND extractor = ?",
+				(path, identity)).fetchone()
+			if row is None or tuple(row[:3]) != (size, mtimeNs, inode):
+				self.misses += 1
+				return False, None
+			self.hits += 1
+			self._accessed[(path, identity)] = time.time_ns()
+			if len(self._accessed) >= self.COMMIT_INTERVAL:
+				self._writeAccessTimes()
+		return True, pickle.loads(row[3])
+
+	def store(self, key, data):
+		"""Store data extracted from the file the key refers to.
+
+		Does nothing if the key is None.
+
+		Arguments:
+		key -- Key returned by key() BEFORE the data was extracted,
+			   so data is never stored against newer file contents
+			   than it was extracted from
+		data -- Extracted data. Must be picklable.
+
+		"""
+		if key is None:
+			return
+		path, identity, size, mtimeNs, inode = key
+		blob = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+		with self._lock:
+			row = self._connection.execute(
+				"SELECT bytes FROM results WHERE path = ? AND extractor = ?",
+				(path, identity)).fetchone()
+			if row:
+				self._totalBytes -= row[0]
+			self._connection.execute(
+				"INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+				(path, identity, size, mtimeNs, inode, blob, len(blob), time.time_ns()))
+			self._accessed.pop((path, identity), None)
+			self._totalBytes += len(blob)
+			if self.maxBytes is not None and self._totalBytes > self.maxBytes:
+				self._evict()
+			self._uncommitted += 1
+			if self._uncommitted >= self.COMMIT_INTERVAL:
+				self.flush()
+
+	def _writeAccessTimes(self):
+		self._connection.executemany(
+			"UPDATE results SET accessed = ? WHERE path = ? AND extractor = ?",
+			[ (accessed, path, identity) for (path, identity), accessed in self._accessed.items() ])
+		self._uncommitted += len(self._accessed)
+		self._accessed = {}
+
+	def _evict(self):
+		"""Delete least recently used entries until the cache is small enough."""
+		self._writeAccessTimes()
+		# Evict down to 90% of the limit so evictions aren't needed
+		# again on the very next store
+		target = self.maxBytes * 0.9
+		victims = []
+		cursor = self._connection.execute(
+			"SELECT path, extractor, bytes FROM results ORDER BY accessed")
+		for path, identity, size in cursor:
+			if self._totalBytes <= target:
+				break
+			victims.append( (path, identity) )
+			self._totalBytes -= size
+		cursor.close()
+		self._connection.executemany(
+			"DELETE FROM results WHERE path = ? AND extractor = ?", victims)
+		self.evictions += len(victims)
+
+	def invalidate(self, path = None, extractor = None):
+		"""Remove cached data for a file, an extractor, or both.
+
+		If neither is given, the whole cache is cleared.
+
+		Keyword arguments:
+		path -- Path of the file whose cached data should be removed.
+				If None, entries for all files are removed. (default: None)
+		extractor -- Extractor whose cached data should be removed.
+					 If None, entries for all extractors are removed.
+					 (default: None)
+
+		"""
+		conditions = []
+		parameters = []
+		if path is not None:
+			conditions.append("path = ?")
+			parameters.append(path)
+		if extractor is not None:
+			conditions.append("extractor = ?")
+			parameters.append( extractorIdentity(extractor) )
+		where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+		with self._lock:
+			self._writeAccessTimes()
+			self._connection.execute("DELETE FROM results" + where, parameters)
+			self._totalBytes = self._connection.execute(
+				"SELECT COALESCE(SUM(bytes), 0) FROM results").fetchone()[0]
+			self.flush()
+
+	def clear(self):
+		"""Remove all cached data."""
+		self.invalidate()
+
+	def __len__(self):
+		with self._lock:
+			return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+	def flush(self):
+		"""Commit any outstanding writes to disk."""
+		with self._lock:
+			self._writeAccessTimes()
+			self._connection.commit()
+			self._uncommitted = 0
+
+	def close(self):
+		"""Commit outstanding writes and close the database."""
+		with self._lock:
+			if self._connection is not None:
+				self.flush()
+				self._connection.close()
+				self._connection = None
+
+
+class CachingExtractor(Extractor):
+
+	"""Extractor which wraps another extractor, caching the data it extracts.
+
+	Useful for running a cached extractor outside of FileProcessor,
+	or inside FileProcessor's thread executor. FileProcessor can also
+	be given an ExtractionCache directly, which works with every
+	executor.
+
+	"""
+
+	def __init__(self, extractor, cache):
+		"""Construct instance of CachingExtractor.
+
+		Arguments:
+		extractor -- Extractor to run when data isn't cached
+		cache -- ExtractionCache to store extracted data in
+
+		"""
+		self.extractor = extractor
+		self.cache = cache
+		self.threadSafe = getattr(extractor, "threadSafe", False)
+
+	def extract(self, filename):
+		"""Return cached data for file if it's up-to-date, otherwise extract and cache it.
+
+		Arguments:
+		filename -- Name of the file to extract data from
+
+		"""
+		key = self.cache.key(filename, self.extractor)
+		found, data = self.cache.lookup(key)
+		if not found:
+			data = self.extractor.extract(filename)
+			self.cache.store(key, data)
+		return data
@@ -0,0 +1,253 @@
+"""Contains classes for avoiding extracting data from the same file twice."""
+
+import os
+import hashlib
+import collections
+
+
+class Deduplicator:
+
+	"""Finds files whose data does not need to be extracted again.
+
+	Files are duplicates if they are hard links to the same inode as
+	a file seen earlier in the run. Optionally, files with exactly
+	the same contents as an earlier file are duplicates too. Data is
+	only extracted from the first file in each group (the original),
+	then given to all of its duplicates, so this should only be used
+	with extractors whose data depends on a file's contents and not
+	on its path.
+
+	To find duplicate contents cheaply, files are first grouped by
+	size. A file is only hashed once another file with the same size
+	is seen, starting with a partial hash of its first and last few
+	kilobytes. Only files whose partial hashes match are hashed in
+	full to confirm they are identical.
+
+	Data extracted from originals is kept so it can be given to
+	duplicates found later, but only for the most recently used
+	'maxKeptData' originals. Once an original's data is dropped, it's
+	forgotten entirely, so a later duplicate of it is extracted and
+	becomes an original itself. This keeps memory use bounded on
+	large runs, at the cost of extracting some duplicates again.
+
+	After a run, the 'duplicates' attribute maps the path of every
+	duplicate to the path of its original, while 'skippedLinks' and
+	'skippedCopies' count the extractions skipped because of hard
+	links and identical contents respectively.
+
+	"""
+
+	# Number of bytes read from each end of a file for its partial hash
+	PARTIAL_HASH_BYTES = 4096
+	# Number of bytes read at once when hashing a whole file
+	BLOCK_SIZE = 65536
+	# Default number of originals whose data is kept
+	DEFAULT_MAX_KEPT_DATA = 1024
+
+	def __init__(self, byContent = False, maxKeptData = None):
+		"""Construct instance of Deduplicator.
+
+		Keyword arguments:
+		byContent -- If set to True, files with identical contents are
+					 treated as duplicates, as well as hard links.
+					 (default: False)
+		maxKeptData -- Maximum number of originals whose extracted
+					   data is kept for duplicates found later. If
+					   None, DEFAULT_MAX_KEPT_DATA is used.
+					   (default: None)
+
+		"""
+		if maxKeptData is None:
+			maxKeptData = self.DEFAULT_MAX_KEPT_DATA
+		if maxKeptData < 1:
+			raise ValueError("Maximum number of originals with kept data must be at least 1")
+		self.byContent = byContent
+		self.maxKeptData = maxKeptData
+		self.reset()
+
+	def reset(self):
+		"""Forget all files seen so far, so a new run can start."""
+		self.duplicates = {}
+		self.skippedLinks = 0
+		self.skippedCopies = 0
+		# Maps (device, inode) pairs of files with more than one link
+		# to the original path and number of links not yet seen
+		self._inodes = {}
+		# Maps file sizes to either the path of the only file seen
+		# with that size, or a dictionary mapping partial hashes to
+		# lists of originals with that size and partial hash
+		self._bySize = {}
+		self._fullHashes = {}
+		# Data extracted from originals which may still have
+		# duplicates, least recently used first, and duplicates
+		# waiting for data to be extracted
+		self._data = collections.OrderedDict()
+		self._waiting = {}
+		# Maps originals which have links that haven't been seen yet
+		# to their (device, inode) pairs
+		self._linkedOriginals = {}
+		# Maps files whose contents may be duplicated to their sizes
+		self._sizes = {}
+
+	@property
+	def skipped(self):
+		"""Total number of extractions skipped in the current run."""
+		return self.skippedLinks + self.skippedCopies
+
+	def duplicateOf(self, path, stat = None):
+		"""Return path of the original file the given file duplicates.
+
+		Returns None if the file is not a duplicate of any file seen
+		so far, in which case its data should be extracted and given
+		to resolve(). Files which cannot be read are never
+		duplicates, so the extractor reports the error.
+
+		Arguments:
+		path -- Path of the file about to be extracted
+
+		Keyword arguments:
+		stat -- Result of os.stat() for the file, if it's already
+				known. If None, the file is stat'd. (default: None)
+
+		"""
+		if stat is None:
+			try:
+				stat = os.stat(path)
+			except OSError:
+				return None
+
+		original = None
+		inodeKey = (stat.st_dev, stat.st_ino)
+		linked = self._inodes.get(inodeKey)
+		if linked:
+			original = linked[0]
+			self.skippedLinks += 1
+			linked[1] -= 1
+			if linked[1] <= 0:
+				# Every link to the inode has been seen, so its data
+				# doesn't need to be kept for later duplicates
+				del self._inodes[inodeKey]
+				self._linkedOriginals.pop(original, None)
+				if not self.byContent:
+					self._data.pop(original, None)
+		else:
+			if stat.st_nlink > 1:
+				self._inodes[inodeKey] = [ path, stat.st_nlink - 1 ]
+				self._linkedOriginals[path] = inodeKey
+			if self.byContent:
+				original = self._sameContents(path, stat.st_size)
+				if original is not None:
+					self.skippedCopies += 1
+
+		if original is None:
+			if self.byContent:
+				self._sizes[path] = stat.st_size
+			return None
+		self.duplicates[path] = original
+		if original not in self._data:
+			self._waiting.setdefault(original, []).append(path)
+		return original
+
+	def dataFor(self, original):
+		"""Return (found, data) pair for an original file.
+
+		'found' is True if data has already been extracted from the
+		original, in which case 'data' contains it. Otherwise, its
+		duplicates are returned by resolve() once it's extracted.
+
+		Arguments:
+		original -- Path returned by duplicateOf()
+
+		"""
+		if original in self._data:
+			self._data.move_to_end(original)
+			return True, self._data[original]
+		return False, None
+
+	def resolve(self, path, data):
+		"""Record data extracted from a file and return list of its waiting duplicates.
+
+		The returned duplicates should all be given the same data.
+
+		Arguments:
+		path -- Path of the file data was extracted from
+		data -- Data extracted from the file
+
+		"""
+		if self.byContent or path in self._linkedOriginals:
+			self._data[path] = data
+			self._data.move_to_end(path)
+			while len(self._data) > self.maxKeptData:
+				forgotten, forgottenData = self._data.popitem(last=False)
+				self._forget(forgotten)
+		return self._waiting.pop(path, [])
+
+	def _forget(self, path):
+		"""Stop treating file as an original, since its data is no longer kept."""
+		inodeKey = self._linkedOriginals.pop(path, None)
+		if inodeKey is not None:
+			self._inodes.pop(inodeKey, None)
+		size = self._sizes.pop(path, None)
+		bucket = self._bySize.get(size)
+		if bucket == path:
+			del self._bySize[size]
+		elif isinstance(bucket, dict):
+			for partialHash, candidates in list(bucket.items()):
+				if path in candidates:
+					candidates.remove(path)
+					if not candidates:
+						del bucket[partialHash]
+			if not bucket:
+				del self._bySize[size]
+		self._fullHashes.pop(path, None)
+
+	def _sameContents(self, path, size):
+		"""Return path of earlier file with same contents as given file, or None."""
+		bucket = self._bySize.get(size)
+		if bucket is None:
+			# Nothing to compare with yet, so don't hash the file
+			self._bySize[size] = path
+			return None
+		try:
+			if isinstance(bucket, str):
+				first = bucket
+				bucket = { self._partialHash(first, size) : [ first ] }
+				self._bySize[size] = bucket
+			partialHash = self._partialHash(path, size)
+			candidates = bucket.setdefault(partialHash, [])
+			if candidates:
+				fullHash = self._fullHash(path, size)
+				for candidate in candidates:
+					if self._fullHash(candidate, size) == fullHash:
+						return candidate
+		except OSError:
+			return None
+		candidates.append(path)
+		return None
+
+	def _partialHash(self, path, size):
+		hasher = hashlib.blake2b()
+		with open(path, "rb") as f:
+			if size <= 2 * self.PARTIAL_HASH_BYTES:
+				hasher.update( f.read() )
+				digest = hasher.digest()
+				# The whole file was read, so this is its full hash too
+				self._fullHashes[path] = digest
+				return digest
+			hasher.update( f.read(self.PARTIAL_HASH_BYTES) )
+			f.seek(-self.PARTIAL_HASH_BYTES, os.SEEK_END)
+			hasher.update( f.read(self.PARTIAL_HASH_BYTES) )
+		return hasher.digest()
+
+	def _fullHash(self, path, size):
+		if path not in self._fullHashes:
+			hasher = hashlib.blake2b()
+			buffer = bytearray(self.BLOCK_SIZE)
+			view = memoryview(buffer)
+			with open(path, "rb") as f:
+				numRead = f.readinto(buffer)
+				while numRead:
+					hasher.update(view[:numRead])
+					numRead = f.readinto(buffer)
+			self._fullHashes[path] = hasher.digest()
+		return self._fullHashes[path]
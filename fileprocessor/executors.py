@@ -0,0 +1,508 @@
+"""Contains the executors FileProcessor uses to run an extractor over files."""
+
+import os
+import collections
+import threading
+import concurrent.futures
+
+from fileprocessor.abstracts import Extractor
+
+
+class ExtractionError(Exception):
+
+	"""Raised when an extractor fails on a file during a parallel run.
+
+	The original exception is available as the 'error' attribute
+	(and as __cause__), while 'path' contains the path of the
+	file that was being processed when the extractor failed.
+
+	"""
+
+	def __init__(self, path, error):
+		super().__init__(path, error)
+		self.path = path
+		self.error = error
+
+	def __str__(self):
+		return "Error extracting data from '{}': {!r}".format(self.path, self.error)
+
+
+def extractsInBatches(extractor):
+	"""Return True if extractor should be given files in batches using extractBatch().
+
+	This is the case for duck-typed extractors which have an
+	extractBatch() method and Extractor subclasses which override
+	Extractor.extractBatch().
+
+	"""
+	extractBatch = getattr(type(extractor), "extractBatch", None)
+	return extractBatch is not None and extractBatch is not Extractor.extractBatch
+
+def _runBatch(extractor, paths):
+	"""Return list of (path, data) pairs from giving all of the paths to extractor.extractBatch()."""
+	data = extractor.extractBatch(paths)
+	if len(data) != len(paths):
+		raise ValueError("extractBatch() returned {} results for {} files".format(len(data), len(paths)))
+	return list( zip(paths, data) )
+
+
+class SerialExecutor:
+
+	"""Runs the extractor on one file at a time in the calling thread.
+
+	Executors are used as context managers by FileProcessor. Inside
+	the context, paths are given to submit() and the extracted data
+	is collected from results() as (path, data) pairs. map() wraps
+	this protocol for callers which just have an iterable of paths.
+
+	Files are extracted as soon as they're submitted, unless a batch
+	size is given, in which case they're extracted once a batch of
+	them has been submitted. Batches are given to extractBatch() if
+	the extractor overrides it (see extractsInBatches()).
+
+	"""
+
+	def __init__(self, extractor, batchSize=None, maxBatchBytes=None):
+		"""Construct instance of SerialExecutor.
+
+		Arguments:
+		extractor -- Extractor to run on every submitted file
+
+		Keyword arguments:
+		batchSize -- Number of files to extract at once. If None,
+					 files are extracted one at a time. (default: None)
+		maxBatchBytes -- Total size of files, as given to submit(),
+						 at which a batch is extracted even if it has
+						 fewer than batchSize files. If None, batches
+						 are not limited by size. (default: None)
+
+		"""
+		if batchSize is None:
+			batchSize = 1
+		if batchSize < 1:
+			raise ValueError("Batch size must be at least 1")
+		if maxBatchBytes is not None and maxBatchBytes < 1:
+			raise ValueError("Maximum batch size in bytes must be at least 1")
+		self.extractor = extractor
+		self.batchSize = batchSize
+		self.maxBatchBytes = maxBatchBytes
+		self._batching = extractsInBatches(extractor)
+		self._completed = collections.deque()
+		self._batch = []
+		self._batchBytes = 0
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self._completed.clear()
+		self._batch = []
+		self._batchBytes = 0
+		return False
+
+	def needsSizes(self):
+		"""Return True if the sizes of files should be given to full() and submit()."""
+		return self.maxBatchBytes is not None
+
+	def submit(self, path, size=0):
+		"""Queue file at given path for extraction.
+
+		Arguments:
+		path -- Path of the file
+
+		Keyword arguments:
+		size -- Size of the file in bytes, used to limit the size of
+				batches. (default: 0)
+
+		"""
+		self._batch.append(path)
+		self._batchBytes += size
+		if len(self._batch) >= self.batchSize or (
+				self.maxBatchBytes is not None and self._batchBytes >= self.maxBatchBytes):
+			self._dispatch()
+
+	def _dispatch(self):
+		"""Start extracting data from the files in the current batch."""
+		if self._batch:
+			if self._batching:
+				self._completed.extend( _runBatch(self.extractor, self._batch) )
+			else:
+				for path in self._batch:
+					self._completed.append( (path, self.extractor.extract(path)) )
+			self._batch = []
+			self._batchBytes = 0
+
+	def full(self, size=0):
+		"""Return True if no more files should be submitted until results are collected.
+
+		Keyword arguments:
+		size -- Size of the file about to be submitted. (default: 0)
+
+		"""
+		return False
+
+	def pending(self):
+		"""Return number of submitted files whose results have not been collected."""
+		return len(self._completed) + len(self._batch)
+
+	def results(self, wait=False):
+		"""Yield (path, data) pairs for files whose extraction has finished.
+
+		Keyword arguments:
+		wait -- If set to True, block until at least one result is
+				available, unless nothing is pending. Any partially
+				filled batch is extracted first. (default: False)
+
+		"""
+		if wait:
+			self._dispatch()
+		while self._completed:
+			yield self._completed.popleft()
+
+	def map(self, fileListing):
+		"""Extract data from every file in listing, yielding (path, data) pairs.
+
+		Pairs are yielded as soon as they are available, which is
+		not necessarily the order the paths were given in.
+
+		Arguments:
+		fileListing -- Iterable containing the paths of the files
+					   to extract data from
+
+		"""
+		for path in fileListing:
+			while self.full():
+				yield from self.results(wait=True)
+			self.submit(path)
+			yield from self.results()
+		while self.pending():
+			yield from self.results(wait=True)
+
+
+# Extractor used by the current worker process. Set once per worker
+# by _initialiseWorker() so the extractor is not pickled per batch.
+_workerExtractor = None
+
+def _initialiseWorker(extractor):
+	global _workerExtractor
+	_workerExtractor = extractor
+
+def _extractBatch(paths, extractor=None):
+	"""Run extractor over a batch of paths and return list of (path, data) pairs.
+
+	If no extractor is given, the one set up for the current worker
+	process is used. Extractors which override extractBatch() are
+	given the whole batch at once. Any exception raised by the
+	extractor is wrapped in an ExtractionError containing the
+	failing path.
+
+	"""
+	if extractor is None:
+		extractor = _workerExtractor
+	if extractsInBatches(extractor):
+		try:
+			return _runBatch(extractor, paths)
+		except Exception as e:
+			if len(paths) == 1:
+				raise ExtractionError(paths[0], e) from e
+		# The exception doesn't say which file failed, so extract
+		# the files one at a time to find out
+		extract = lambda path: _runBatch(extractor, [ path ])[0][1]
+	else:
+		extract = extractor.extract
+	results = []
+	for path in paths:
+		try:
+			results.append( (path, extract(path)) )
+		except Exception as e:
+			raise ExtractionError(path, e) from e
+	return results
+
+
+class ProcessExecutor(SerialExecutor):
+
+	"""Runs the extractor on batches of files in a pool of worker processes.
+
+	Useful for CPU-bound extractors, since each worker process has
+	its own interpreter. The extractor is pickled once per worker
+	and paths are sent to the workers in batches, so the extractor
+	must be picklable and should not rely on state shared between
+	files. Exceptions raised by the extractor are re-raised in the
+	calling process as ExtractionError.
+
+	"""
+
+	# Number of paths sent to a worker process at once
+	DEFAULT_BATCH_SIZE = 16
+
+	def __init__(self, extractor, workers=None, batchSize=None, maxBatchBytes=None):
+		"""Construct instance of ProcessExecutor.
+
+		Arguments:
+		extractor -- Extractor to run on every submitted file
+
+		Keyword arguments:
+		workers -- Number of workers to use. If None, the number of
+				   CPUs on the machine is used. (default: None)
+		batchSize -- Number of paths given to a worker at once. Larger
+					 batches reduce communication overhead but balance
+					 work less evenly. If None, DEFAULT_BATCH_SIZE is
+					 used. (default: None)
+		maxBatchBytes -- Total size of files, as given to submit(),
+						 at which a batch is sent to a worker even if
+						 it has fewer than batchSize files. If None,
+						 batches are not limited by size. (default: None)
+
+		"""
+		if workers is None:
+			workers = os.cpu_count() or 1
+		if batchSize is None:
+			batchSize = self.DEFAULT_BATCH_SIZE
+		if workers < 1:
+			raise ValueError("Number of workers must be at least 1")
+		super().__init__(extractor, batchSize, maxBatchBytes)
+		self.workers = workers
+		# Keep enough batches queued that workers never sit idle,
+		# without reading the entire file listing into the pool
+		self.maxPendingBatches = 2 * workers
+		self._pool = None
+		self._futures = set()
+
+	def _createPool(self):
+		return concurrent.futures.ProcessPoolExecutor(self.workers,
+			initializer=_initialiseWorker, initargs=(self.extractor,))
+
+	def _submitBatch(self, batch):
+		return self._pool.submit(_extractBatch, batch)
+
+	def __enter__(self):
+		self._pool = self._createPool()
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		# If the run is being aborted, don't bother finishing work
+		# that nobody is going to collect
+		for future in self._futures:
+			future.cancel()
+		self._pool.shutdown(wait=True)
+		self._pool = None
+		self._futures = set()
+		return super().__exit__(excType, excValue, traceback)
+
+	def _dispatch(self):
+		"""Send the current batch to the workers."""
+		if self._batch:
+			self._futures.add( self._submitBatch(self._batch) )
+			self._batch = []
+			self._batchBytes = 0
+
+	def full(self, size=0):
+		"""Return True if no more files should be submitted until results are collected.
+
+		Keyword arguments:
+		size -- Size of the file about to be submitted. (default: 0)
+
+		"""
+		return len(self._futures) >= self.maxPendingBatches
+
+	def pending(self):
+		"""Return number of submitted batches whose results have not been collected."""
+		return len(self._futures) + (1 if self._batch else 0)
+
+	def results(self, wait=False):
+		"""Yield (path, data) pairs for files whose extraction has finished.
+
+		Raises ExtractionError if the extractor failed on a file,
+		after yielding the results of every other batch which had
+		finished. Only the failed batch's results are lost, so the
+		executor can still be used after the error.
+
+		Keyword arguments:
+		wait -- If set to True, block until at least one result is
+				available, unless nothing is pending. Any partially
+				filled batch is sent to the workers first. (default: False)
+
+		"""
+		if wait:
+			self._dispatch()
+			if self._futures:
+				concurrent.futures.wait(self._futures,
+					return_when=concurrent.futures.FIRST_COMPLETED)
+		finished = [ future for future in self._futures if future.done() ]
+		error = None
+		for future in finished:
+			self._futures.discard(future)
+			try:
+				batchResults = future.result()
+			except ExtractionError as e:
+				# Yield the other finished batches before raising, so
+				# callers which carry on after the error don't lose them
+				if error is None:
+					error = e
+				continue
+			yield from batchResults
+		if error is not None:
+			raise error
+
+
+
+class ThreadExecutor(ProcessExecutor):
+
+	"""Runs the extractor on files in a pool of threads.
+
+	Useful for extractors which spend most of their time waiting on
+	file I/O or in code which releases the GIL (e.g. hashlib), as
+	many files can be read at once without the cost of pickling
+	anything. If the extractor's 'threadSafe' attribute is not True,
+	calls to extract() are serialised with a lock, so the extractor
+	is never run on two files at once. Exceptions raised by the
+	extractor are re-raised as ExtractionError.
+
+	"""
+
+	# Threads are cheap to hand work to, so files are sent one at a time
+	DEFAULT_BATCH_SIZE = 1
+
+	def __init__(self, extractor, workers=None, batchSize=None, maxBatchBytes=None):
+		"""Construct instance of ThreadExecutor.
+
+		Arguments:
+		extractor -- Extractor to run on every submitted file
+
+		Keyword arguments:
+		workers -- Number of threads to use. If None, enough threads
+				   are used to keep several files in flight per CPU,
+				   up to a maximum of 32. (default: None)
+		batchSize -- Number of paths given to a thread at once. If
+					 None, DEFAULT_BATCH_SIZE is used. (default: None)
+		maxBatchBytes -- See ProcessExecutor. (default: None)
+
+		"""
+		if workers is None:
+			workers = min(32, (os.cpu_count() or 1) + 4)
+		super().__init__(extractor, workers, batchSize, maxBatchBytes)
+		if getattr(extractor, "threadSafe", False):
+			self._lock = None
+		else:
+			self._lock = threading.Lock()
+
+	def _createPool(self):
+		return concurrent.futures.ThreadPoolExecutor(self.workers)
+
+	def _extractBatchLocked(self, batch):
+		with self._lock:
+			return _extractBatch(batch, self.extractor)
+
+	def _submitBatch(self, batch):
+		if self._lock:
+			return self._pool.submit(self._extractBatchLocked, batch)
+		else:
+			return self._pool.submit(_extractBatch, batch, self.extractor)
+
+class BoundedExecutor:
+
+	"""Wraps another executor, limiting the bytes and files it has in flight at once.
+
+	Files are admitted using their sizes, until the total size of the
+	files submitted but not yet collected would exceed a budget. A
+	file larger than the whole budget is only admitted once nothing
+	else is in flight, so it's never read alongside other files. The
+	number of files submitted but not yet collected is also capped,
+	which bounds how many extracted results can be queued up waiting
+	for the caller.
+
+	The protocol is the same as SerialExecutor's, but the size of
+	each file must be given to full() and submit().
+
+	"""
+
+	def __init__(self, executor, maxInFlightBytes=None, maxQueuedResults=None):
+		"""Construct instance of BoundedExecutor.
+
+		Arguments:
+		executor -- Executor to submit files to
+
+		Keyword arguments:
+		maxInFlightBytes -- Maximum total size of the files submitted
+							but not yet collected. If None, the size of
+							files is not limited. (default: None)
+		maxQueuedResults -- Maximum number of files submitted but not
+							yet collected. If None, only the wrapped
+							executor's own limit applies. (default: None)
+
+		"""
+		if maxInFlightBytes is not None and maxInFlightBytes < 1:
+			raise ValueError("Maximum bytes in flight must be at least 1")
+		if maxQueuedResults is not None and maxQueuedResults < 1:
+			raise ValueError("Maximum number of queued results must be at least 1")
+		self.executor = executor
+		self.maxInFlightBytes = maxInFlightBytes
+		self.maxQueuedResults = maxQueuedResults
+		# Sizes of the files in flight, by path, and their total
+		self._sizes = {}
+		self.inFlightBytes = 0
+		self.inFlightFiles = 0
+
+	def __enter__(self):
+		self.executor.__enter__()
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self._sizes = {}
+		self.inFlightBytes = 0
+		self.inFlightFiles = 0
+		return self.executor.__exit__(excType, excValue, traceback)
+
+	def needsSizes(self):
+		"""Return True, since the sizes of files are needed to bound the bytes in flight."""
+		return True
+
+	def submit(self, path, size=0):
+		"""Queue file at given path for extraction.
+
+		Arguments:
+		path -- Path of the file
+		size -- Size of the file in bytes. (default: 0)
+
+		"""
+		# The same path could be in flight twice if it's listed twice
+		self._sizes.setdefault(path, []).append(size)
+		self.inFlightBytes += size
+		self.inFlightFiles += 1
+		self.executor.submit(path, size)
+
+	def full(self, size=0):
+		"""Return True if a file of the given size should not be submitted until results are collected.
+
+		Arguments:
+		size -- Size of the file about to be submitted. (default: 0)
+
+		"""
+		if not self.inFlightFiles:
+			return self.executor.full(size)
+		if self.maxQueuedResults is not None and self.inFlightFiles >= self.maxQueuedResults:
+			return True
+		if self.maxInFlightBytes is not None and self.inFlightBytes + size > self.maxInFlightBytes:
+			return True
+		return self.executor.full(size)
+
+	def pending(self):
+		"""Return number of submitted files or batches whose results have not been collected."""
+		return self.executor.pending()
+
+	def results(self, wait=False):
+		"""Yield (path, data) pairs for files whose extraction has finished.
+
+		Keyword arguments:
+		wait -- If set to True, block until at least one result is
+				available, unless nothing is pending. (default: False)
+
+		"""
+		for path, data in self.executor.results(wait):
+			sizes = self._sizes.get(path)
+			if sizes:
+				self.inFlightBytes -= sizes.pop()
+				self.inFlightFiles -= 1
+				if not sizes:
+					del self._sizes[path]
+			yield path, data
@@ -1,6 +1,47 @@
 """Contains all built-in Extractor classes."""
 
-from fileprocessor.abstracts import Extractor
+import io
+import os
+import mmap
+import contextlib
+from fileprocessor.abstracts import Extractor, extractorIdentity
+
+
+@contextlib.contextmanager
+def mappedFile(filename):
+	"""Context manager providing read-only memoryview of a file's contents.
+
+	The file is memory-mapped, so its contents are paged in by the
+	OS as they are accessed rather than copied into memory up front.
+	Empty files, and files which cannot be mapped (e.g. pipes or
+	special files), are read into memory instead. The view must not
+	be used after the context exits.
+
+	Arguments:
+	filename -- Name of the file to map
+
+	"""
+	with open(filename, "rb") as f:
+		try:
+			mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		except (ValueError, OSError):
+			# Empty files can't be mapped, nor can some special files
+			mapping = None
+			view = memoryview(f.read())
+		else:
+			view = memoryview(mapping)
+		try:
+			yield view
+		finally:
+			view.release()
+			if mapping is not None:
+				try:
+					mapping.close()
+				except BufferError:
+					# Something still holds a slice of the view. Leave
+					# the mapping to be closed when it's garbage collected.
+					pass
+
 
 class ByteExtractor(Extractor):
 
@@ -13,6 +54,10 @@ class ByteExtractor(Extractor):
 
 	"""
 
+	# Reading the file keeps no state on the extractor. Subclasses
+	# whose extraction method does should set this to False.
+	threadSafe = True
+
 	def extract(self, filename):
 		"""Read entire contents of binary file and extract data from it.
 
@@ -44,6 +89,51 @@ class ByteExtractor(Extractor):
 		raise NotImplementedError
 
 
+class MmapByteExtractor(Extractor):
+
+	"""Extractor used for extracting data from a binary file without copying it.
+
+	The file is memory-mapped and given to extractFromBuffer() as a
+	read-only memoryview, so large files can be searched, hashed
+	or sliced without reading them into memory all at once. Unlike
+	ByteStreamExtractor, the whole file is still available at once.
+
+	"""
+
+	# See ByteExtractor.threadSafe
+	threadSafe = True
+
+	def extract(self, filename):
+		"""Memory-map binary file and extract data from it.
+
+		What this returns depends on what data is to be extracted.
+		This is determined by the concrete subclasses of Extractor.
+
+		Arguments:
+		filename -- Name of the file to extract data from
+					TypeError is raised if this is not a string.
+
+		"""
+		if not isinstance(filename, str):
+			raise TypeError("Filename must be a string")
+		with mappedFile(filename) as buffer:
+			return self.extractFromBuffer(buffer)
+
+	def extractFromBuffer(self, buffer):
+		"""Extract information from a buffer and return that information.
+
+		Raises a NotImplementedError. This method should be
+		overriden by subclasses.
+
+		Arguments:
+		buffer -- a read-only memoryview of the file's contents. It
+				  is only valid until this method returns, so data to
+				  be kept must be copied out of it (e.g. with bytes()).
+
+		"""
+		raise NotImplementedError
+
+
 class ByteStreamExtractor(Extractor):
 
 	"""Extractor used for extracting data from a binary file.
@@ -51,8 +141,24 @@ class ByteStreamExtractor(Extractor):
 	This class streams the binary file, so it can be read
 	incrementally rather than reading the entire file in one go.
 
+	Subclasses can either override extractFromStream() to read the
+	stream themselves, or override extractFromChunks() to be given
+	the file's contents as a sequence of fixed-size chunks. The
+	chunks are all read into the same preallocated buffer, so no
+	memory is allocated per chunk.
+
 	"""
 
+	# See ByteExtractor.threadSafe
+	threadSafe = True
+
+	# Size of the chunks given to extractFromChunks(). If None, this is
+	# chosen from the block size of the filesystem the file is on.
+	blockSize = None
+	# Smallest block size chosen automatically. Filesystem block sizes
+	# are often 4KiB, which makes for too many tiny reads.
+	MIN_BLOCK_SIZE = 65536
+
 	def extract(self, filename):
 		"""Open binary file stream and extract data from it.
 
@@ -73,16 +179,73 @@ class ByteStreamExtractor(Extractor):
 	def extractFromStream(self, stream):
 		"""Extract information from a byte stream and return that information.
 
-		Raises a NotImplementedError. This method should be
-		overriden by subclasses.
+		By default, this reads the stream in chunks and passes them
+		to extractFromChunks().
 
 		Arguments:
 		data -- a binary stream that can be used to access data
 				to process
 
+		"""
+		return self.extractFromChunks(self.iterChunks(stream))
+
+	def extractFromChunks(self, chunks):
+		"""Extract information from chunks of byte data and return that information.
+
+		Raises a NotImplementedError. This method should be
+		overriden by subclasses which don't override
+		extractFromStream().
+
+		Arguments:
+		chunks -- an iterator of read-only memoryviews containing
+				  consecutive chunks of the file's contents. Each chunk
+				  is overwritten by the next one, so data to be kept
+				  must be copied out of it (e.g. with bytes()).
+
 		"""
 		raise NotImplementedError
 
+	def chooseBlockSize(self, stream):
+		"""Return number of bytes to read from stream at once.
+
+		If the 'blockSize' attribute is set, that's used. Otherwise,
+		the filesystem's preferred block size is scaled up to a
+		multiple which is at least MIN_BLOCK_SIZE. If the stream
+		isn't a file, MIN_BLOCK_SIZE is used.
+
+		Arguments:
+		stream -- binary stream which is going to be read
+
+		"""
+		if self.blockSize:
+			return self.blockSize
+		try:
+			fsBlockSize = os.fstat(stream.fileno()).st_blksize
+		except (AttributeError, OSError, ValueError):
+			fsBlockSize = 0
+		if fsBlockSize <= 0:
+			return self.MIN_BLOCK_SIZE
+		# Round up to a whole number of filesystem blocks
+		return -(-self.MIN_BLOCK_SIZE // fsBlockSize) * fsBlockSize
+
+	def iterChunks(self, stream):
+		"""Yield consecutive chunks of a binary stream as read-only memoryviews.
+
+		Every chunk is read into the same buffer using readinto(), so
+		each chunk is only valid until the next one is requested.
+
+		Arguments:
+		stream -- binary stream to read
+
+		"""
+		buffer = bytearray(self.chooseBlockSize(stream))
+		view = memoryview(buffer).toreadonly()
+		while True:
+			numRead = stream.readinto(buffer)
+			if not numRead:
+				break
+			yield view[:numRead]
+
 
 class TextExtractor(Extractor):
 
@@ -95,6 +258,9 @@ class TextExtractor(Extractor):
 
 	"""
 
+	# See ByteExtractor.threadSafe
+	threadSafe = True
+
 	def extract(self, filename):
 		"""Read entire contents of text file and extract data from it.
 
@@ -135,6 +301,9 @@ class TextStreamExtractor(Extractor):
 
 	"""
 
+	# See ByteExtractor.threadSafe
+	threadSafe = True
+
 	def extract(self, filename):
 		"""Open text file stream and extract data from it.
 
@@ -163,4 +332,151 @@ class TextStreamExtractor(Extractor):
 				to process
 
 		"""
-		raise NotImplementedError		
\ No newline at end of file
+		raise NotImplementedError		
+
+class CompositeExtractor(Extractor):
+
+	"""Extractor which runs several extractors over each file, reading it once.
+
+	The file is memory-mapped (see mappedFile()) and its contents
+	given to each child extractor in the form it expects, so each
+	file is only read from disk once however many extractors there
+	are. For children which are built-in extractor types and don't
+	override extract():
+
+	* MmapByteExtractors are given the mapped buffer itself.
+	* ByteStreamExtractors using extractFromChunks() are given
+	  chunks sliced from the mapped buffer without copying.
+	* ByteStreamExtractors which override extractFromStream() are
+	  given a read-only stream over the mapped buffer.
+	* TextStreamExtractors are given a text stream which decodes
+	  the mapped buffer incrementally, in the same way open() would.
+	* ByteExtractors share a single copy of the file's bytes.
+	* TextExtractors share the file's contents, decoded once in the
+	  same way open() would.
+
+	Any other child is run on the filename as normal, so reads the
+	file itself. The data extracted from a file is a list containing
+	the result of each child extractor, in the order the extractors
+	were given.
+
+	"""
+
+	def __init__(self, extractors):
+		"""Construct instance of CompositeExtractor.
+
+		Arguments:
+		extractors -- List of extractors to run on every file
+
+		"""
+		self.extractors = list(extractors)
+		# Children's thread safety applies to the composite too
+		self.threadSafe = all(getattr(extractor, "threadSafe", False)
+			for extractor in self.extractors)
+		# Identify the combination of children, so cached data
+		# isn't shared between composites of different extractors
+		self.version = tuple(extractorIdentity(extractor) for extractor in self.extractors)
+
+	def extract(self, filename):
+		"""Return list containing data each child extractor extracts from a file.
+
+		Arguments:
+		filename -- Name of the file to extract data from
+					TypeError is raised if this is not a string.
+
+		"""
+		if not isinstance(filename, str):
+			raise TypeError("Filename must be a string")
+		with mappedFile(filename) as buffer:
+			contents = _SharedContents(buffer)
+			return [ self._extractFromContents(extractor, filename, contents)
+				for extractor in self.extractors ]
+
+	def _extractFromContents(self, extractor, filename, contents):
+		extractorClass = type(extractor)
+		if isinstance(extractor, MmapByteExtractor):
+			if extractorClass.extract is MmapByteExtractor.extract:
+				return extractor.extractFromBuffer(contents.buffer)
+		elif isinstance(extractor, ByteExtractor):
+			if extractorClass.extract is ByteExtractor.extract:
+				return extractor.extractFromBytes(contents.data())
+		elif isinstance(extractor, ByteStreamExtractor):
+			if extractorClass.extract is ByteStreamExtractor.extract:
+				if extractorClass.extractFromStream is ByteStreamExtractor.extractFromStream:
+					blockSize = extractor.blockSize or extractor.MIN_BLOCK_SIZE
+					return extractor.extractFromChunks(contents.iterChunks(blockSize))
+				return extractor.extractFromStream(contents.stream())
+		elif isinstance(extractor, TextExtractor):
+			if extractorClass.extract is TextExtractor.extract:
+				return extractor.extractFromString(contents.text())
+		elif isinstance(extractor, TextStreamExtractor):
+			if extractorClass.extract is TextStreamExtractor.extract:
+				return extractor.extractFromStream(io.TextIOWrapper(contents.stream()))
+		return extractor.extract(filename)
+
+
+class _SharedContents:
+
+	"""Contents of a mapped file, converted to other forms on first use."""
+
+	def __init__(self, buffer):
+		self.buffer = buffer
+		self._data = None
+		self._text = None
+
+	def data(self):
+		if self._data is None:
+			self._data = bytes(self.buffer)
+		return self._data
+
+	def stream(self):
+		"""Return new binary stream reading the buffer from the start, without copying it."""
+		return io.BufferedReader( _BufferReader(self.buffer) )
+
+	def text(self):
+		if self._text is None:
+			# Decode exactly as open(filename, "r") would
+			self._text = io.TextIOWrapper(self.stream()).read()
+		return self._text
+
+	def iterChunks(self, blockSize):
+		for start in range(0, len(self.buffer), blockSize):
+			yield self.buffer[start:start + blockSize]
+
+
+class _BufferReader(io.RawIOBase):
+
+	"""Read-only, seekable raw stream over a buffer such as a memory-mapped file."""
+
+	def __init__(self, buffer):
+		self._buffer = buffer
+		self._position = 0
+
+	def readable(self):
+		return True
+
+	def seekable(self):
+		return True
+
+	def readinto(self, b):
+		start = self._position
+		numRead = max(0, min(len(b), len(self._buffer) - start))
+		with memoryview(b) as target:
+			target.cast("B")[:numRead] = self._buffer[start:start + numRead]
+		self._position += numRead
+		return numRead
+
+	def seek(self, offset, whence = io.SEEK_SET):
+		if whence == io.SEEK_CUR:
+			offset += self._position
+		elif whence == io.SEEK_END:
+			offset += len(self._buffer)
+		elif whence != io.SEEK_SET:
+			raise ValueError("Invalid whence ({})".format(whence))
+		if offset < 0:
+			raise ValueError("Negative seek position {}".format(offset))
+		self._position = offset
+		return offset
+
+	def tell(self):
+		return self._position
@@ -0,0 +1,109 @@
+"""Contains the record used to pass files and their metadata through the pipeline."""
+
+import os
+
+
+class FileInfo:
+
+	"""Path to a file, along with metadata about it which is fetched at most once.
+
+	Searchers which list directories with os.scandir() create these
+	from the DirEntry objects it returns, so metadata the directory
+	listing already contains is used rather than calling os.stat()
+	again. Otherwise, os.stat() is only called the first time any
+	metadata other than the path is needed, and the result is kept
+	for every later component which needs it.
+
+	"""
+
+	__slots__ = ("path", "_entry", "_stat")
+
+	def __init__(self, path, entry = None, stat = None):
+		"""Construct instance of FileInfo.
+
+		Arguments:
+		path -- Absolute path to the file
+
+		Keyword arguments:
+		entry -- os.DirEntry for the file, used to fetch its metadata.
+				 (default: None)
+		stat -- Result of os.stat() for the file, if it's already
+				known. (default: None)
+
+		"""
+		self.path = path
+		self._entry = entry
+		self._stat = stat
+
+	@classmethod
+	def fromEntry(cls, entry):
+		"""Return FileInfo for the file an os.DirEntry refers to."""
+		return cls(entry.path, entry)
+
+	def stat(self):
+		"""Return result of os.stat() for the file, calling it on first use.
+
+		As with os.stat(), symbolic links are followed and OSError is
+		raised if the file cannot be stat'd.
+
+		"""
+		if self._stat is None:
+			if self._entry is not None:
+				self._stat = self._entry.stat()
+			else:
+				self._stat = os.stat(self.path)
+			# Everything the entry could provide is in the stat now
+			self._entry = None
+		return self._stat
+
+	def tryStat(self):
+		"""Return result of os.stat() for the file, or None if it cannot be stat'd."""
+		try:
+			return self.stat()
+		except OSError:
+			return None
+
+	@property
+	def size(self):
+		"""Size of the file in bytes."""
+		return self.stat().st_size
+
+	@property
+	def mtime(self):
+		"""Time the file was last modified, in seconds since the epoch."""
+		return self.stat().st_mtime
+
+	@property
+	def mtimeNs(self):
+		"""Time the file was last modified, in nanoseconds since the epoch."""
+		return self.stat().st_mtime_ns
+
+	@property
+	def inode(self):
+		"""Inode number of the file."""
+		if self._stat is None and self._entry is not None and not self._entry.is_symlink():
+			# Directory listings include this on POSIX, so it's free
+			return self._entry.inode()
+		return self.stat().st_ino
+
+	@property
+	def device(self):
+		"""Identifier of the device the file is on."""
+		return self.stat().st_dev
+
+	def __fspath__(self):
+		return self.path
+
+	def __str__(self):
+		return self.path
+
+	def __repr__(self):
+		return "FileInfo({!r})".format(self.path)
+
+	def __eq__(self, other):
+		if isinstance(other, FileInfo):
+			return self.path == other.path
+		return NotImplemented
+
+	def __hash__(self):
+		return hash(self.path)
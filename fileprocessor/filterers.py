@@ -1,10 +1,88 @@
 """Contains all built-in Filterer classes."""
 
-import collections
+import collections.abc
 import fnmatch
 import os
+import re
+import time
 
 from fileprocessor.abstracts import Filterer
+from fileprocessor.fileinfo import FileInfo
+
+
+def _combineGlobPatterns(patterns, anchorEnd = True):
+	"""Return regex source matching any of the glob patterns.
+
+	fnmatch.translate() wraps each pattern as "(?s:...)\\Z". Unwrapping
+	the patterns so the flags and end anchor are only given once lets
+	the regex engine reject most branches on their first character.
+	If 'anchorEnd' is False, the patterns don't have to match the end
+	of the string.
+
+	"""
+	bodies = []
+	for pattern in patterns:
+		translated = fnmatch.translate(pattern)
+		if translated.startswith("(?s:") and translated.endswith(")\\Z"):
+			bodies.append( "(?:{})".format(translated[4:-3]) )
+		else: # unknown format, so use the translation as it is
+			bodies.append( "(?:{})".format(translated) )
+	return "(?s:{}){}".format("|".join(bodies), "\\Z" if anchorEnd else "")
+
+def compileGlobPatterns(patterns, prefix = False):
+	"""Compile list of glob patterns into a single function which tests paths against them.
+
+	The returned function takes a path and returns a true value if
+	the path matches any of the patterns, using the same rules as
+	fnmatch.fnmatch(). The patterns are combined into as few regular
+	expressions as possible, so each path is scanned a small, fixed
+	number of times no matter how many patterns there are. Returns
+	None if there are no patterns.
+
+	Arguments:
+	patterns -- List of glob patterns to compile
+
+	Keyword arguments:
+	prefix -- If set to True, the function tests whether the start of
+			  the path matches any of the patterns, rather than the
+			  whole path. (default: False)
+
+	"""
+	if not patterns:
+		return None
+
+	# A pattern starting with '*' matches a path if the rest of the
+	# pattern matches the end of the path. Searching for the rest is
+	# much quicker than matching the leading '*' against every prefix.
+	anchored = []
+	unanchored = []
+	for pattern in patterns:
+		pattern = os.path.normcase(pattern)
+		if pattern.startswith("*"):
+			pattern = pattern.lstrip("*")
+			if not pattern: # matches everything
+				return lambda path: True
+			unanchored.append(pattern)
+		else:
+			anchored.append(pattern)
+
+	regexes = []
+	if anchored:
+		regexes.append( re.compile(_combineGlobPatterns(anchored, not prefix)).match )
+	if unanchored:
+		regexes.append( re.compile(_combineGlobPatterns(unanchored, not prefix)).search )
+	if len(regexes) == 1:
+		matches = regexes[0]
+	else:
+		matchAnchored, searchUnanchored = regexes
+		matches = lambda path: matchAnchored(path) or searchUnanchored(path)
+
+	# fnmatch.fnmatch() normalises the case of paths, which does
+	# nothing on POSIX, so only pay for the extra call elsewhere
+	if os.path.normcase("A/") == "A/":
+		return matches
+	else:
+		return lambda path: matches(os.path.normcase(path))
 
 
 class ExcludeListFilterer(Filterer):
@@ -17,12 +95,23 @@ class ExcludeListFilterer(Filterer):
 		Arguments:
 		excludeList -- List of glob patterns which will be used as
 					   as a black list to remove files in the list
-					   from the final listing.
+					   from the final listing. The patterns are
+					   compiled here, so changing the list later
+					   has no effect.
 
 		"""
-		if not isinstance(excludeList, collections.Iterable):
+		if not isinstance(excludeList, collections.abc.Iterable):
 			raise TypeError("Exclusion list should be an iterable collection of strings")
-		self.excludeList = excludeList
+		self.excludeList = list(excludeList)
+		self._matches = compileGlobPatterns(self.excludeList)
+		# A pattern ending in '*' matches every path starting with
+		# something the rest of the pattern matches. So it matches
+		# everything under a directory if the rest of the pattern
+		# matches the start of the directory's path plus a separator
+		# (e.g. "*/.git/" matches "/src/.git/sub/", so "*/.git/*"
+		# matches every file under "/src/.git/sub").
+		self._prunes = compileGlobPatterns([ pattern[:-1]
+			for pattern in self.excludeList if pattern.endswith("*") ], prefix=True)
 
 	def filter(self, fileListing):
 		"""Filter file listing based on stored glob patterns.
@@ -34,28 +123,44 @@ class ExcludeListFilterer(Filterer):
 					   files to filter.
 
 		"""
-		if not isinstance(fileListing, collections.Iterable):
+		return list(self.iterFilter(fileListing))
+
+	def iterFilter(self, fileListing):
+		"""Lazily filter file listing based on stored glob patterns.
+
+		Returns iterator over the files which passed the filter.
+
+		Arguments:
+		fileListing -- An iterable containing the absolute paths of
+					   the files to filter.
+
+		"""
+		if not isinstance(fileListing, collections.abc.Iterable):
 			raise TypeError("List of files to filter should be an iterable collection of strings")
-		newListing = list(fileListing)
-
-		# Go through each entry, checking if they match one of the
-		# glob patterns. If an entry does, it is removed
-		i = 0
-		while i < len(newListing):
-			filtered = False
-			for exclusion in self.excludeList:
-				if fnmatch.fnmatch(newListing[i], exclusion):
-					filtered = True
-					del newListing[i]
-					break
-			# If the current element was not deleted, increment
-			# the index into the file listing. We don't do it if
-			# an element was deleted as the next element would
-			# have moved ot the delete elements's index
-			if not filtered:
-				i += 1
+		matches = self._matches
+		if matches is None:
+			return iter(fileListing)
+		return ( path for path in fileListing if not matches(path) )
+
+	def accepts(self, path):
+		"""Return True if file does not match any of the stored glob patterns.
+
+		Arguments:
+		path -- Absolute path of the file to test
+
+		"""
+		return self._matches is None or not self._matches(path)
 
-		return newListing
+	def prunes(self, directory):
+		"""Return True if every file under directory matches one of the stored glob patterns.
+
+		Only patterns ending in "*" are used to prune directories.
+
+		Arguments:
+		directory -- Absolute path of the directory to test
+
+		"""
+		return self._prunes is not None and bool(self._prunes(os.path.join(directory, "")))
 
 
 class IncludeListFilterer(Filterer):
@@ -68,12 +173,15 @@ class IncludeListFilterer(Filterer):
 		Arguments:
 		includeList -- List of glob patterns which will be used as
 					   as a white list to remove files NOT in the list
-					   from the final listing.
+					   from the final listing. The patterns are
+					   compiled here, so changing the list later
+					   has no effect.
 
 		"""
-		if not isinstance(includeList, collections.Iterable):
+		if not isinstance(includeList, collections.abc.Iterable):
 			raise TypeError("Inclusion list should be an iterable collection of strings")
-		self.includeList = includeList
+		self.includeList = list(includeList)
+		self._matches = compileGlobPatterns(self.includeList)
 
 	def filter(self, fileListing):
 		"""Filter file listing based on stored glob patterns.
@@ -85,34 +193,101 @@ class IncludeListFilterer(Filterer):
 					   files to filter.
 
 		"""
-		if not isinstance(fileListing, collections.Iterable):
+		return list(self.iterFilter(fileListing))
+
+	def iterFilter(self, fileListing):
+		"""Lazily filter file listing based on stored glob patterns.
+
+		Returns iterator over the files which passed the filter.
+
+		Arguments:
+		fileListing -- An iterable containing the absolute paths of
+					   the files to filter.
+
+		"""
+		if not isinstance(fileListing, collections.abc.Iterable):
 			raise TypeError("List of files to filter should be an iterable collection of strings")
+		matches = self._matches
+		if matches is None:
+			return iter(())
+		return ( path for path in fileListing if matches(path) )
 
-		# Add any files from the original listing which match
-		# one of the whitelist patterns.
-		newListing = []
-		for elem in fileListing:
-			for pattern in self.includeList:
-				if fnmatch.fnmatch(elem, pattern):
-					newListing.append(elem)
-					break
-		return newListing		
+	def accepts(self, path):
+		"""Return True if file matches one of the stored glob patterns.
+
+		Arguments:
+		path -- Absolute path of the file to test
+
+		"""
+		return self._matches is not None and bool(self._matches(path))
 
 
 class ExtensionFilterer(Filterer):
 
-	def __init__(self, allowedExtensions):
+	"""Filterer which filters files that don't have one of the allowed extensions."""
+
+	def __init__(self, allowedExtensions, caseSensitive = True):
 		"""Construct instance of ExtensionFilterer.
 
 		Arguments:
 		allowedExtensions -- List of allowed extensions (e.g. ["txt", "py"]).
 							 Any files which don't have these extensions
-							 will be removed.
+							 will be removed. Compound extensions such as
+							 "tar.gz" are allowed. A leading "." on an
+							 extension is ignored.
+
+		Keyword arguments:
+		caseSensitive -- If set to False, extensions are compared
+						 without regard to case, so "JPG" and "jpg"
+						 are treated as the same extension. (default: True)
 
 		"""
-		if not isinstance(allowedExtensions, collections.Iterable):
+		if not isinstance(allowedExtensions, collections.abc.Iterable):
 			raise TypeError("Allowed extension list should be an iterable collection of strings")
-		self.allowedExtensions = allowedExtensions
+		self.allowedExtensions = list(allowedExtensions)
+		self.caseSensitive = caseSensitive
+
+		extensions = set()
+		for extension in self.allowedExtensions:
+			if extension.startswith("."):
+				extension = extension[1:]
+			if not caseSensitive:
+				extension = extension.casefold()
+			extensions.add(extension)
+		self._extensions = frozenset(extensions)
+		# Number of dot-separated parts in the longest extension, which
+		# is how many suffixes of each filename need to be checked
+		self._maxParts = max( (extension.count(".") + 1 for extension in extensions), default=0 )
+
+	def accepts(self, path):
+		"""Return True if file at given path has one of the allowed extensions.
+
+		As with os.path.splitext(), leading dots in the filename are
+		not treated as the start of an extension, so ".hgignore" has
+		no extension. A file with no extension only passes if "" is
+		one of the allowed extensions.
+
+		Arguments:
+		path -- Path to the file to check
+
+		"""
+		name = os.path.basename(path).lstrip(".")
+		if not self.caseSensitive:
+			name = name.casefold()
+		parts = name.rsplit(".", self._maxParts)
+		if len(parts) == 1:
+			return "" in self._extensions
+		# Check the suffixes made of the last part, the last two
+		# parts and so on. The first part is the name itself, so
+		# it's never part of the extension.
+		extension = parts[-1]
+		if extension in self._extensions:
+			return True
+		for i in range(len(parts) - 2, 0, -1):
+			extension = parts[i] + "." + extension
+			if extension in self._extensions:
+				return True
+		return False
 
 	def filter(self, fileListing):
 		"""Filter file listing based on stored extension whitelist.
@@ -124,18 +299,573 @@ class ExtensionFilterer(Filterer):
 					   files to filter.
 
 		"""
-		if not isinstance(fileListing, collections.Iterable):
+		return list(self.iterFilter(fileListing))
+
+	def iterFilter(self, fileListing):
+		"""Lazily filter file listing based on stored extension whitelist.
+
+		Returns iterator over the files which passed the filter.
+
+		Arguments:
+		fileListing -- An iterable containing the absolute paths of
+					   the files to filter.
+
+		"""
+		if not isinstance(fileListing, collections.abc.Iterable):
 			raise TypeError("List of files to filter should be an iterable collection of strings")
-		newListing = list(fileListing)
-
-		i = 0
-		while i < len(newListing):
-			name, extension = os.path.splitext(newListing[i])
-			# Increment index and allow file if its extension is in
-			# the white list
-			if extension[1:] in self.allowedExtensions:
-				i += 1
+		if not self._extensions:
+			return iter(())
+		accepts = self.accepts
+		return ( path for path in fileListing if accepts(path) )
+
+
+class SizeFilterer(Filterer):
+
+	"""Filterer which filters files whose size is outside a given range."""
+
+	def __init__(self, minSize = None, maxSize = None):
+		"""Construct instance of SizeFilterer.
+
+		Keyword arguments:
+		minSize -- Smallest size, in bytes, a file can be to pass the
+				   filter. If None, there is no lower limit. (default: None)
+		maxSize -- Largest size, in bytes, a file can be to pass the
+				   filter. If None, there is no upper limit. (default: None)
+
+		"""
+		if minSize is not None and maxSize is not None and minSize > maxSize:
+			raise ValueError("Minimum size cannot be greater than maximum size")
+		self.minSize = minSize
+		self.maxSize = maxSize
+
+	def acceptsInfo(self, info):
+		"""Return True if file's size is within the allowed range.
+
+		Files which cannot be stat'd do not pass the filter.
+
+		Arguments:
+		info -- FileInfo of the file to test
+
+		"""
+		stat = info.tryStat()
+		if stat is None:
+			return False
+		size = stat.st_size
+		return ((self.minSize is None or size >= self.minSize)
+			and (self.maxSize is None or size <= self.maxSize))
+
+	def accepts(self, path):
+		"""Return True if size of file at given path is within the allowed range.
+
+		Arguments:
+		path -- Absolute path of the file to test
+
+		"""
+		return self.acceptsInfo( FileInfo(path) )
+
+	def filter(self, fileListing):
+		"""Filter file listing based on the size of the files.
+
+		Returns NEW list containing the the files which passed the filter.
+
+		Arguments:
+		fileListing -- A list containing the absolute paths of the
+					   files to filter.
+
+		"""
+		return list(self.iterFilter(fileListing))
+
+	def iterFilter(self, fileListing):
+		"""Lazily filter file listing based on the size of the files.
+
+		Returns iterator over the files which passed the filter.
+
+		Arguments:
+		fileListing -- An iterable containing the absolute paths of
+					   the files to filter.
+
+		"""
+		if not isinstance(fileListing, collections.abc.Iterable):
+			raise TypeError("List of files to filter should be an iterable collection of strings")
+		accepts = self.accepts
+		return ( path for path in fileListing if accepts(path) )
+
+
+class MTimeFilterer(Filterer):
+
+	"""Filterer which filters files last modified outside a given time range."""
+
+	def __init__(self, after = None, before = None):
+		"""Construct instance of MTimeFilterer.
+
+		Times can be given as seconds since the epoch or as
+		datetime.datetime objects.
+
+		Keyword arguments:
+		after -- Files must have been modified at or after this time
+				 to pass the filter. If None, there is no lower limit.
+				 (default: None)
+		before -- Files must have been modified before this time to
+				  pass the filter. If None, there is no upper limit.
+				  (default: None)
+
+		"""
+		self.after = self._toTimestamp(after)
+		self.before = self._toTimestamp(before)
+		if self.after is not None and self.before is not None and self.after > self.before:
+			raise ValueError("Start of time range cannot be after its end")
+
+	@staticmethod
+	def _toTimestamp(value):
+		# bool is a subclass of int, but True is never meant as a time
+		if isinstance(value, bool):
+			raise TypeError("Times should be numbers or datetime objects")
+		if value is None or isinstance(value, (int, float)):
+			return value
+		try:
+			return value.timestamp()
+		except AttributeError:
+			raise TypeError("Times should be numbers or datetime objects") from None
+
+	def acceptsInfo(self, info):
+		"""Return True if file was last modified within the allowed time range.
+
+		Files which cannot be stat'd do not pass the filter.
+
+		Arguments:
+		info -- FileInfo of the file to test
+
+		"""
+		stat = info.tryStat()
+		if stat is None:
+			return False
+		mtime = stat.st_mtime
+		return ((self.after is None or mtime >= self.after)
+			and (self.before is None or mtime < self.before))
+
+	def accepts(self, path):
+		"""Return True if file at given path was last modified within the allowed time range.
+
+		Arguments:
+		path -- Absolute path of the file to test
+
+		"""
+		return self.acceptsInfo( FileInfo(path) )
+
+	def filter(self, fileListing):
+		"""Filter file listing based on when the files were last modified.
+
+		Returns NEW list containing the the files which passed the filter.
+
+		Arguments:
+		fileListing -- A list containing the absolute paths of the
+					   files to filter.
+
+		"""
+		return list(self.iterFilter(fileListing))
+
+	def iterFilter(self, fileListing):
+		"""Lazily filter file listing based on when the files were last modified.
+
+		Returns iterator over the files which passed the filter.
+
+		Arguments:
+		fileListing -- An iterable containing the absolute paths of
+					   the files to filter.
+
+		"""
+		if not isinstance(fileListing, collections.abc.Iterable):
+			raise TypeError("List of files to filter should be an iterable collection of strings")
+		accepts = self.accepts
+		return ( path for path in fileListing if accepts(path) )
+
+
+def decidesPerFile(filterer):
+	"""Return True if filterer can test files one at a time using accepts().
+
+	This is the case for duck-typed filterers which have an accepts()
+	method and Filterer subclasses which override Filterer.accepts()
+	or Filterer.acceptsInfo().
+
+	"""
+	filtererClass = type(filterer)
+	accepts = getattr(filtererClass, "accepts", None)
+	if accepts is not None and accepts is not Filterer.accepts:
+		return True
+	acceptsInfo = getattr(filtererClass, "acceptsInfo", None)
+	return acceptsInfo is not None and acceptsInfo is not Filterer.acceptsInfo
+
+def _infoAcceptor(filterer):
+	"""Return function which tests a FileInfo against a per-file filterer."""
+	acceptsInfo = getattr(filterer, "acceptsInfo", None)
+	if acceptsInfo is not None:
+		return acceptsInfo
+	accepts = filterer.accepts
+	return lambda info: accepts(info.path)
+
+
+class FilterStatistics:
+
+	"""Records how a filterer in a FilterChain has performed."""
+
+	__slots__ = ("filterer", "tested", "rejected", "seconds")
+
+	def __init__(self, filterer):
+		self.filterer = filterer
+		# Number of files tested and number of those that were rejected
+		self.tested = 0
+		self.rejected = 0
+		# Total time spent testing files, in seconds. Only measured
+		# for filterers which decide per file.
+		self.seconds = 0.0
+
+	@property
+	def passed(self):
+		"""Number of files which passed the filter."""
+		return self.tested - self.rejected
+
+	@property
+	def rejectRate(self):
+		"""Fraction of tested files which were rejected."""
+		return (self.rejected / self.tested) if self.tested else 0.0
+
+	@property
+	def costPerFile(self):
+		"""Average time spent testing one file, in seconds."""
+		return (self.seconds / self.tested) if self.tested else 0.0
+
+	def costPerRejection(self):
+		"""Return expected time spent to reject one file.
+
+		Filterers should be run in ascending order of this value to
+		reject files as cheaply as possible. Filterers which have not
+		rejected anything yet are placed last.
+
+		"""
+		if self.rejected == 0:
+			return float("inf")
+		return self.seconds / self.rejected
+
+	def __repr__(self):
+		return "FilterStatistics({!r}, tested={}, rejected={}, seconds={:.6f})".format(
+			self.filterer, self.tested, self.rejected, self.seconds)
+
+
+class _FusedFilterers:
+
+	"""Tests files against several per-file filterers in one pass.
+
+	Files are rejected as soon as one filterer rejects them. The
+	filterers are periodically reordered so the ones which reject
+	the most files for the least time are tried first.
+
+	To keep the overhead of gathering statistics low, only every
+	SAMPLE_INTERVAL'th file is timed, and the number of files each
+	filterer tested is worked out from the number of rejections
+	whenever the filterers are reordered.
+
+	"""
+
+	SAMPLE_INTERVAL = 16
+
+	def __init__(self, statistics, reorderInterval):
+		self.statistics = statistics
+		self.reorderInterval = reorderInterval or 0
+		# Files given to the filterers and files rejected by each
+		# filterer since the statistics were last brought up to date
+		self._pendingTested = 0
+		self._pendingRejected = {}
+		self._untilSample = self.SAMPLE_INTERVAL
+		self._prepare()
+
+	def _prepare(self):
+		self._acceptors = [ stats.filterer.accepts for stats in self.statistics ]
+		self._infoAcceptors = [ _infoAcceptor(stats.filterer) for stats in self.statistics ]
+
+	def updateStatistics(self):
+		"""Bring the tested and rejected counts of every filterer up to date."""
+		remaining = self._pendingTested
+		for stats in self.statistics:
+			rejected = self._pendingRejected.get(id(stats), 0)
+			stats.tested += remaining
+			stats.rejected += rejected
+			remaining -= rejected
+		self._pendingTested = 0
+		self._pendingRejected = {}
+
+	def _reorder(self):
+		self.updateStatistics()
+		self.statistics.sort(key=FilterStatistics.costPerRejection)
+		self._prepare()
+
+	def _testTimed(self, path, acceptors):
+		"""Return statistics of the filterer which rejected the file, or None, timing each filterer."""
+		clock = time.perf_counter
+		for stats, accepts in zip(self.statistics, acceptors):
+			start = clock()
+			accepted = accepts(path)
+			# Scale up so 'seconds' estimates time spent on all files
+			stats.seconds += (clock() - start) * self.SAMPLE_INTERVAL
+			if not accepted:
+				return stats
+		return None
+
+	def _reject(self, stats):
+		key = id(stats)
+		self._pendingRejected[key] = self._pendingRejected.get(key, 0) + 1
+
+	def accepts(self, path, infos = False):
+		"""Return True if file passes all of the fused filterers.
+
+		If 'infos' is True, the file is given as a FileInfo rather
+		than a path.
+
+		"""
+		acceptors = self._infoAcceptors if infos else self._acceptors
+		self._untilSample -= 1
+		if self._untilSample:
+			rejectedBy = None
+			for stats, accepts in zip(self.statistics, acceptors):
+				if not accepts(path):
+					rejectedBy = stats
+					break
+		else:
+			self._untilSample = self.SAMPLE_INTERVAL
+			rejectedBy = self._testTimed(path, acceptors)
+		if rejectedBy is not None:
+			self._reject(rejectedBy)
+
+		self._pendingTested += 1
+		if self._pendingTested >= self.reorderInterval > 0:
+			self._reorder()
+		return rejectedBy is None
+
+	def iterFilter(self, fileListing, infos = False):
+		"""Return iterator over the files which pass all of the fused filterers.
+
+		Does the same as calling accepts() on each file, but keeps
+		the hot loop's state in local variables. If 'infos' is True,
+		the listing contains FileInfo objects rather than paths.
+
+		"""
+		sampleInterval = self.SAMPLE_INTERVAL
+		acceptors = self._infoAcceptors if infos else self._acceptors
+		for path in fileListing:
+			self._pendingTested += 1
+			self._untilSample -= 1
+			if self._untilSample:
+				for index, accepts in enumerate(acceptors):
+					if not accepts(path):
+						self._reject(self.statistics[index])
+						break
+				else:
+					yield path
+			else:
+				self._untilSample = sampleInterval
+				rejectedBy = self._testTimed(path, acceptors)
+				if rejectedBy is None:
+					yield path
+				else:
+					self._reject(rejectedBy)
+
+			if self._pendingTested >= self.reorderInterval > 0:
+				self._reorder()
+				acceptors = self._infoAcceptors if infos else self._acceptors
+
+
+class FilterChain(Filterer):
+
+	"""Filterer which combines multiple filterers, testing each file against them in one pass.
+
+	Running filterers one after another means every filterer copies
+	the whole file listing. Instead, FilterChain tests each file
+	against every filterer in turn, stopping at the first one which
+	rejects it, so no intermediate listings are built. Statistics on
+	how many files each filterer tested and rejected, and how long it
+	took, are kept in the 'statistics' attribute. These are used to
+	reorder the filterers so the cheapest, most selective ones run
+	first.
+
+	Only filterers which decide whether to keep each file on its own
+	(see Filterer.accepts()) can be fused and reordered like this.
+	Any other filterer is run on the listing as a whole, in the same
+	position relative to the other filterers as it was given in, so
+	the result is always the same as running the filterers in order.
+
+	"""
+
+	# Number of files tested between each reordering of the filterers
+	DEFAULT_REORDER_INTERVAL = 1024
+
+	def __init__(self, filterers, reorderInterval = DEFAULT_REORDER_INTERVAL):
+		"""Construct instance of FilterChain.
+
+		Arguments:
+		filterers -- List of filterers to combine
+
+		Keyword arguments:
+		reorderInterval -- Number of files to test between each
+						   reordering of the filterers. If 0 or None,
+						   filterers are always run in the order given.
+						   (default: DEFAULT_REORDER_INTERVAL)
+
+		"""
+		if not isinstance(filterers, collections.abc.Iterable):
+			raise TypeError("Collection of filterers to use must be an iterable object")
+		self.filterers = list(filterers)
+		self.reorderInterval = reorderInterval
+		self._statistics = [ FilterStatistics(filterer) for filterer in self.filterers ]
+
+		# Group consecutive per-file filterers so they are fused
+		# together. Other filterers are stages of their own.
+		self._stages = []
+		fused = []
+		for stats in self._statistics:
+			if decidesPerFile(stats.filterer):
+				fused.append(stats)
+				continue
+			if fused:
+				self._stages.append( _FusedFilterers(fused, reorderInterval) )
+				fused = []
+			self._stages.append(stats)
+		if fused:
+			self._stages.append( _FusedFilterers(fused, reorderInterval) )
+
+	@property
+	def statistics(self):
+		"""List of FilterStatistics for each filterer, in the order the filterers were given."""
+		for stage in self._stages:
+			if isinstance(stage, _FusedFilterers):
+				stage.updateStatistics()
+		return self._statistics
+
+	def filter(self, fileListing):
+		"""Filter file listing using every filterer in the chain.
+
+		Returns NEW list containing the the files which passed all of the filterers.
+
+		Arguments:
+		fileListing -- A list containing the absolute paths of the
+					   files to filter.
+
+		"""
+		return list(self.iterFilter(fileListing))
+
+	def iterFilter(self, fileListing):
+		"""Lazily filter file listing using every filterer in the chain.
+
+		Returns iterator over the files which passed all of the filterers.
+
+		Arguments:
+		fileListing -- An iterable containing the absolute paths of
+					   the files to filter.
+
+		"""
+		if not isinstance(fileListing, collections.abc.Iterable):
+			raise TypeError("List of files to filter should be an iterable collection of strings")
+		return self._iterFilterStages(iter(fileListing), False)
+
+	def iterFilterInfo(self, infos):
+		"""Lazily filter iterable of FileInfo objects using every filterer in the chain.
+
+		Returns iterator over the FileInfo objects of the files which
+		passed all of the filterers. Per-file filterers are given the
+		FileInfo objects (see Filterer.acceptsInfo()), so metadata
+		fetched by one filterer is reused by the others. Any other
+		filterers are given the paths of the files.
+
+		Arguments:
+		infos -- An iterable containing FileInfo objects for the
+				 files to filter.
+
+		"""
+		if not isinstance(infos, collections.abc.Iterable):
+			raise TypeError("List of files to filter should be an iterable collection of FileInfo objects")
+		return self._iterFilterStages(iter(infos), True)
+
+	def _iterFilterStages(self, fileListing, infos):
+		for stage in self._stages:
+			if isinstance(stage, _FusedFilterers):
+				fileListing = stage.iterFilter(fileListing, infos)
 			else:
-				del newListing[i]
+				fileListing = self._iterFilterWhole(stage, fileListing, infos)
+		return fileListing
+
+	def _iterFilterWhole(self, stats, fileListing, infos = False):
+		"""Run a filterer which doesn't decide per file, counting files in and out.
 
-		return newListing
\ No newline at end of file
+		If 'infos' is True, the listing contains FileInfo objects,
+		which are swapped for their paths when given to the filterer
+		and swapped back for the paths it passes.
+
+		"""
+		# FileInfo objects of files given to the filterer, by path
+		infosByPath = {}
+		def countTested(fileListing):
+			for path in fileListing:
+				stats.tested += 1
+				if infos:
+					infosByPath[path.path] = path
+					path = path.path
+				yield path
+
+		testedBefore = stats.tested
+		rejectedBefore = stats.rejected
+		iterFilter = getattr(stats.filterer, "iterFilter", None)
+		if iterFilter:
+			passed = iterFilter( countTested(fileListing) )
+		else:
+			passed = iter(stats.filterer.filter( list(countTested(fileListing)) ))
+		numPassed = 0
+		for path in passed:
+			numPassed += 1
+			stats.rejected = rejectedBefore + (stats.tested - testedBefore - numPassed)
+			if infos:
+				info = infosByPath.pop(path, None)
+				# Filterers may pass paths they weren't given
+				path = info if info is not None else FileInfo(path)
+			yield path
+		stats.rejected = rejectedBefore + (stats.tested - testedBefore - numPassed)
+
+	def accepts(self, path):
+		"""Return True if a single file passes all of the filterers.
+
+		Arguments:
+		path -- Absolute path of the file to test
+
+		"""
+		return self._accepts(path, False)
+
+	def acceptsInfo(self, info):
+		"""Return True if a single file passes all of the filterers, given its FileInfo.
+
+		Arguments:
+		info -- FileInfo of the file to test
+
+		"""
+		return self._accepts(info, True)
+
+	def prunes(self, directory):
+		"""Return True if any filterer in the chain rules out every file under directory.
+
+		Arguments:
+		directory -- Absolute path of the directory to test
+
+		"""
+		for filterer in self.filterers:
+			prunes = getattr(filterer, "prunes", None)
+			if prunes is not None and prunes(directory):
+				return True
+		return False
+
+	def _accepts(self, path, infos):
+		for stage in self._stages:
+			if isinstance(stage, _FusedFilterers):
+				if not stage.accepts(path, infos):
+					return False
+			else:
+				stage.tested += 1
+				if not stage.filterer.filter([ path.path if infos else path ]):
+					stage.rejected += 1
+					return False
+		return True
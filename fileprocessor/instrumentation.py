@@ -0,0 +1,185 @@
+"""Contains classes for measuring where the time in a FileProcessor run goes."""
+
+import time
+
+
+class StageStatistics:
+
+	"""Records how one stage of a run (searching, filtering or extraction) performed.
+
+	'seconds' only counts time spent in the stage itself, not time
+	spent in earlier stages it pulled files from. 'bytes' is the
+	total size of the files which entered the stage, and is only
+	recorded for extraction.
+
+	"""
+
+	__slots__ = ("name", "seconds", "filesIn", "filesOut", "bytes", "errors")
+
+	def __init__(self, name):
+		self.name = name
+		self.seconds = 0.0
+		self.filesIn = 0
+		self.filesOut = 0
+		self.bytes = 0
+		self.errors = 0
+
+	@property
+	def filesPerSecond(self):
+		"""Number of files which left the stage per second spent in it."""
+		return (self.filesOut / self.seconds) if self.seconds else 0.0
+
+	@property
+	def mbPerSecond(self):
+		"""Megabytes which entered the stage per second spent in it."""
+		return (self.bytes / (1024 * 1024) / self.seconds) if self.seconds else 0.0
+
+	def asDict(self):
+		"""Return dictionary containing the statistics, e.g. for serialising as JSON."""
+		return {
+			"name" : self.name,
+			"seconds" : self.seconds,
+			"filesIn" : self.filesIn,
+			"filesOut" : self.filesOut,
+			"bytes" : self.bytes,
+			"errors" : self.errors,
+			"filesPerSecond" : self.filesPerSecond,
+			"mbPerSecond" : self.mbPerSecond
+		}
+
+	def __repr__(self):
+		return "<StageStatistics {}: {:.3f}s, {} in, {} out, {} bytes, {} errors>".format(
+			self.name, self.seconds, self.filesIn, self.filesOut, self.bytes, self.errors)
+
+
+class RunStatistics:
+
+	"""Records how a whole FileProcessor run performed.
+
+	The 'search', 'filter' and 'extract' attributes contain the
+	StageStatistics of each stage, while 'filterers' contains the
+	FilterStatistics of each filterer (see FilterChain.statistics).
+	'seconds' is the wall-clock time the run took, including time
+	spent by the caller handling results. 'cacheHits' and
+	'duplicates' count files whose data came from the cache or the
+	deduplicator instead of the extractor. If the run was ended by
+	an exception, it's stored in 'error'.
+
+	"""
+
+	def __init__(self):
+		self.search = StageStatistics("search")
+		self.filter = StageStatistics("filter")
+		self.extract = StageStatistics("extract")
+		self.filterers = []
+		self.seconds = 0.0
+		self.cacheHits = 0
+		self.duplicates = 0
+		self.error = None
+
+	@property
+	def stages(self):
+		"""List of StageStatistics for each stage, in the order files pass through them."""
+		return [ self.search, self.filter, self.extract ]
+
+	def asDict(self):
+		"""Return dictionary containing the statistics, e.g. for serialising as JSON."""
+		return {
+			"seconds" : self.seconds,
+			"cacheHits" : self.cacheHits,
+			"duplicates" : self.duplicates,
+			"error" : None if self.error is None else repr(self.error),
+			"stages" : [ stage.asDict() for stage in self.stages ],
+			"filterers" : [ {
+				"filterer" : type(stats.filterer).__name__,
+				"tested" : stats.tested,
+				"rejected" : stats.rejected,
+				"seconds" : stats.seconds
+			} for stats in self.filterers ]
+		}
+
+
+class Instrumentation:
+
+	"""Collects statistics on FileProcessor runs and calls hooks as files move through them.
+
+	Give an instance to FileProcessor's constructor to instrument
+	its runs. The statistics of the most recent run are stored in
+	the processor's 'statistics' attribute. Subclasses can override
+	the hook methods, which do nothing by default, to follow runs
+	as they happen. Hooks are called in the thread iterating over
+	the results, never from worker threads or processes.
+
+	"""
+
+	def onFileStart(self, path):
+		"""Called when a filtered file is about to have its data extracted.
+
+		Arguments:
+		path -- Absolute path to the file
+
+		"""
+		pass
+
+	def onFileDone(self, path, data):
+		"""Called when data for a file has been extracted, or fetched from the cache or deduplicator.
+
+		Arguments:
+		path -- Absolute path to the file
+		data -- Data extracted from the file
+
+		"""
+		pass
+
+	def onStageDone(self, stage):
+		"""Called when a stage has finished processing every file.
+
+		Arguments:
+		stage -- StageStatistics of the stage
+
+		"""
+		pass
+
+	def onRunDone(self, statistics):
+		"""Called when a run has finished, including when it's ended by an exception.
+
+		Arguments:
+		statistics -- RunStatistics of the run
+
+		"""
+		pass
+
+
+def timedIterator(iterator, stage, run):
+	"""Yield items from iterator, adding time spent fetching them to a stage's statistics.
+
+	Each item yielded counts as a file leaving the stage. The first
+	exception raised by any stage of a run is counted as an error
+	of the stage it was raised in.
+
+	Arguments:
+	iterator -- Iterator to time
+	stage -- StageStatistics to record the time and files in
+	run -- RunStatistics of the run the stage is part of
+
+	"""
+	clock = time.perf_counter
+	iterator = iter(iterator)
+	while True:
+		start = clock()
+		try:
+			item = next(iterator)
+		except StopIteration:
+			stage.seconds += clock() - start
+			return
+		except Exception as e:
+			stage.seconds += clock() - start
+			# Outer stages see the same exception, but it's only
+			# counted against the innermost one
+			if run.error is None:
+				run.error = e
+				stage.errors += 1
+			raise
+		stage.seconds += clock() - start
+		stage.filesOut += 1
+		yield item
@@ -0,0 +1,253 @@
+"""Contains classes for finding the files which are slowest or most memory-hungry to extract."""
+
+import os
+import io
+import time
+import heapq
+import pstats
+import cProfile
+import tracemalloc
+
+from fileprocessor.abstracts import Extractor
+
+
+class FileProfile:
+
+	"""Records the cost of extracting data from one file.
+
+	'peakBytes' is the peak amount of memory allocated while the
+	file was being extracted, beyond what was allocated before, or
+	None if memory was not traced.
+
+	"""
+
+	__slots__ = ("path", "size", "extension", "wallSeconds", "cpuSeconds", "peakBytes")
+
+	def __init__(self, path, size, wallSeconds, cpuSeconds, peakBytes = None):
+		self.path = path
+		self.size = size
+		self.extension = os.path.splitext(path)[1].lower()
+		self.wallSeconds = wallSeconds
+		self.cpuSeconds = cpuSeconds
+		self.peakBytes = peakBytes
+
+	def __repr__(self):
+		return "<FileProfile {}: {:.4f}s wall, {:.4f}s CPU, {} bytes peak>".format(
+			self.path, self.wallSeconds, self.cpuSeconds, self.peakBytes)
+
+
+class Profiler:
+
+	"""Profiles every call to an extractor, keeping the N slowest and most memory-hungry files.
+
+	Give an instance to FileProcessor's constructor to profile its
+	runs. Profiled runs always extract one file at a time in the
+	calling thread, since CPU time and memory can only be attributed
+	to a file if nothing else is running alongside it.
+
+	The wall-clock and CPU time of every call to extract() are
+	measured. If 'traceMemory' is True, the peak memory allocated by
+	each call is measured with tracemalloc, which slows extraction
+	down considerably. If 'profileCalls' is True, every call is also
+	run under cProfile, and the combined results are available from
+	callStatistics().
+
+	Only the 'top' slowest and most memory-hungry files are kept,
+	along with totals for each file extension, so memory use does
+	not grow with the number of files profiled.
+
+	"""
+
+	def __init__(self, top = 10, traceMemory = False, profileCalls = False):
+		"""Construct instance of Profiler.
+
+		Keyword arguments:
+		top -- Number of slowest and most memory-hungry files to keep.
+			   (default: 10)
+		traceMemory -- If set to True, peak memory use of each call is
+					   measured using tracemalloc. (default: False)
+		profileCalls -- If set to True, calls are run under cProfile.
+						(default: False)
+
+		"""
+		if top < 1:
+			raise ValueError("Number of files to keep must be at least 1")
+		self.top = top
+		self.traceMemory = traceMemory
+		self.profileCalls = profileCalls
+		self.reset()
+
+	def reset(self):
+		"""Forget all files profiled so far."""
+		self.files = 0
+		self.wallSeconds = 0.0
+		self.cpuSeconds = 0.0
+		# Maps file extensions to [ files, bytes, wall seconds, CPU seconds ]
+		self.byExtension = {}
+		# Min-heaps of (cost, sequence number, FileProfile), so the
+		# cheapest of the kept files is the one replaced
+		self._slowest = []
+		self._hungriest = []
+		self._sequence = 0
+		self._callProfile = cProfile.Profile() if self.profileCalls else None
+		self._startedTracing = False
+
+	def start(self):
+		"""Prepare to profile a run. Starts tracemalloc if memory is traced."""
+		if self.traceMemory and not tracemalloc.is_tracing():
+			tracemalloc.start()
+			self._startedTracing = True
+
+	def stop(self):
+		"""Finish profiling a run. Stops tracemalloc if start() started it."""
+		if self._startedTracing:
+			tracemalloc.stop()
+			self._startedTracing = False
+
+	def wrap(self, extractor):
+		"""Return extractor which profiles every call to the given extractor."""
+		return ProfilingExtractor(extractor, self)
+
+	def profile(self, extractor, path):
+		"""Extract data from a file, profiling the call, and return the data.
+
+		Arguments:
+		extractor -- Extractor to run
+		path -- Path of the file to extract data from
+
+		"""
+		try:
+			size = os.path.getsize(path)
+		except OSError:
+			size = None
+		tracing = self.traceMemory and tracemalloc.is_tracing()
+		if tracing:
+			tracemalloc.reset_peak()
+			baseline = tracemalloc.get_traced_memory()[0]
+		callProfile = self._callProfile
+		wallStart = time.perf_counter()
+		cpuStart = time.process_time()
+		if callProfile is not None:
+			callProfile.enable()
+		try:
+			return extractor.extract(path)
+		finally:
+			if callProfile is not None:
+				callProfile.disable()
+			cpuSeconds = time.process_time() - cpuStart
+			wallSeconds = time.perf_counter() - wallStart
+			peakBytes = None
+			if tracing:
+				peakBytes = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+			self._record( FileProfile(path, size, wallSeconds, cpuSeconds, peakBytes) )
+
+	def _record(self, profile):
+		self.files += 1
+		self.wallSeconds += profile.wallSeconds
+		self.cpuSeconds += profile.cpuSeconds
+		totals = self.byExtension.setdefault(profile.extension, [ 0, 0, 0.0, 0.0 ])
+		totals[0] += 1
+		totals[1] += profile.size or 0
+		totals[2] += profile.wallSeconds
+		totals[3] += profile.cpuSeconds
+
+		self._sequence += 1
+		self._keep(self._slowest, (profile.wallSeconds, self._sequence, profile))
+		if profile.peakBytes is not None:
+			self._keep(self._hungriest, (profile.peakBytes, self._sequence, profile))
+
+	def _keep(self, heap, item):
+		if len(heap) < self.top:
+			heapq.heappush(heap, item)
+		elif item > heap[0]:
+			heapq.heapreplace(heap, item)
+
+	def slowest(self, n = None):
+		"""Return list of FileProfiles of the slowest files to extract, slowest first.
+
+		Keyword arguments:
+		n -- Number of files to return, at most 'top'. If None, all
+			 kept files are returned. (default: None)
+
+		"""
+		return [ item[2] for item in heapq.nlargest(n or self.top, self._slowest) ]
+
+	def hungriest(self, n = None):
+		"""Return list of FileProfiles of the files which used the most memory, hungriest first.
+
+		Empty unless memory is traced.
+
+		Keyword arguments:
+		n -- Number of files to return, at most 'top'. If None, all
+			 kept files are returned. (default: None)
+
+		"""
+		return [ item[2] for item in heapq.nlargest(n or self.top, self._hungriest) ]
+
+	def callStatistics(self, sortBy = "cumulative"):
+		"""Return pstats.Stats for every profiled call, or None if calls weren't profiled.
+
+		Keyword arguments:
+		sortBy -- Key the statistics are sorted by. (default: "cumulative")
+
+		"""
+		if self._callProfile is None or not self.files:
+			return None
+		return pstats.Stats(self._callProfile, stream=io.StringIO()).sort_stats(sortBy)
+
+	def report(self, n = None):
+		"""Return human-readable report of the slowest and most memory-hungry files.
+
+		Keyword arguments:
+		n -- Number of files to list in each section. If None, all
+			 kept files are listed. (default: None)
+
+		"""
+		lines = [ "Profiled {} files: {:.3f}s wall, {:.3f}s CPU".format(
+			self.files, self.wallSeconds, self.cpuSeconds) ]
+
+		def describe(profile):
+			return "{:>10.4f}s {:>10.4f}s CPU {:>12} bytes {:>14} peak  {}".format(
+				profile.wallSeconds, profile.cpuSeconds,
+				"?" if profile.size is None else profile.size,
+				"-" if profile.peakBytes is None else profile.peakBytes, profile.path)
+
+		lines.append("")
+		lines.append("Slowest files:")
+		lines.extend( describe(profile) for profile in self.slowest(n) )
+		if self._hungriest:
+			lines.append("")
+			lines.append("Most memory-hungry files:")
+			lines.extend( describe(profile) for profile in self.hungriest(n) )
+		lines.append("")
+		lines.append("By extension:")
+		for extension, (files, size, wallSeconds, cpuSeconds) in sorted(self.byExtension.items(),
+				key=lambda item: item[1][2], reverse=True):
+			lines.append("{:>10.4f}s {:>10.4f}s CPU {:>12} bytes {:>8} files  {}".format(
+				wallSeconds, cpuSeconds, size, files, extension or "(none)"))
+		return "\n".join(lines)
+
+
+class ProfilingExtractor(Extractor):
+
+	"""Extractor which wraps another extractor, profiling each call with a Profiler."""
+
+	def __init__(self, extractor, profiler):
+		"""Construct instance of ProfilingExtractor.
+
+		Arguments:
+		extractor -- Extractor to profile
+		profiler -- Profiler to record each call in
+
+		"""
+		self.extractor = extractor
+		self.profiler = profiler
+
+	def extract(self, filename):
+		"""Extract data from file using the wrapped extractor, profiling the call.
+
+		Arguments:
+		filename -- Name of the file to extract data from
+
+		"""
+		return self.profiler.profile(self.extractor, filename)
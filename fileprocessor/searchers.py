@@ -2,24 +2,57 @@
 
 import sys
 import os
-import collections
+import time
+import queue
+import pickle
+import sqlite3
+import threading
+import collections.abc
+import concurrent.futures
 
 from .abstracts import Searcher
+from .fileinfo import FileInfo
 
 class FileSearcher(Searcher):
 	
 	"""Searches the filesystem for files, either recursively and non-recursively."""
 
-	def __init__(self, recurse = False):
+	# Maximum number of directory listings the walker threads can get
+	# ahead of whoever is consuming the search results, per thread
+	LISTINGS_PER_WALKER = 4
+
+	def __init__(self, recurse = False, walkers = 1, sort = False, pruners = None):
 		"""Construct instance of FileSearcher.
 
 		Keyword arguments:
 		recurse -- If set to True, then the searcher will recursively
 				   search through the given directory's sub-directories
 				   for files.
+		walkers -- Number of threads used to list directories during a
+				   recursive search. Using more than one thread helps on
+				   filesystems where listing a directory is slow, such
+				   as network filesystems, since many directories are
+				   listed at once. The same files are found, but not
+				   necessarily in the same order. (default: 1)
+		sort -- If set to True, the paths found are sorted, so results
+				are always in the same order. This means no results are
+				returned until the search has finished. (default: False)
+		pruners -- List of filterers which can rule out whole directories
+				   (see Filterer.prunes()). During a recursive search,
+				   sub-directories which any of them prune are not
+				   listed at all. Pruners are not applied to the files
+				   found, so should usually also be given to the
+				   FileProcessor as filterers. (default: None)
 
 		"""
+		if walkers < 1:
+			raise ValueError("Number of walkers must be at least 1")
+		if pruners is not None and not isinstance(pruners, collections.abc.Iterable):
+			raise TypeError("Collection of pruners to use must be an iterable object")
 		self.recurse = recurse
+		self.walkers = walkers
+		self.sort = sort
+		self.pruners = list(pruners) if pruners else []
 
 	def search(self, rootDirectory):
 		"""Return a list containing the absolute paths of all files found.
@@ -30,31 +63,419 @@ class FileSearcher(Searcher):
 		rootDirectory -- Path to directory ot start searching from
 
 		"""
+		return list(self.iterSearch(rootDirectory))
+
+	def iterSearch(self, rootDirectory):
+		"""Return iterator over the absolute paths of all files found.
+
+		Paths are yielded as soon as the directory containing them
+		has been listed. os.scandir() is used to list directories,
+		so the type of each entry is known without an extra stat
+		call per file on most platforms.
+
+		Arguments:
+		rootDirectory -- Path to directory ot start searching from
+
+		"""
+		return ( entry.path for entry in self._iterEntries(rootDirectory) )
+
+	def iterSearchInfo(self, rootDirectory):
+		"""Return iterator over FileInfo objects for all files found.
+
+		Works like iterSearch(), but the FileInfo objects fetch file
+		metadata from the directory listing where possible.
+
+		Arguments:
+		rootDirectory -- Path to directory ot start searching from
+
+		"""
+		return map(FileInfo.fromEntry, self._iterEntries(rootDirectory))
+
+	def _iterEntries(self, rootDirectory):
+		"""Validate root directory and return iterator over DirEntry objects for files in it."""
 		if not isinstance(rootDirectory, str):
 			raise TypeError("Path to root directory to start search from should be a string")
 		if not os.path.isdir(rootDirectory):
 			raise IOError("Root directory '{}' does not exist".format(rootDirectory))
 
-		fileListing = []
-		if self.recurse:
-			for root, directories, files in os.walk(rootDirectory):
-				for filename in files:
-					path = os.path.join(root, filename)
-					fileListing.append( os.path.abspath(path) )
+		rootDirectory = os.path.abspath(rootDirectory)
+		if not self.recurse:
+			entries = self._iterSearchDirectory(rootDirectory)
+		elif self.walkers > 1:
+			entries = self._iterSearchParallel(rootDirectory)
 		else:
-			for filename in os.listdir(rootDirectory):
-				path = os.path.join(rootDirectory, filename)
-				if os.path.isfile(path):
-					fileListing.append( os.path.abspath(path) )
+			entries = self._iterSearchRecursive(rootDirectory)
+		if self.sort:
+			return iter(sorted(entries, key=lambda entry: entry.path))
+		return entries
+
+	def _iterSearchDirectory(self, directory):
+		with os.scandir(directory) as entries:
+			for entry in entries:
+				if entry.is_file():
+					yield entry
+
+	def _iterSearchRecursive(self, rootDirectory):
+		# Directories are visited depth-first in the same order as
+		# os.walk(), so use a stack of directories yet to be listed
+		directories = [ rootDirectory ]
+		while directories:
+			try:
+				files, subdirectories = self._listDirectory(directories.pop())
+			except OSError:
+				# Like os.walk(), skip directories which can't be listed
+				continue
+			yield from files
+			directories.extend( reversed(subdirectories) )
+
+	def _iterSearchParallel(self, rootDirectory):
+		"""Yield DirEntry objects for files found by several threads listing directories at once.
+
+		The walker threads take directories from a shared queue, add
+		any sub-directories they find back to it and pass the files
+		they find back to this generator. If the generator is closed
+		before the search finishes, the walkers are stopped.
+
+		"""
+		directories = queue.Queue()
+		directories.put(rootDirectory)
+		listings = queue.Queue(self.walkers * self.LISTINGS_PER_WALKER)
+		stopping = threading.Event()
+		finished = object()
+		# Number of directories queued or being listed. The search is
+		# finished when it drops to zero.
+		outstanding = [ 1 ]
+		outstandingLock = threading.Lock()
+
+		def put(item):
+			# Give up if the generator stops consuming listings
+			while not stopping.is_set():
+				try:
+					listings.put(item, timeout=0.1)
+					return
+				except queue.Full:
+					pass
+
+		def walk():
+			while True:
+				directory = directories.get()
+				if directory is None:
+					return
+				if not stopping.is_set():
+					try:
+						files, subdirectories = self._listDirectory(directory)
+					except OSError:
+						# Like os.walk(), skip directories which can't be listed
+						files, subdirectories = [], []
+					except BaseException as e:
+						put(e)
+						files, subdirectories = [], []
+					with outstandingLock:
+						outstanding[0] += len(subdirectories)
+					for subdirectory in subdirectories:
+						directories.put(subdirectory)
+					if files:
+						put(files)
+				with outstandingLock:
+					outstanding[0] -= 1
+					done = (outstanding[0] == 0)
+				if done:
+					put(finished)
+
+		walkers = [ threading.Thread(target=walk, daemon=True) for i in range(self.walkers) ]
+		for walker in walkers:
+			walker.start()
+		try:
+			while True:
+				listing = listings.get()
+				if listing is finished:
+					break
+				elif isinstance(listing, BaseException):
+					raise listing
+				yield from listing
+		finally:
+			stopping.set()
+			for walker in walkers:
+				directories.put(None)
+			for walker in walkers:
+				walker.join()
+
+	def _listDirectory(self, directory):
+		"""Return list of DirEntry objects for files in directory and list of paths to its sub-directories.
+
+		Sub-directories pruned by any of the pruners are left out.
+
+		"""
+		files, subdirectories = self._scanDirectory(directory)
+		if self.pruners:
+			subdirectories = [ subdirectory for subdirectory in subdirectories
+				if not any(pruner.prunes(subdirectory) for pruner in self.pruners) ]
+		return files, subdirectories
+
+	def _scanDirectory(self, directory):
+		"""Return list of DirEntry objects for files in directory and list of paths to its sub-directories.
+
+		As with os.walk(), anything which is not a directory counts as
+		a file and symbolic links to directories are not descended into.
+
+		"""
+		files = []
+		subdirectories = []
+		with os.scandir(directory) as entries:
+			for entry in entries:
+				try:
+					isDirectory = entry.is_dir()
+				except OSError:
+					isDirectory = False
+				if not isDirectory:
+					files.append(entry)
+				elif not entry.is_symlink():
+					subdirectories.append(entry.path)
+		return files, subdirectories
+
+class _IndexedEntry:
+
+	"""Stands in for the os.DirEntry of a file listed in an IndexedSearcher's index."""
+
+	__slots__ = ("name", "path", "_inode", "_isSymlink")
+
+	def __init__(self, directory, name, inode, isSymlink):
+		self.name = name
+		self.path = os.path.join(directory, name)
+		self._inode = inode
+		self._isSymlink = isSymlink
+
+	def inode(self):
+		return self._inode
+
+	def is_symlink(self):
+		return self._isSymlink
+
+	def stat(self):
+		return os.stat(self.path)
+
+class IndexedSearcher(FileSearcher):
+
+	"""Recursive FileSearcher which keeps an index of directory listings between searches.
+
+	The index is an SQLite database storing the names of the files
+	and sub-directories in each directory searched, along with the
+	directory's modification time. Adding, removing or renaming
+	anything in a directory changes its modification time, so on
+	later searches, only directories whose modification time has
+	changed are listed again. Every other listing comes from the
+	index, which only costs a stat() call per directory.
+
+	Directories modified very shortly before they were listed are
+	always listed again next time, since further changes in the
+	same tick of the filesystem's clock wouldn't change their
+	modification time. Changes to the contents of files don't
+	affect the index at all.
+
+	The number of directories listed and read from the index since
+	the searcher was created are stored in the 'listed' and
+	'reused' attributes.
+
+	"""
 
-		return fileListing
+	# Directories modified less than this many seconds before being
+	# listed aren't trusted to be unchanged on the next search
+	SAFETY_MARGIN = 2.0
+	# Number of directories to store before committing them to disk
+	COMMIT_INTERVAL = 1000
+
+	def __init__(self, indexFilename, walkers = 1, sort = False, pruners = None):
+		"""Construct instance of IndexedSearcher, opening or creating the index.
+
+		Arguments:
+		indexFilename -- Path to the SQLite database to store the index
+						 in. Created if it doesn't exist.
+
+		Keyword arguments:
+		walkers -- See FileSearcher. (default: 1)
+		sort -- See FileSearcher. (default: False)
+		pruners -- See FileSearcher. Pruned directories are still
+				   stored in the index, so the pruners can be changed
+				   between searches. (default: None)
+
+		"""
+		super().__init__(True, walkers, sort, pruners)
+		self.indexFilename = indexFilename
+		self.listed = 0
+		self.reused = 0
+
+		self._lock = threading.RLock()
+		self._connection = sqlite3.connect(indexFilename, check_same_thread=False)
+		self._connection.execute("""
+			CREATE TABLE IF NOT EXISTS directories (
+				path TEXT PRIMARY KEY,
+				mtime_ns INTEGER,
+				files BLOB NOT NULL,
+				subdirectories BLOB NOT NULL
+			)
+		""")
+		self._uncommitted = 0
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self.close()
+		return False
+
+	def _iterEntries(self, rootDirectory):
+		return self._flushAfter( super()._iterEntries(rootDirectory) )
+
+	def _flushAfter(self, entries):
+		try:
+			yield from entries
+		finally:
+			self.flush()
+
+	def _lookup(self, directory):
+		"""Return (mtime_ns, files, subdirectories) row stored for directory, or None."""
+		try:
+			with self._lock:
+				return self._connection.execute(
+					"SELECT mtime_ns, files, subdirectories FROM directories WHERE path = ?",
+					(directory,)).fetchone()
+		except UnicodeEncodeError: # undecodable filenames can't be indexed
+			return None
+
+	def _scanDirectory(self, directory):
+		"""List directory, or return its listing from the index if it hasn't changed."""
+		mtimeNs = os.stat(directory).st_mtime_ns
+		row = self._lookup(directory)
+		if row is not None and row[0] == mtimeNs:
+			with self._lock:
+				self.reused += 1
+			files = [ _IndexedEntry(directory, *record) for record in pickle.loads(row[1]) ]
+			subdirectories = [ os.path.join(directory, name) for name in pickle.loads(row[2]) ]
+			return files, subdirectories
+
+		listedAt = time.time_ns()
+		files, subdirectories = super()._scanDirectory(directory)
+		if listedAt - mtimeNs < self.SAFETY_MARGIN * 1e9:
+			mtimeNs = None # list again next time
+		records = [ (entry.name, entry.inode(), entry.is_symlink()) for entry in files ]
+		names = [ os.path.basename(subdirectory) for subdirectory in subdirectories ]
+		try:
+			with self._lock:
+				self.listed += 1
+				# Forget about sub-directories which no longer exist
+				if row is not None:
+					for name in set(pickle.loads(row[2])).difference(names):
+						self._deleteTree( os.path.join(directory, name) )
+				self._connection.execute("INSERT OR REPLACE INTO directories VALUES (?, ?, ?, ?)",
+					(directory, mtimeNs, pickle.dumps(records, pickle.HIGHEST_PROTOCOL),
+					 pickle.dumps(names, pickle.HIGHEST_PROTOCOL)))
+				self._uncommitted += 1
+				if self._uncommitted >= self.COMMIT_INTERVAL:
+					self.flush()
+		except UnicodeEncodeError:
+			pass
+		return files, subdirectories
+
+	def _deleteTree(self, directory):
+		"""Delete the index entries for a directory and everything under it."""
+		# Every path under the directory sorts between these two
+		prefix = os.path.join(directory, "")
+		end = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+		with self._lock:
+			self._connection.execute(
+				"DELETE FROM directories WHERE path = ? OR (path >= ? AND path < ?)",
+				(directory, prefix, end))
+
+	def _iterIndexed(self, rootDirectory):
+		"""Return iterator over paths of the files under a directory according to the index alone."""
+		directories = [ rootDirectory ]
+		while directories:
+			directory = directories.pop()
+			row = self._lookup(directory)
+			if row is None:
+				continue
+			for record in pickle.loads(row[1]):
+				yield os.path.join(directory, record[0])
+			for name in pickle.loads(row[2]):
+				subdirectory = os.path.join(directory, name)
+				if not any(pruner.prunes(subdirectory) for pruner in self.pruners):
+					directories.append(subdirectory)
+
+	def rebuild(self, rootDirectory = None):
+		"""Throw away the index and, if a root directory is given, build it again.
+
+		Arguments:
+		rootDirectory -- If given, only the index entries for this
+						 directory are thrown away, then the directory
+						 is searched to fill the index in again. If
+						 None, the whole index is cleared and is filled
+						 in by the next search. (default: None)
+
+		"""
+		with self._lock:
+			if rootDirectory is None:
+				self._connection.execute("DELETE FROM directories")
+			else:
+				self._deleteTree( os.path.abspath(rootDirectory) )
+			self.flush()
+		if rootDirectory is not None:
+			for path in self.iterSearch(rootDirectory):
+				pass
+
+	def verify(self, rootDirectory):
+		"""Compare the index against a full walk of a directory.
+
+		Returns (missing, stale) pair of sorted lists. 'missing'
+		contains the paths of files found by walking the directory
+		which are not in the index, while 'stale' contains paths in
+		the index to files which were not found. Both lists are empty
+		if the index is up to date. The index is not changed.
+
+		Arguments:
+		rootDirectory -- Path to directory to check
+
+		"""
+		walker = FileSearcher(True, self.walkers, pruners=self.pruners)
+		walked = set( walker.iterSearch(rootDirectory) )
+		indexed = set( self._iterIndexed(os.path.abspath(rootDirectory)) )
+		return sorted(walked - indexed), sorted(indexed - walked)
+
+	def __len__(self):
+		"""Return number of directories in the index."""
+		with self._lock:
+			return self._connection.execute("SELECT COUNT(*) FROM directories").fetchone()[0]
+
+	def flush(self):
+		"""Commit any outstanding changes to the index to disk."""
+		with self._lock:
+			if self._connection is not None:
+				self._connection.commit()
+				self._uncommitted = 0
+
+	def close(self):
+		"""Commit outstanding changes and close the index."""
+		with self._lock:
+			if self._connection is not None:
+				self.flush()
+				self._connection.close()
+				self._connection = None
 
 class CompositeSearcher(Searcher):
 
-	"""Uses multiple searchers and combines their findings into a single listing of resources."""
+	"""Uses multiple searchers and combines their findings into a single listing of resources.
+
+	The child searchers are run at the same time, each in its own
+	thread, so a searcher waiting on a slow filesystem doesn't hold
+	up the others.
+
+	"""
+
+	# Maximum number of paths the child searchers can get ahead of
+	# whoever is consuming the results of iterSearch()
+	MAX_PENDING_PATHS = 16384
 
 	def __init__(self, searchers):
-		if not isinstance(searchers, collections.Iterable):
+		if not isinstance(searchers, collections.abc.Iterable):
 			raise TypeError("Collection of searchers to use must be an iterable object")
 		self.searchers = searchers
 
@@ -72,13 +493,111 @@ class CompositeSearcher(Searcher):
 		# All the resources found by the searchers. This is a set to
 		# get rid of duplicate values
 		allFindings = set()
-		for searcher in self.searchers:
+		searchers = list(self.searchers)
+		if not searchers:
+			return allFindings
+		with concurrent.futures.ThreadPoolExecutor(len(searchers)) as pool:
+			futures = [ pool.submit(searcher.search, rootDirectory) for searcher in searchers ]
+			for future in concurrent.futures.as_completed(futures):
+				try:
+					# Merge child searcher's findings into the set
+					# containing all the findings, without copying it
+					allFindings.update( future.result() )
+				except BaseException as e:
+					print("Error searching for resources: {}".format(e), file=sys.stderr)
+
+		return allFindings
+
+	def iterSearch(self, rootDirectory):
+		"""Pass given directory to child searchers, yielding each resource they find once.
+
+		Resources are yielded as soon as any child searcher finds
+		them, using the child's iterSearch() method if it has one.
+		As with search(), errors raised by a searcher are reported
+		and the searcher is ignored from then on, though anything it
+		found before the error is still yielded.
+
+		Arguments:
+		rootDirectory -- Path to directory to start searching from
+
+		"""
+		seen = set()
+		for batch in self._iterBatches(rootDirectory):
+			for path in batch:
+				if path not in seen:
+					seen.add(path)
+					yield path
+
+	def _iterBatches(self, rootDirectory):
+		"""Run every child searcher in its own thread, yielding lists of the paths they find.
+
+		Each path is handed over as soon as it's found. Every list
+		yielded holds all of the paths found since the last one, so
+		paths are passed on in bulk when searchers find them faster
+		than they're consumed.
+
+		"""
+		searchers = list(self.searchers)
+		found = []
+		condition = threading.Condition()
+		stopping = threading.Event()
+		running = len(searchers)
+		# Set while the consumer is waiting for paths, so searchers
+		# only wake it up when it needs to be
+		waiting = False
+
+		def search(searcher):
+			nonlocal running
 			try:
-				# Get child searcher's findings as a set and merge it
-				# with the set containing all the findings
-				findings = set(searcher.search(rootDirectory))
-				allFindings = allFindings.union(findings)
+				iterSearch = getattr(searcher, "iterSearch", None)
+				if iterSearch:
+					findings = iterSearch(rootDirectory)
+				else:
+					findings = searcher.search(rootDirectory)
+				for path in findings:
+					with condition:
+						# Wait for the consumer to catch up, giving up
+						# if it stops consuming paths
+						while len(found) >= self.MAX_PENDING_PATHS and not stopping.is_set():
+							condition.wait(0.1)
+						if stopping.is_set():
+							break
+						found.append(path)
+						if waiting:
+							condition.notify_all()
 			except BaseException as e:
 				print("Error searching for resources: {}".format(e), file=sys.stderr)
+			finally:
+				with condition:
+					running -= 1
+					condition.notify_all()
 
-		return allFindings
\ No newline at end of file
+		threads = [ threading.Thread(target=search, args=(searcher,), daemon=True)
+			for searcher in searchers ]
+		for thread in threads:
+			thread.start()
+		finished = False
+		try:
+			while True:
+				with condition:
+					while not found and running:
+						waiting = True
+						condition.wait()
+						waiting = False
+					if not found:
+						finished = True
+						break
+					batch = found[:]
+					del found[:]
+					condition.notify_all()
+				yield batch
+		finally:
+			stopping.set()
+			with condition:
+				condition.notify_all()
+			# If the caller stopped early, don't wait for searchers
+			# which are still running. They're daemon threads which
+			# stop at their next result, or once search() returns.
+			if finished:
+				for thread in threads:
+					thread.join()
@@ -0,0 +1,300 @@
+"""Contains result sinks which stream extracted data to files as it's produced."""
+
+import io
+import csv
+import json
+import time
+import pickle
+import struct
+
+from fileprocessor.abstracts import ResultSink
+
+
+class BufferedSink(ResultSink):
+
+	"""Base class for sinks which write encoded records to a file in batches.
+
+	Records are encoded as they're written, but only written to the
+	file once a batch of them has built up, or once 'flushInterval'
+	seconds have passed since the last flush, so the file can be
+	followed while a run is still going. Memory use is bounded by
+	the size of one batch. The interval is only checked when a record
+	is written, so records can stay buffered for longer while the
+	next file is being extracted. Call flush() to write them sooner.
+
+	Text records are checked against the file's encoding as they're
+	written, so a record which can't be encoded raises an error from
+	write() and leaves the rest of the batch alone. Files opened from
+	filenames use UTF-8 with the "surrogateescape" error handler, so
+	paths containing undecodable bytes are written as those bytes.
+
+	The destination can either be a filename, in which case the file
+	is created (or truncated) and closed along with the sink, or an
+	open file object, which is left open. Subclasses set MODE to the
+	mode files are opened in and implement encode().
+
+	"""
+
+	# Mode used to open destinations given as filenames
+	MODE = "w"
+	# Default number of records written at once
+	DEFAULT_BATCH_SIZE = 256
+	# Default maximum number of seconds records are buffered for
+	DEFAULT_FLUSH_INTERVAL = 1.0
+
+	def __init__(self, destination, batchSize = None, flushInterval = None):
+		"""Construct instance of BufferedSink.
+
+		Arguments:
+		destination -- Filename or open file object to write to
+
+		Keyword arguments:
+		batchSize -- Number of records to buffer before writing them.
+					 If None, DEFAULT_BATCH_SIZE is used. (default: None)
+		flushInterval -- Maximum number of seconds to buffer records
+						 for. Only checked whenever a record is
+						 written. If None, DEFAULT_FLUSH_INTERVAL is
+						 used. (default: None)
+
+		"""
+		if batchSize is None:
+			batchSize = self.DEFAULT_BATCH_SIZE
+		if flushInterval is None:
+			flushInterval = self.DEFAULT_FLUSH_INTERVAL
+		if batchSize < 1:
+			raise ValueError("Batch size must be at least 1")
+		self.batchSize = batchSize
+		self.flushInterval = flushInterval
+		# Number of records written to the sink
+		self.written = 0
+		if isinstance(destination, str):
+			self._file = open(destination, self.MODE, **self._openArguments())
+			self._ownsFile = True
+		else:
+			self._file = destination
+			self._ownsFile = False
+		self._batch = []
+		self._nextFlush = time.monotonic() + flushInterval
+
+	def _openArguments(self):
+		"""Return extra keyword arguments used to open destinations given as filenames."""
+		return { "encoding" : "utf-8", "errors" : "surrogateescape" } if "b" not in self.MODE else {}
+
+	def _checkEncodable(self, record):
+		"""Raise UnicodeEncodeError if text record can't be written to the destination."""
+		encoding = getattr(self._file, "encoding", None)
+		if isinstance(record, str) and encoding:
+			record.encode(encoding, getattr(self._file, "errors", None) or "strict")
+
+	def encode(self, path, data):
+		"""Return record for data extracted from a file, which is written to the destination.
+
+		Raises a NotImplementedError. This method should be
+		overriden by subclasses.
+
+		Arguments:
+		path -- Absolute path to the file
+		data -- Data extracted from the file
+
+		"""
+		raise NotImplementedError
+
+	def write(self, path, data):
+		"""Encode data extracted from a file and add it to the current batch.
+
+		Raises an error, without changing the batch, if the data
+		can't be encoded.
+
+		Arguments:
+		path -- Absolute path to the file
+		data -- Data extracted from the file
+
+		"""
+		record = self.encode(path, data)
+		self._checkEncodable(record)
+		self._batch.append(record)
+		self.written += 1
+		if len(self._batch) >= self.batchSize or time.monotonic() >= self._nextFlush:
+			self.flush()
+
+	def flush(self):
+		"""Write buffered records to the destination and flush it."""
+		if self._file is None:
+			return
+		if self._batch:
+			self._file.writelines(self._batch)
+			self._batch = []
+		self._file.flush()
+		self._nextFlush = time.monotonic() + self.flushInterval
+
+	def close(self):
+		"""Flush buffered records, closing the destination if the sink opened it."""
+		if self._file is None:
+			return
+		try:
+			self.flush()
+		finally:
+			if self._ownsFile:
+				self._file.close()
+			self._file = None
+
+
+class JSONLinesSink(BufferedSink):
+
+	"""Writes each result as a JSON object on its own line.
+
+	Each object has a "path" and a "data" key, so extracted data
+	must be serialisable as JSON. Non-ASCII characters are escaped,
+	so paths containing undecodable bytes (which os.fsdecode() turns
+	into lone surrogates) still produce valid JSON.
+
+	"""
+
+	def __init__(self, destination, batchSize = None, flushInterval = None, default = None):
+		"""Construct instance of JSONLinesSink.
+
+		Arguments:
+		destination -- Filename or open text file object to write to
+
+		Keyword arguments:
+		batchSize -- See BufferedSink. (default: None)
+		flushInterval -- See BufferedSink. (default: None)
+		default -- Function which converts data JSON can't serialise
+				   into data it can (see json.dumps()). If None,
+				   TypeError is raised for such data. (default: None)
+
+		"""
+		super().__init__(destination, batchSize, flushInterval)
+		self._encoder = json.JSONEncoder(default=default)
+
+	def encode(self, path, data):
+		"""Return line containing JSON object for the result."""
+		return self._encoder.encode({ "path" : path, "data" : data }) + "\n"
+
+
+class CSVSink(BufferedSink):
+
+	"""Writes each result as a row of a CSV file.
+
+	If fields are given, data extracted from each file should be a
+	dictionary, and each row contains the path followed by the value
+	of each field, or an empty string for missing fields. Otherwise,
+	each row contains the path and the data.
+
+	"""
+
+	def __init__(self, destination, fields = None, header = True, batchSize = None,
+				 flushInterval = None):
+		"""Construct instance of CSVSink.
+
+		Arguments:
+		destination -- Filename or open text file object to write to.
+					   File objects should be opened with newline="".
+
+		Keyword arguments:
+		fields -- List of keys of the dictionaries of extracted data
+				  to write as columns. If None, the data is written as
+				  a single column. (default: None)
+		header -- If set to True, the first row contains the name of
+				  each column. (default: True)
+		batchSize -- See BufferedSink. (default: None)
+		flushInterval -- See BufferedSink. (default: None)
+
+		"""
+		super().__init__(destination, batchSize, flushInterval)
+		self.fields = list(fields) if fields is not None else None
+		self._buffer = io.StringIO()
+		self._writer = csv.writer(self._buffer)
+		if header:
+			self._writer.writerow( [ "path" ] + (self.fields or [ "data" ]) )
+			self._batch.append( self._take() )
+
+	def _openArguments(self):
+		return { "encoding" : "utf-8", "errors" : "surrogateescape", "newline" : "" }
+
+	def _take(self):
+		"""Return and clear what the CSV writer has written."""
+		row = self._buffer.getvalue()
+		self._buffer.seek(0)
+		self._buffer.truncate()
+		return row
+
+	def encode(self, path, data):
+		"""Return CSV row for the result."""
+		if self.fields is None:
+			self._writer.writerow( [ path, data ] )
+		else:
+			self._writer.writerow( [ path ] + [ data.get(field, "") for field in self.fields ] )
+		return self._take()
+
+
+class BinarySink(BufferedSink):
+
+	"""Writes results to a compact binary file, which can be read back with readBinary().
+
+	The file starts with MAGIC. Each result is then stored as the
+	length of the UTF-8 encoded path as a 4-byte unsigned integer,
+	the path itself, the length of the pickled data as an 8-byte
+	unsigned integer and the pickled data, with all integers
+	big-endian. Extracted data must be picklable.
+
+	"""
+
+	MODE = "wb"
+	# Identifies files written by BinarySink
+	MAGIC = b"FPSINK1\n"
+	PATH_LENGTH = struct.Struct(">I")
+	DATA_LENGTH = struct.Struct(">Q")
+
+	def __init__(self, destination, batchSize = None, flushInterval = None):
+		"""Construct instance of BinarySink.
+
+		Arguments:
+		destination -- Filename or open binary file object to write to
+
+		Keyword arguments:
+		batchSize -- See BufferedSink. (default: None)
+		flushInterval -- See BufferedSink. (default: None)
+
+		"""
+		super().__init__(destination, batchSize, flushInterval)
+		self._batch.append(self.MAGIC)
+
+	def encode(self, path, data):
+		"""Return length-prefixed path and pickled data for the result."""
+		encodedPath = path.encode("utf-8", "surrogateescape")
+		blob = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+		return b"".join( (self.PATH_LENGTH.pack(len(encodedPath)), encodedPath,
+			self.DATA_LENGTH.pack(len(blob)), blob) )
+
+
+def readBinary(source):
+	"""Return iterator over (path, data) pairs stored in a file written by BinarySink.
+
+	Stops at the end of the last complete result, so files which
+	are still being written can be read. Raises ValueError if the
+	file was not written by BinarySink.
+
+	Arguments:
+	source -- Filename or open binary file object to read from
+
+	"""
+	if isinstance(source, str):
+		with open(source, "rb") as f:
+			yield from readBinary(f)
+		return
+	if source.read( len(BinarySink.MAGIC) ) != BinarySink.MAGIC:
+		raise ValueError("File was not written by BinarySink")
+	while True:
+		header = source.read(BinarySink.PATH_LENGTH.size)
+		if len(header) < BinarySink.PATH_LENGTH.size:
+			return
+		encodedPath = source.read( BinarySink.PATH_LENGTH.unpack(header)[0] )
+		header = source.read(BinarySink.DATA_LENGTH.size)
+		if len(header) < BinarySink.DATA_LENGTH.size:
+			return
+		length = BinarySink.DATA_LENGTH.unpack(header)[0]
+		blob = source.read(length)
+		if len(blob) < length:
+			return
+		yield encodedPath.decode("utf-8", "surrogateescape"), pickle.loads(blob)
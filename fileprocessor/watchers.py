@@ -0,0 +1,307 @@
+"""Contains classes which watch directories for files being created or modified."""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+from fileprocessor.searchers import FileSearcher
+
+
+class PollingWatcher:
+
+	"""Watches directories by repeatedly searching them and comparing the results.
+
+	Works on any platform, but every file in the watched directories
+	is stat'd on every scan, so changes are only noticed once per
+	interval and large trees are expensive to watch.
+
+	"""
+
+	def __init__(self, directories, recurse = True, interval = 1.0, pruner = None):
+		"""Construct instance of PollingWatcher, recording the current state of the directories.
+
+		Arguments:
+		directories -- List of paths to the directories to watch
+
+		Keyword arguments:
+		recurse -- If set to True, sub-directories are watched too.
+				   (default: True)
+		interval -- Number of seconds between each scan. (default: 1.0)
+		pruner -- Object whose prunes() method returns True for
+				  sub-directories which shouldn't be watched (see
+				  Filterer.prunes()). If None, nothing is pruned.
+				  (default: None)
+
+		"""
+		self.directories = [ os.path.abspath(directory) for directory in directories ]
+		self.interval = interval
+		self._searcher = FileSearcher(recurse, pruners=[ pruner ] if pruner else None)
+		self._snapshot = self._scan()
+		self._nextScan = time.monotonic() + interval
+
+	def _scan(self):
+		"""Return dictionary mapping paths of all files to their size, modification time and inode."""
+		snapshot = {}
+		for directory in self.directories:
+			if not os.path.isdir(directory):
+				continue
+			for info in self._searcher.iterSearchInfo(directory):
+				stat = info.tryStat()
+				if stat is not None:
+					snapshot[info.path] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+		return snapshot
+
+	def poll(self, timeout):
+		"""Wait up to timeout seconds and return list of paths to files created or modified.
+
+		Arguments:
+		timeout -- Maximum number of seconds to wait
+
+		"""
+		remaining = self._nextScan - time.monotonic()
+		if remaining > 0:
+			time.sleep( min(timeout, remaining) )
+			if time.monotonic() < self._nextScan:
+				return []
+		self._nextScan = time.monotonic() + self.interval
+		snapshot = self._scan()
+		changed = [ path for path, state in snapshot.items() if self._snapshot.get(path) != state ]
+		self._snapshot = snapshot
+		return changed
+
+	def close(self):
+		"""Stop watching the directories."""
+		self._snapshot = {}
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self.close()
+		return False
+
+
+class InotifyWatcher:
+
+	"""Watches directories using Linux's inotify API, so changes are reported as they happen.
+
+	Files are reported when they are created, written to, closed
+	after writing or moved into a watched directory. New
+	sub-directories are watched as soon as they're created, and any
+	files already in them are reported. If the kernel's event queue
+	overflows, every file in the watched directories is reported.
+
+	"""
+
+	# Event masks from <sys/inotify.h>
+	IN_MODIFY = 0x00000002
+	IN_CLOSE_WRITE = 0x00000008
+	IN_MOVED_TO = 0x00000080
+	IN_CREATE = 0x00000100
+	IN_Q_OVERFLOW = 0x00004000
+	IN_IGNORED = 0x00008000
+	IN_ONLYDIR = 0x01000000
+	IN_ISDIR = 0x40000000
+	WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+
+	# Layout of the fixed-size part of struct inotify_event
+	EVENT_HEADER = struct.Struct("iIII")
+
+	_libc = None
+
+	@classmethod
+	def available(cls):
+		"""Return True if inotify can be used on this platform."""
+		return cls._loadLibc() is not None
+
+	@classmethod
+	def _loadLibc(cls):
+		if cls._libc is None and sys.platform.startswith("linux"):
+			try:
+				libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+				libc.inotify_init1
+				libc.inotify_add_watch
+			except (OSError, AttributeError):
+				return None
+			libc.inotify_add_watch.argtypes = [ ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32 ]
+			cls._libc = libc
+		return cls._libc
+
+	def __init__(self, directories, recurse = True, pruner = None):
+		"""Construct instance of InotifyWatcher, watching the given directories.
+
+		Raises OSError if inotify is not available.
+
+		Arguments:
+		directories -- List of paths to the directories to watch
+
+		Keyword arguments:
+		recurse -- If set to True, sub-directories are watched too.
+				   (default: True)
+		pruner -- Object whose prunes() method returns True for
+				  sub-directories which shouldn't be watched (see
+				  Filterer.prunes()). If None, nothing is pruned.
+				  (default: None)
+
+		"""
+		libc = self._loadLibc()
+		if libc is None:
+			raise OSError(errno.ENOSYS, "inotify is not available on this platform")
+		self.directories = [ os.path.abspath(directory) for directory in directories ]
+		self.recurse = recurse
+		self.pruner = pruner
+		self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+		if self._fd < 0:
+			error = ctypes.get_errno()
+			raise OSError(error, os.strerror(error))
+		# Maps watch descriptors to the directories they watch
+		self._watches = {}
+		self._searcher = FileSearcher(recurse, pruners=[ pruner ] if pruner else None)
+		try:
+			for directory in self.directories:
+				self._watchTree(directory)
+		except OSError:
+			self.close()
+			raise
+
+	def _watch(self, directory):
+		wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.WATCH_MASK)
+		if wd < 0:
+			error = ctypes.get_errno()
+			raise OSError(error, os.strerror(error), directory)
+		self._watches[wd] = directory
+
+	def _watchTree(self, directory):
+		"""Watch directory and, if recursing, every directory under it.
+
+		Sub-directories which vanish while the tree is being walked
+		are skipped. Any other error, or any error watching the
+		given directory itself, is raised as an OSError.
+
+		"""
+		self._watch(directory)
+		directories = []
+		if self.recurse:
+			try:
+				files, directories = self._searcher._listDirectory(directory)
+			except OSError:
+				pass
+		while directories:
+			directory = directories.pop()
+			try:
+				self._watch(directory)
+			except OSError as e:
+				if e.errno in (errno.ENOENT, errno.ENOTDIR):
+					continue
+				raise
+			if self.recurse:
+				try:
+					files, subdirectories = self._searcher._listDirectory(directory)
+				except OSError:
+					continue
+				directories.extend(subdirectories)
+
+	def _listFiles(self, directory):
+		try:
+			return list(self._searcher.iterSearch(directory))
+		except OSError:
+			return []
+
+	def poll(self, timeout):
+		"""Wait up to timeout seconds and return list of paths to files created or modified.
+
+		Arguments:
+		timeout -- Maximum number of seconds to wait
+
+		"""
+		readable, writable, exceptional = select.select([ self._fd ], [], [], timeout)
+		if not readable:
+			return []
+		try:
+			data = os.read(self._fd, 65536)
+		except BlockingIOError:
+			return []
+
+		changed = []
+		offset = 0
+		while offset < len(data):
+			wd, mask, cookie, nameLength = self.EVENT_HEADER.unpack_from(data, offset)
+			offset += self.EVENT_HEADER.size
+			name = data[offset:offset + nameLength].rstrip(b"\0")
+			offset += nameLength
+
+			if mask & self.IN_Q_OVERFLOW:
+				# Events were lost, so report everything
+				for directory in self.directories:
+					changed.extend( self._listFiles(directory) )
+				continue
+			if mask & self.IN_IGNORED:
+				# Watched directory was removed
+				self._watches.pop(wd, None)
+				continue
+			directory = self._watches.get(wd)
+			if directory is None or not name:
+				continue
+			path = os.path.join(directory, os.fsdecode(name))
+			if mask & self.IN_ISDIR:
+				if self.recurse and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+					if self.pruner is not None and self.pruner.prunes(path):
+						continue
+					try:
+						self._watchTree(path)
+					except OSError as e:
+						# Directory was removed again before it was watched
+						if e.errno in (errno.ENOENT, errno.ENOTDIR):
+							continue
+						raise
+					# Files may have been added before the watch was
+					changed.extend( self._listFiles(path) )
+			else:
+				changed.append(path)
+		return changed
+
+	def close(self):
+		"""Stop watching the directories."""
+		if self._fd is not None:
+			os.close(self._fd)
+			self._fd = None
+			self._watches = {}
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self.close()
+		return False
+
+
+def createWatcher(directories, recurse = True, pollInterval = 1.0, pruner = None, polling = False):
+	"""Return watcher for the given directories, using inotify if it's available.
+
+	Falls back to a PollingWatcher if inotify is not available or
+	cannot watch the directories (e.g. too many watches are in use).
+
+	Arguments:
+	directories -- List of paths to the directories to watch
+
+	Keyword arguments:
+	recurse -- If set to True, sub-directories are watched too.
+			   (default: True)
+	pollInterval -- Seconds between each scan if polling. (default: 1.0)
+	pruner -- Object whose prunes() method returns True for
+			  sub-directories which shouldn't be watched. (default: None)
+	polling -- If set to True, always use a PollingWatcher. (default: False)
+
+	"""
+	if not polling and InotifyWatcher.available():
+		try:
+			return InotifyWatcher(directories, recurse, pruner)
+		except OSError as e:
+			print("Could not watch directories with inotify, polling instead: {}".format(e),
+				file=sys.stderr)
+	return PollingWatcher(directories, recurse, pollInterval, pruner)
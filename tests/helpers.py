@@ -0,0 +1,50 @@
+"""Fixtures and mock extractors shared by several test modules."""
+
+import os
+import shutil
+import tempfile
+from fileprocessor.extractors import ByteExtractor
+
+
+
+class TemporaryDirectoryMixin:
+
+	"""Gives each test an empty temporary directory to create files in.
+
+	The directory is stored in 'directory' and is deleted, along with
+	everything in it, after each test. Test cases which override
+	setUp() or tearDown() must call this class' versions too.
+
+	"""
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def createFile(self, name, contents):
+		"""Write contents (bytes) to file with given name in the directory and return its path."""
+		path = os.path.join(self.directory, name)
+		with open(path, "wb") as f:
+			f.write(contents)
+		return path
+
+
+class MockLengthExtractor(ByteExtractor):
+
+	"""Returns length of each file."""
+
+	def extractFromBytes(self, data):
+		return len(data)
+
+class MockCountingExtractor(ByteExtractor):
+
+	"""Returns contents of each file, counting how many files it has read."""
+
+	def __init__(self):
+		self.calls = 0
+
+	def extractFromBytes(self, data):
+		self.calls += 1
+		return data
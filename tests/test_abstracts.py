@@ -3,6 +3,7 @@ import sys
 import os
 sys.path.append(os.environ.get("PROJECT_ROOT_DIRECTORY", "."))
 
+import asyncio
 from fileprocessor.abstracts import *
 
 class TestAbstractClasses(unittest.TestCase):
@@ -11,13 +12,70 @@ class TestAbstractClasses(unittest.TestCase):
 		searcher = Searcher()
 		with self.assertRaises(NotImplementedError):
 			searcher.search("dir")
+		with self.assertRaises(NotImplementedError):
+			searcher.iterSearch("dir")
 
 	def test_filterer(self):
 		filterer = Filterer()
 		with self.assertRaises(NotImplementedError):
 			filterer.filter(["test.txt"])
+		with self.assertRaises(NotImplementedError):
+			filterer.iterFilter(["test.txt"])
+		with self.assertRaises(NotImplementedError):
+			filterer.accepts("test.txt")
 
 	def test_extractor(self):
 		extractor = Extractor()
 		with self.assertRaises(NotImplementedError):
-			extractor.extract("test.txt")
\ No newline at end of file
+			extractor.extract("test.txt")
+		self.assertFalse(extractor.threadSafe)
+
+	def test_extractBatch(self):
+		# Default extractBatch() should call extract() on each file
+		class UpperExtractor(Extractor):
+			def extract(self, filename):
+				return filename.upper()
+		self.assertEqual(UpperExtractor().extractBatch([ "a.txt", "b.txt" ]), [ "A.TXT", "B.TXT" ])
+		self.assertEqual(UpperExtractor().extractBatch([]), [])
+
+	def test_resultSink(self):
+		sink = ResultSink()
+		with self.assertRaises(NotImplementedError):
+			sink.write("test.txt", 42)
+		# Flushing and closing do nothing by default
+		with sink:
+			sink.flush()
+
+	def test_iterDefaults(self):
+		# Default iterSearch() and iterFilter() should wrap the list-based methods
+		class ListSearcher(Searcher):
+			def search(self, rootDirectory):
+				return [ "a.txt", "b.txt" ]
+		class ListFilterer(Filterer):
+			def filter(self, fileListing):
+				return [ path for path in fileListing if path != "a.txt" ]
+		self.assertEqual(list(ListSearcher().iterSearch("dir")), ["a.txt", "b.txt"])
+		self.assertEqual(list(ListFilterer().iterFilter( iter(["a.txt", "b.txt"]) )), ["b.txt"])
+		# Default accepts() should wrap filter() too
+		self.assertFalse(ListFilterer().accepts("a.txt"))
+		self.assertTrue(ListFilterer().accepts("b.txt"))
+		# Default FileInfo methods should wrap the path-based methods
+		self.assertEqual(list(ListSearcher().iterSearchInfo("dir")),
+			[ FileInfo("a.txt"), FileInfo("b.txt") ])
+		self.assertFalse(ListFilterer().acceptsInfo( FileInfo("a.txt") ))
+		self.assertTrue(ListFilterer().acceptsInfo( FileInfo("b.txt") ))
+
+	def test_asyncSearcher(self):
+		searcher = AsyncSearcher()
+		with self.assertRaises(NotImplementedError):
+			asyncio.run( searcher.search("dir") )
+
+	def test_asyncFilterer(self):
+		filterer = AsyncFilterer()
+		with self.assertRaises(NotImplementedError):
+			asyncio.run( filterer.filter(["test.txt"]) )
+
+	def test_asyncExtractor(self):
+		extractor = AsyncExtractor()
+		with self.assertRaises(NotImplementedError):
+			asyncio.run( extractor.extract("test.txt") )
\ No newline at end of file
@@ -0,0 +1,170 @@
+import unittest
+import sys
+import os
+sys.path.append(os.environ.get("PROJECT_ROOT_DIRECTORY", "."))
+
+from fileprocessor import FileProcessor
+from fileprocessor.abstracts import Filterer
+from fileprocessor.searchers import FileSearcher
+from fileprocessor.caches import *
+from helpers import TemporaryDirectoryMixin, MockCountingExtractor
+
+
+
+class MockCountingExtractorV2(MockCountingExtractor):
+
+	version = 2
+
+class MockIgnoreCacheFilterer(Filterer):
+
+	"""Filters out the cache database itself."""
+
+	def filter(self, fileListing):
+		return [ path for path in fileListing if not path.endswith(".sqlite") ]
+
+
+class TestExtractionCache(TemporaryDirectoryMixin, unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.cacheFilename = os.path.join(self.directory, "cache.sqlite")
+		self.filename = self.createFile("one.txt", b"one")
+		self.extractor = MockCountingExtractor()
+		self.cache = ExtractionCache(self.cacheFilename)
+
+	def tearDown(self):
+		self.cache.close()
+		self.cache = None
+		super().tearDown()
+
+	def test_construction(self):
+		with self.assertRaises(ValueError):
+			ExtractionCache(self.cacheFilename, maxBytes=-1)
+		self.assertEqual(len(self.cache), 0)
+		self.assertEqual(self.cache.totalBytes, 0)
+
+	def test_extractorIdentity(self):
+		self.assertNotEqual(extractorIdentity(MockCountingExtractor()),
+			extractorIdentity(MockCountingExtractorV2()))
+		self.assertEqual(extractorIdentity(MockCountingExtractor()),
+			extractorIdentity(self.extractor))
+
+	def test_lookupAndStore(self):
+		key = self.cache.key(self.filename, self.extractor)
+		self.assertEqual(self.cache.lookup(key), (False, None))
+		self.cache.store(key, { "data" : [1, 2, 3] })
+		self.assertEqual(self.cache.lookup(key), (True, { "data" : [1, 2, 3] }))
+		self.assertEqual( (self.cache.hits, self.cache.misses), (1, 1) )
+		# Cached None should still count as found
+		self.cache.store(key, None)
+		self.assertEqual(self.cache.lookup(key), (True, None))
+		# Test data is not shared with a different extractor version
+		otherKey = self.cache.key(self.filename, MockCountingExtractorV2())
+		self.assertEqual(self.cache.lookup(otherKey), (False, None))
+		# Test non-existent files can't be cached
+		self.assertIsNone(self.cache.key("non-existent", self.extractor))
+		self.cache.store(None, 5)
+		self.assertEqual(self.cache.lookup(None), (False, None))
+		self.assertEqual(len(self.cache), 1)
+
+	def test_modifiedFile(self):
+		self.cache.store(self.cache.key(self.filename, self.extractor), 3)
+		# Change the file's size and modification time
+		self.createFile("one.txt", b"changed")
+		os.utime(self.filename, ns=(0, 0))
+		self.assertEqual(self.cache.lookup(self.cache.key(self.filename, self.extractor)),
+			(False, None))
+
+	def test_persistence(self):
+		key = self.cache.key(self.filename, self.extractor)
+		self.cache.store(key, "persisted")
+		self.cache.close()
+		self.cache = ExtractionCache(self.cacheFilename)
+		self.assertEqual(self.cache.lookup(key), (True, "persisted"))
+		self.assertGreater(self.cache.totalBytes, 0)
+
+	def test_invalidate(self):
+		otherFilename = self.createFile("two.txt", b"two")
+		otherExtractor = MockCountingExtractorV2()
+		keys = [ self.cache.key(path, extractor)
+			for path in (self.filename, otherFilename)
+			for extractor in (self.extractor, otherExtractor) ]
+		for key in keys:
+			self.cache.store(key, "data")
+		self.cache.invalidate(path=self.filename)
+		self.assertEqual(len(self.cache), 2)
+		self.cache.invalidate(extractor=otherExtractor)
+		self.assertEqual(len(self.cache), 1)
+		self.assertEqual(self.cache.lookup(keys[2]), (True, "data"))
+		self.cache.clear()
+		self.assertEqual(len(self.cache), 0)
+		self.assertEqual(self.cache.totalBytes, 0)
+
+	def test_eviction(self):
+		self.cache.close()
+		self.cache = ExtractionCache(self.cacheFilename, maxBytes=5000)
+		keys = []
+		for i in range(10):
+			path = self.createFile("{}.txt".format(i), b"x")
+			keys.append( self.cache.key(path, self.extractor) )
+			self.cache.store(keys[-1], b"x" * 1000)
+			# Keep using the first file so it's never the least recently used
+			self.assertTrue(self.cache.lookup(keys[0])[0])
+		self.assertLessEqual(self.cache.totalBytes, 5000)
+		self.assertGreater(self.cache.evictions, 0)
+		self.assertEqual(len(self.cache), 10 - self.cache.evictions)
+		self.assertTrue(self.cache.lookup(keys[0])[0])
+		self.assertTrue(self.cache.lookup(keys[-1])[0])
+		self.assertFalse(self.cache.lookup(keys[1])[0])
+
+
+class TestCachingExtractor(TemporaryDirectoryMixin, unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		for name in ("one.txt", "two.txt"):
+			self.createFile(name, name.encode())
+		self.cache = ExtractionCache(os.path.join(self.directory, "cache.sqlite"))
+
+	def tearDown(self):
+		self.cache.close()
+		super().tearDown()
+
+	def test_extract(self):
+		extractor = MockCountingExtractor()
+		cachingExtractor = CachingExtractor(extractor, self.cache)
+		self.assertTrue(cachingExtractor.threadSafe)
+		filename = os.path.join(self.directory, "one.txt")
+		self.assertEqual(cachingExtractor.extract(filename), b"one.txt")
+		self.assertEqual(cachingExtractor.extract(filename), b"one.txt")
+		self.assertEqual(extractor.calls, 1)
+
+	def test_fileProcessor(self):
+		searcher = FileSearcher()
+		extractor = MockCountingExtractor()
+		processor = FileProcessor(searcher, [ MockIgnoreCacheFilterer() ], extractor,
+			cache=self.cache)
+		expected = {
+			os.path.join(self.directory, "one.txt") : b"one.txt",
+			os.path.join(self.directory, "two.txt") : b"two.txt"
+		}
+		self.assertEqual(processor.process(self.directory), expected)
+		self.assertEqual(extractor.calls, 2)
+		# Second run shouldn't need to extract anything
+		self.assertEqual(processor.process(self.directory), expected)
+		self.assertEqual(extractor.calls, 2)
+		self.assertEqual(self.cache.hits, 2)
+		# Data from a parallel run should be cached too
+		self.cache.clear()
+		processor = FileProcessor(searcher, [ MockIgnoreCacheFilterer() ], MockCountingExtractor(),
+			executor="process", workers=2, cache=self.cache)
+		self.assertEqual(processor.process(self.directory), expected)
+		self.assertEqual(len(self.cache), 2)
+		# Data should be committed even if the caller stops iterating early
+		self.cache.clear()
+		self.cache.flush()
+		results = processor.iterprocess(self.directory)
+		next(results)
+		results.close()
+		with ExtractionCache( os.path.join(self.directory, "cache.sqlite") ) as cache:
+			self.assertEqual(len(cache), 1)
@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+sys.path.append(os.environ.get("PROJECT_ROOT_DIRECTORY", "."))
+
+from fileprocessor import FileProcessor
+from fileprocessor.searchers import FileSearcher
+from fileprocessor.deduplicators import *
+from helpers import TemporaryDirectoryMixin, MockCountingExtractor
+
+
+
+class TestDeduplicator(TemporaryDirectoryMixin, unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		# Large files have the same size, start and end but
+		# different middles, so only a full hash tells them apart
+		self.largeContents = [ b"a" * 10000 + middle + b"z" * 10000 for middle in (b"1", b"2") ]
+		self.paths = {
+			"original" : self.createFile("original", b"contents"),
+			"copy" : self.createFile("copy", b"contents"),
+			"sameSize" : self.createFile("sameSize", b"CONTENTS"),
+			"otherSize" : self.createFile("otherSize", b"other contents"),
+			"large1" : self.createFile("large1", self.largeContents[0]),
+			"large2" : self.createFile("large2", self.largeContents[1]),
+			"largeCopy" : self.createFile("largeCopy", self.largeContents[1])
+		}
+		self.paths["link"] = os.path.join(self.directory, "link")
+		os.link(self.paths["original"], self.paths["link"])
+
+	def duplicatesOf(self, deduplicator, names):
+		paths = [ self.paths[name] for name in names ]
+		return [ deduplicator.duplicateOf(path) for path in paths ]
+
+	def test_byInode(self):
+		deduplicator = Deduplicator()
+		names = [ "original", "copy", "sameSize", "link", "large1", "large2", "largeCopy" ]
+		self.assertEqual(self.duplicatesOf(deduplicator, names),
+			[ None, None, None, self.paths["original"], None, None, None ])
+		self.assertEqual(deduplicator.duplicates, { self.paths["link"] : self.paths["original"] })
+		self.assertEqual( (deduplicator.skippedLinks, deduplicator.skippedCopies), (1, 0) )
+		self.assertEqual(deduplicator.skipped, 1)
+		# Test non-existent files are never duplicates
+		self.assertIsNone(deduplicator.duplicateOf("non-existent"))
+		# Test reset
+		deduplicator.reset()
+		self.assertEqual(deduplicator.duplicates, {})
+		self.assertEqual(deduplicator.skipped, 0)
+		self.assertIsNone(deduplicator.duplicateOf(self.paths["link"]))
+
+	def test_byContent(self):
+		deduplicator = Deduplicator(byContent=True)
+		names = [ "original", "copy", "sameSize", "otherSize", "link", "large1", "large2", "largeCopy" ]
+		self.assertEqual(self.duplicatesOf(deduplicator, names),
+			[ None, self.paths["original"], None, None, self.paths["original"],
+			  None, None, self.paths["large2"] ])
+		self.assertEqual( (deduplicator.skippedLinks, deduplicator.skippedCopies), (1, 2) )
+
+	def test_resolve(self):
+		deduplicator = Deduplicator(byContent=True)
+		original = self.paths["original"]
+		self.assertIsNone(deduplicator.duplicateOf(original))
+		# Test duplicates wait for their original's data
+		self.assertEqual(deduplicator.duplicateOf(self.paths["link"]), original)
+		self.assertEqual(deduplicator.dataFor(original), (False, None))
+		self.assertEqual(deduplicator.resolve(original, "data"), [ self.paths["link"] ])
+		# Test later duplicates can use the data straight away
+		self.assertEqual(deduplicator.duplicateOf(self.paths["copy"]), original)
+		self.assertEqual(deduplicator.dataFor(original), (True, "data"))
+		self.assertEqual(deduplicator.resolve(original, "data"), [])
+
+	def test_maxKeptData(self):
+		with self.assertRaises(ValueError):
+			Deduplicator(maxKeptData=0)
+		deduplicator = Deduplicator(byContent=True, maxKeptData=1)
+		for name in ("original", "otherSize"):
+			self.assertIsNone(deduplicator.duplicateOf(self.paths[name]))
+			deduplicator.resolve(self.paths[name], name)
+		# Original's data has been dropped, so it's forgotten and its
+		# copy is extracted again
+		self.assertEqual(list(deduplicator._data), [ self.paths["otherSize"] ])
+		self.assertIsNone(deduplicator.duplicateOf(self.paths["copy"]))
+		deduplicator.resolve(self.paths["copy"], "copy")
+		# The copy then stands in for the original, including for its link
+		self.assertEqual(deduplicator.duplicateOf(self.paths["link"]), self.paths["copy"])
+		self.assertEqual(deduplicator.dataFor(self.paths["copy"]), (True, "copy"))
+		self.assertEqual(deduplicator.skipped, 1)
+		self.assertEqual(list(deduplicator._sizes), [ self.paths["copy"] ])
+
+	def test_fileProcessor(self):
+		for executor in ("serial", "process"):
+			extractor = MockCountingExtractor()
+			deduplicator = Deduplicator(byContent=True)
+			processor = FileProcessor(FileSearcher(), [], extractor,
+				executor=executor, workers=2, deduplicator=deduplicator)
+			data = processor.process(self.directory)
+			self.assertEqual(sorted(data), sorted(self.paths.values()))
+			for path, contents in data.items():
+				with open(path, "rb") as f:
+					self.assertEqual(contents, f.read())
+			self.assertEqual(deduplicator.skipped, 3)
+			if executor == "serial":
+				self.assertEqual(extractor.calls, len(self.paths) - 3)
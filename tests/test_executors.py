@@ -0,0 +1,261 @@
+import unittest
+import sys
+import os
+sys.path.append(os.environ.get("PROJECT_ROOT_DIRECTORY", "."))
+
+import threading
+import time
+import concurrent.futures
+from fileprocessor.executors import *
+from fileprocessor.executors import _extractBatch
+
+
+
+class MockExtractor:
+
+	def extract(self, filename):
+		if filename == "bad.txt":
+			raise IOError("Could not read file")
+		return filename.upper()
+
+
+class MockConcurrencyExtractor:
+
+	"""Records the largest number of files it was run on at once."""
+
+	def __init__(self, threadSafe):
+		self.threadSafe = threadSafe
+		self.active = 0
+		self.maxActive = 0
+		self.lock = threading.Lock()
+
+	def extract(self, filename):
+		with self.lock:
+			self.active += 1
+			self.maxActive = max(self.maxActive, self.active)
+		time.sleep(0.01)
+		with self.lock:
+			self.active -= 1
+		return filename
+
+
+class MockBatchExtractor:
+
+	"""Records the batches of files it was given."""
+
+	def __init__(self):
+		self.batches = []
+
+	def extract(self, filename):
+		raise NotImplementedError("Files should be extracted in batches")
+
+	def extractBatch(self, paths):
+		self.batches.append( list(paths) )
+		if "bad.txt" in paths:
+			raise IOError("Could not read file")
+		return [ path.upper() for path in paths ]
+
+
+class TestSerialExecutor(unittest.TestCase):
+
+	def setUp(self):
+		self.executor = SerialExecutor(MockExtractor())
+
+	def tearDown(self):
+		self.executor = None
+
+	def test_map(self):
+		with self.executor:
+			self.assertEqual(list(self.executor.map([])), [])
+			self.assertEqual(list(self.executor.map( ["a.txt", "b.txt"] )),
+				[ ("a.txt", "A.TXT"), ("b.txt", "B.TXT") ])
+			# Serial executor should raise the extractor's exceptions unchanged
+			with self.assertRaises(IOError):
+				list(self.executor.map( ["a.txt", "bad.txt"] ))
+
+	def test_batches(self):
+		self.assertTrue( extractsInBatches(MockBatchExtractor()) )
+		self.assertFalse( extractsInBatches(MockExtractor()) )
+		with self.assertRaises(ValueError):
+			SerialExecutor(MockExtractor(), batchSize=0)
+		with self.assertRaises(ValueError):
+			SerialExecutor(MockExtractor(), maxBatchBytes=0)
+
+		extractor = MockBatchExtractor()
+		executor = SerialExecutor(extractor, batchSize=3, maxBatchBytes=100)
+		paths = [ "{}.txt".format(i) for i in range(7) ]
+		sizes = [ 10, 10, 10, 90, 20, 10, 10 ]
+		results = []
+		with executor:
+			self.assertTrue(executor.needsSizes())
+			for path, size in zip(paths, sizes):
+				executor.submit(path, size)
+				results.extend( executor.results() )
+			self.assertEqual(executor.pending(), 2)
+			results.extend( executor.results(wait=True) )
+		self.assertEqual(results, [ (path, path.upper()) for path in paths ])
+		# Batches are handed over when they're full or too big
+		self.assertEqual(extractor.batches, [ paths[:3], paths[3:5], paths[5:] ])
+		# Extractors which don't override extractBatch() are given one file at a time
+		self.assertFalse( SerialExecutor(MockExtractor()).needsSizes() )
+
+
+class TestProcessExecutor(unittest.TestCase):
+
+	def test_construction(self):
+		executor = ProcessExecutor(MockExtractor(), 3, 5)
+		self.assertEqual(executor.workers, 3)
+		self.assertEqual(executor.batchSize, 5)
+		executor = ProcessExecutor(MockExtractor())
+		self.assertEqual(executor.workers, os.cpu_count() or 1)
+		self.assertEqual(executor.batchSize, ProcessExecutor.DEFAULT_BATCH_SIZE)
+		# Test invalid worker counts and batch sizes
+		with self.assertRaises(ValueError):
+			ProcessExecutor(MockExtractor(), 0)
+		with self.assertRaises(ValueError):
+			ProcessExecutor(MockExtractor(), 2, 0)
+
+	def test_map(self):
+		paths = [ "{}.txt".format(i) for i in range(50) ]
+		with ProcessExecutor(MockExtractor(), 2, 3) as executor:
+			self.assertEqual(dict(executor.map(paths)),
+				{ path : path.upper() for path in paths })
+			with self.assertRaises(ExtractionError) as context:
+				list(executor.map( ["a.txt", "bad.txt"] ))
+			self.assertEqual(context.exception.path, "bad.txt")
+			self.assertTrue( isinstance(context.exception.error, IOError) )
+
+
+
+	def test_extractBatch(self):
+		extractor = MockBatchExtractor()
+		executor = ProcessExecutor(extractor, workers=2, batchSize=4)
+		with executor:
+			self.assertEqual(sorted(executor.map( [ "a.txt", "b.txt", "c.txt" ] )),
+				[ ("a.txt", "A.TXT"), ("b.txt", "B.TXT"), ("c.txt", "C.TXT") ])
+		# Failing batches are extracted one file at a time to find the failing file
+		extractor = MockBatchExtractor()
+		with self.assertRaises(ExtractionError) as context:
+			_extractBatch([ "a.txt", "bad.txt", "c.txt" ], extractor)
+		self.assertEqual(context.exception.path, "bad.txt")
+		self.assertEqual(extractor.batches, [ [ "a.txt", "bad.txt", "c.txt" ], [ "a.txt" ], [ "bad.txt" ] ])
+		# Test extractBatch() returning the wrong number of results
+		extractor.extractBatch = lambda paths: []
+		with self.assertRaises(ExtractionError) as context:
+			_extractBatch([ "a.txt" ], extractor)
+		self.assertTrue( isinstance(context.exception.error, ValueError) )
+
+
+class TestThreadExecutor(unittest.TestCase):
+
+	def test_map(self):
+		paths = [ "{}.txt".format(i) for i in range(50) ]
+		with ThreadExecutor(MockExtractor(), 4) as executor:
+			self.assertEqual(dict(executor.map(paths)),
+				{ path : path.upper() for path in paths })
+			with self.assertRaises(ExtractionError) as context:
+				list(executor.map( ["a.txt", "bad.txt"] ))
+			self.assertEqual(context.exception.path, "bad.txt")
+
+	def test_resultsAfterError(self):
+		with ThreadExecutor(MockExtractor(), 3) as executor:
+			for path in ("a.txt", "bad.txt", "c.txt"):
+				executor.submit(path)
+			concurrent.futures.wait(executor._futures)
+			# Other finished results are yielded before the error is raised
+			results = []
+			with self.assertRaises(ExtractionError) as context:
+				for pair in executor.results():
+					results.append(pair)
+			self.assertEqual(context.exception.path, "bad.txt")
+			self.assertEqual(sorted(results), [ ("a.txt", "A.TXT"), ("c.txt", "C.TXT") ])
+			# Executor can still be used after the error
+			self.assertEqual(executor.pending(), 0)
+			self.assertEqual(list(executor.map( ["d.txt"] )), [ ("d.txt", "D.TXT") ])
+
+	def test_threadSafety(self):
+		paths = [ "{}.txt".format(i) for i in range(16) ]
+		# Thread-safe extractors should be run on many files at once
+		extractor = MockConcurrencyExtractor(True)
+		with ThreadExecutor(extractor, 4) as executor:
+			self.assertEqual(len(list(executor.map(paths))), len(paths))
+		self.assertGreater(extractor.maxActive, 1)
+		# Other extractors should never be run on more than one file at once
+		extractor = MockConcurrencyExtractor(False)
+		with ThreadExecutor(extractor, 4) as executor:
+			self.assertEqual(len(list(executor.map(paths))), len(paths))
+		self.assertEqual(extractor.maxActive, 1)
+
+class MockSizedExtractor:
+
+	"""Records the largest total size of the files it was run on at once.
+
+	The size of each file is the number in its name.
+
+	"""
+
+	threadSafe = True
+
+	def __init__(self):
+		self.activeBytes = 0
+		self.maxActiveBytes = 0
+		self.lock = threading.Lock()
+
+	def extract(self, filename):
+		size = int(filename)
+		with self.lock:
+			self.activeBytes += size
+			self.maxActiveBytes = max(self.maxActiveBytes, self.activeBytes)
+		time.sleep(0.005)
+		with self.lock:
+			self.activeBytes -= size
+		return size
+
+
+class TestBoundedExecutor(unittest.TestCase):
+
+	def submitAll(self, executor, sizes):
+		"""Submit files of the given sizes like FileProcessor, returning results and largest in-flight total."""
+		results = []
+		maxInFlight = []
+		with executor:
+			for size in sizes:
+				while executor.full(size):
+					results.extend( executor.results(wait=True) )
+				executor.submit(str(size), size)
+				maxInFlight.append( (executor.inFlightBytes, executor.inFlightFiles) )
+				results.extend( executor.results() )
+			while executor.pending():
+				results.extend( executor.results(wait=True) )
+			self.assertEqual( (executor.inFlightBytes, executor.inFlightFiles), (0, 0) )
+		return sorted(results), maxInFlight
+
+	def test_construction(self):
+		with self.assertRaises(ValueError):
+			BoundedExecutor(SerialExecutor(MockExtractor()), maxInFlightBytes=0)
+		with self.assertRaises(ValueError):
+			BoundedExecutor(SerialExecutor(MockExtractor()), maxQueuedResults=0)
+
+	def test_maxInFlightBytes(self):
+		sizes = [ 10, 20, 30, 40, 500, 5, 5, 5, 60, 1 ]
+		extractor = MockSizedExtractor()
+		executor = BoundedExecutor(ThreadExecutor(extractor, workers=8), maxInFlightBytes=100)
+		results, inFlight = self.submitAll(executor, sizes)
+		self.assertEqual(results, sorted( (str(size), size) for size in sizes ))
+		for inFlightBytes, inFlightFiles in inFlight:
+			# Only an oversized file on its own may go over the budget
+			self.assertTrue(inFlightBytes <= 100 or inFlightFiles == 1)
+		self.assertEqual(extractor.maxActiveBytes, 500)
+		# Without the oversized file, the budget is never exceeded
+		extractor = MockSizedExtractor()
+		executor = BoundedExecutor(ThreadExecutor(extractor, workers=8), maxInFlightBytes=100)
+		self.submitAll(executor, [ size for size in sizes if size != 500 ] * 3)
+		self.assertLessEqual(extractor.maxActiveBytes, 100)
+
+	def test_maxQueuedResults(self):
+		sizes = list(range(1, 50))
+		executor = BoundedExecutor(ProcessExecutor(MockSizedExtractor(), workers=2, batchSize=4),
+			maxQueuedResults=6)
+		results, inFlight = self.submitAll(executor, sizes)
+		self.assertEqual(len(results), len(sizes))
+		self.assertLessEqual(max(files for size, files in inFlight), 6)
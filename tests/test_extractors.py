@@ -36,6 +36,18 @@ class MockByteExtractor(ByteExtractor):
 	def extractFromBytes(self, data):
 		return data
 
+class MockMmapByteExtractor(MmapByteExtractor):
+
+	def extractFromBuffer(self, buffer):
+		# Copy the buffer, since it's released once this returns
+		return type(buffer), buffer.readonly, bytes(buffer)
+
+class MockLeakingMmapByteExtractor(MmapByteExtractor):
+
+	def extractFromBuffer(self, buffer):
+		# Keeps a slice of the buffer alive past extraction
+		return buffer[1:3]
+
 class MockByteStreamExtractor(ByteStreamExtractor):
 
 	def extractFromStream(self, stream):
@@ -44,6 +56,15 @@ class MockByteStreamExtractor(ByteStreamExtractor):
 		contents = stream.read()
 		return stream, contents
 
+class MockChunkExtractor(ByteStreamExtractor):
+
+	def __init__(self, blockSize = None):
+		self.blockSize = blockSize
+
+	def extractFromChunks(self, chunks):
+		# Copy the chunks, since they're overwritten by the next one
+		return [ (chunk.obj, chunk.readonly, bytes(chunk)) for chunk in chunks ]
+
 class MockTextExtractor(TextExtractor):
 
 	def extractFromString(self, data):
@@ -55,6 +76,28 @@ class MockTextStreamExtractor(TextStreamExtractor):
 		contents = stream.read()
 		return stream, contents
 
+class MockSeekingStreamExtractor(ByteStreamExtractor):
+
+	def extractFromStream(self, stream):
+		first = stream.readline()
+		stream.seek(-4, io.SEEK_END)
+		return first, stream.read(), stream.tell()
+
+class MockLineExtractor(TextStreamExtractor):
+
+	def extractFromStream(self, stream):
+		return [ line for line in stream ]
+
+class MockFilenameExtractor(Extractor):
+
+	def extract(self, filename):
+		return filename
+
+class MockOverridingTextExtractor(TextExtractor):
+
+	def extract(self, filename):
+		return "overridden"
+
 
 class TestByteExtractor(unittest.TestCase):
 
@@ -68,6 +111,9 @@ class TestByteExtractor(unittest.TestCase):
 		self.concreteExtractor = None
 		removeTestFile()
 
+	def test_threadSafe(self):
+		self.assertTrue(self.byteExtractor.threadSafe)
+
 	def test_extract(self):
 		# Test invalid type
 		with self.assertRaises(TypeError):
@@ -86,6 +132,47 @@ class TestByteExtractor(unittest.TestCase):
 		with self.assertRaises(NotImplementedError):
 			self.byteExtractor.extractFromBytes( bytes() )
 
+class TestMmapByteExtractor(unittest.TestCase):
+
+	def setUp(self):
+		self.mmapExtractor = MmapByteExtractor()
+		self.concreteExtractor = MockMmapByteExtractor()
+		createTestFile("mmap_byte")
+
+	def tearDown(self):
+		self.mmapExtractor = None
+		self.concreteExtractor = None
+		removeTestFile()
+
+	def test_threadSafe(self):
+		self.assertTrue(self.mmapExtractor.threadSafe)
+
+	def test_extract(self):
+		# Test invalid type
+		with self.assertRaises(TypeError):
+			self.mmapExtractor.extract(44)
+		# Test with non-existent file
+		with self.assertRaises(IOError):
+			self.mmapExtractor.extract("some_file.txt")
+		with self.assertRaises(IOError):
+			self.concreteExtractor.extract("some_file.txt")
+		# Test with existing file
+		with self.assertRaises(NotImplementedError):
+			self.mmapExtractor.extract(TEST_FILENAME)
+		self.assertEqual(self.concreteExtractor.extract(TEST_FILENAME),
+			(memoryview, True, b"mmap_byte"))
+		# Test empty files, which can't be mapped
+		createTestFile("")
+		self.assertEqual(self.concreteExtractor.extract(TEST_FILENAME),
+			(memoryview, True, b""))
+		# Test a slice of the buffer outliving the extraction
+		createTestFile("mmap_byte")
+		self.assertEqual(bytes(MockLeakingMmapByteExtractor().extract(TEST_FILENAME)), b"ma")
+
+	def test_extractFromBuffer(self):
+		with self.assertRaises(NotImplementedError):
+			self.mmapExtractor.extractFromBuffer( memoryview(bytes()) )
+
 class TestByteStreamExtractor(unittest.TestCase):
 
 	def setUp(self):
@@ -98,6 +185,9 @@ class TestByteStreamExtractor(unittest.TestCase):
 		self.concreteExtractor = None
 		removeTestFile()
 
+	def test_threadSafe(self):
+		self.assertTrue(self.streamExtractor.threadSafe)
+
 	def test_extract(self):
 		# Test invalid type
 		with self.assertRaises(TypeError):
@@ -121,6 +211,31 @@ class TestByteStreamExtractor(unittest.TestCase):
 		with self.assertRaises(NotImplementedError):
 			self.streamExtractor.extractFromStream( stream )
 
+	def test_extractFromChunks(self):
+		with self.assertRaises(NotImplementedError):
+			self.streamExtractor.extractFromChunks( iter([]) )
+		# Test chunks share one read-only buffer
+		chunks = MockChunkExtractor(4).extract(TEST_FILENAME)
+		self.assertEqual([ data for buffer, readonly, data in chunks ],
+			[ b"byte", b"_str", b"eam" ])
+		self.assertTrue( all(readonly for buffer, readonly, data in chunks) )
+		self.assertEqual( len(set(id(buffer) for buffer, readonly, data in chunks)), 1 )
+		# Test empty files have no chunks
+		createTestFile("")
+		self.assertEqual(MockChunkExtractor(4).extract(TEST_FILENAME), [])
+
+	def test_chooseBlockSize(self):
+		self.assertEqual(MockChunkExtractor(100).chooseBlockSize(io.BytesIO()), 100)
+		# Test streams without a file fall back to the minimum
+		self.assertEqual(self.streamExtractor.chooseBlockSize(io.BytesIO()),
+			ByteStreamExtractor.MIN_BLOCK_SIZE)
+		# Test block size is a multiple of the filesystem's
+		with open(TEST_FILENAME, "rb") as f:
+			blockSize = self.streamExtractor.chooseBlockSize(f)
+			fsBlockSize = os.fstat(f.fileno()).st_blksize
+		self.assertGreaterEqual(blockSize, ByteStreamExtractor.MIN_BLOCK_SIZE)
+		self.assertEqual(blockSize % fsBlockSize, 0)
+
 class TestTextExtractor(unittest.TestCase):
 
 	def setUp(self):
@@ -133,6 +248,9 @@ class TestTextExtractor(unittest.TestCase):
 		self.concreteExtractor = None
 		removeTestFile()
 
+	def test_threadSafe(self):
+		self.assertTrue(self.textExtractor.threadSafe)
+
 	def test_extract(self):
 		# Test invalid type
 		with self.assertRaises(TypeError):
@@ -163,6 +281,9 @@ class TestTextStreamExtractor(unittest.TestCase):
 		self.concreteExtractor = None
 		removeTestFile()
 
+	def test_threadSafe(self):
+		self.assertTrue(self.streamExtractor.threadSafe)
+
 	def test_extract(self):
 		# Test invalid type
 		with self.assertRaises(TypeError):
@@ -184,4 +305,58 @@ class TestTextStreamExtractor(unittest.TestCase):
 		# Construct a test stream
 		stream = io.StringIO("some_stream_here")
 		with self.assertRaises(NotImplementedError):
-			self.streamExtractor.extractFromStream( stream )			
\ No newline at end of file
+			self.streamExtractor.extractFromStream( stream )			
+
+class TestCompositeExtractor(unittest.TestCase):
+
+	def setUp(self):
+		createTestFile("composite\ndata")
+		self.extractors = [
+			MockByteExtractor(), MockMmapByteExtractor(), MockChunkExtractor(4),
+			MockByteStreamExtractor(), MockTextExtractor(), MockTextStreamExtractor(),
+			MockFilenameExtractor(), MockOverridingTextExtractor()
+		]
+		self.compositeExtractor = CompositeExtractor(self.extractors)
+
+	def tearDown(self):
+		self.extractors = None
+		self.compositeExtractor = None
+		removeTestFile()
+
+	def test_construction(self):
+		self.assertEqual(self.compositeExtractor.extractors, self.extractors)
+		self.assertFalse(self.compositeExtractor.threadSafe)
+		self.assertTrue(CompositeExtractor([ MockByteExtractor(), MockTextExtractor() ]).threadSafe)
+		self.assertNotEqual(CompositeExtractor([ MockByteExtractor() ]).version,
+			CompositeExtractor([ MockTextExtractor() ]).version)
+
+	def test_extract(self):
+		# Test invalid type
+		with self.assertRaises(TypeError):
+			self.compositeExtractor.extract(44)
+		# Test with non-existent file
+		with self.assertRaises(IOError):
+			self.compositeExtractor.extract("some_file.txt")
+		# Test children get the same data as when run on their own
+		results = self.compositeExtractor.extract(TEST_FILENAME)
+		self.assertEqual(len(results), len(self.extractors))
+		self.assertEqual(results[0], self.extractors[0].extract(TEST_FILENAME))
+		self.assertEqual(results[1], self.extractors[1].extract(TEST_FILENAME))
+		self.assertEqual([ data for buffer, readonly, data in results[2] ],
+			[ data for buffer, readonly, data in self.extractors[2].extract(TEST_FILENAME) ])
+		self.assertEqual(results[3][1], self.extractors[3].extract(TEST_FILENAME)[1])
+		self.assertEqual(results[4], self.extractors[4].extract(TEST_FILENAME))
+		self.assertEqual(results[5][1], self.extractors[5].extract(TEST_FILENAME)[1])
+		self.assertEqual(results[6], TEST_FILENAME)
+		self.assertEqual(results[7], "overridden")
+		# Stream children read the mapped file rather than a copy of it
+		self.assertFalse(isinstance(results[3][0], io.BytesIO))
+		self.assertFalse(isinstance(results[5][0], io.StringIO))
+		self.assertEqual(CompositeExtractor([ MockSeekingStreamExtractor(), MockLineExtractor() ]).extract(TEST_FILENAME),
+			[ (b"composite\n", b"data", 14), [ "composite\n", "data" ] ])
+		# Test empty files
+		createTestFile("")
+		self.assertEqual(CompositeExtractor([ MockByteExtractor(), MockTextExtractor(),
+			MockChunkExtractor() ]).extract(TEST_FILENAME), [ b"", "", [] ])
+		# Test no children
+		self.assertEqual(CompositeExtractor([]).extract(TEST_FILENAME), [])
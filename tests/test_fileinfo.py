@@ -0,0 +1,64 @@
+import unittest
+import sys
+import os
+sys.path.append(os.environ.get("PROJECT_ROOT_DIRECTORY", "."))
+
+from fileprocessor.fileinfo import *
+
+
+
+# Constant which determines filename of test file
+TEST_FILENAME = ".__fileprocessor_test.txt"
+
+class TestFileInfo(unittest.TestCase):
+
+	def setUp(self):
+		with open(TEST_FILENAME, "w") as f:
+			f.write("file_info")
+		self.stat = os.stat(TEST_FILENAME)
+
+	def tearDown(self):
+		os.remove(TEST_FILENAME)
+
+	def checkMetadata(self, info):
+		self.assertEqual(info.path, TEST_FILENAME)
+		self.assertEqual(info.size, 9)
+		self.assertEqual(info.mtime, self.stat.st_mtime)
+		self.assertEqual(info.mtimeNs, self.stat.st_mtime_ns)
+		self.assertEqual(info.inode, self.stat.st_ino)
+		self.assertEqual(info.device, self.stat.st_dev)
+
+	def test_construction(self):
+		self.checkMetadata( FileInfo(TEST_FILENAME) )
+		self.checkMetadata( FileInfo(TEST_FILENAME, stat=self.stat) )
+		with os.scandir(".") as entries:
+			entry = [ entry for entry in entries if entry.name == TEST_FILENAME ][0]
+		info = FileInfo.fromEntry(entry)
+		self.assertEqual(info.path, entry.path)
+		self.assertEqual(info.inode, self.stat.st_ino)
+		self.assertEqual(info.size, 9)
+
+	def test_stat(self):
+		info = FileInfo(TEST_FILENAME)
+		stat = info.stat()
+		self.assertEqual(stat.st_size, 9)
+		# Test the file is only stat'd once
+		os.remove(TEST_FILENAME)
+		self.assertIs(info.stat(), stat)
+		self.assertEqual(info.size, 9)
+		# Test files which can't be stat'd
+		info = FileInfo(TEST_FILENAME)
+		self.assertIsNone(info.tryStat())
+		with self.assertRaises(OSError):
+			info.size
+		with open(TEST_FILENAME, "w") as f:
+			f.write("recreated")
+
+	def test_path(self):
+		info = FileInfo(TEST_FILENAME)
+		self.assertEqual(str(info), TEST_FILENAME)
+		self.assertEqual(os.fspath(info), TEST_FILENAME)
+		self.assertEqual(info, FileInfo(TEST_FILENAME))
+		self.assertNotEqual(info, FileInfo("other.txt"))
+		self.assertEqual(len({ info, FileInfo(TEST_FILENAME) }), 1)
+		self.assertTrue(os.path.isfile(info))
@@ -3,7 +3,14 @@ import sys
 import os
 sys.path.append(os.environ.get("PROJECT_ROOT_DIRECTORY", "."))
 
-from fileprocessor import FileProcessor
+import asyncio
+import threading
+import unittest.mock
+import shutil
+import tempfile
+from fileprocessor import FileProcessor, AsyncFileProcessor, ExtractionError
+from fileprocessor.searchers import FileSearcher
+from fileprocessor.abstracts import Extractor, AsyncFilterer, AsyncExtractor
 
 class MockFileSearcher:
 
@@ -18,6 +25,19 @@ class MockFileSearcher:
 	def search(self, rootDirectory):
 		return self.fileLists[rootDirectory]
 
+class MockLazyFileSearcher(MockFileSearcher):
+
+	"""Records how many files it has found so far."""
+
+	def __init__(self):
+		super().__init__()
+		self.found = 0
+
+	def iterSearch(self, rootDirectory):
+		for path in self.fileLists[rootDirectory]:
+			self.found += 1
+			yield path
+
 class MockFilterer:
 
 	def filter(self, fileList):
@@ -45,6 +65,46 @@ class MockDataExtractor:
 	def extract(self, filePath):
 		return filePath + ": PROCESSED"
 
+class MockFailingExtractor:
+
+	def extract(self, filePath):
+		if filePath == "/another_path/test.txt":
+			raise ValueError("Could not process file")
+		return filePath + ": PROCESSED"
+
+class MockBatchExtractor(Extractor):
+
+	"""Records the batches of files it was given."""
+
+	def __init__(self):
+		self.batches = []
+
+	def extract(self, filePath):
+		raise NotImplementedError("Files should be extracted in batches")
+
+	def extractBatch(self, paths):
+		self.batches.append( list(paths) )
+		return [ path + ": PROCESSED" for path in paths ]
+
+class MockAsyncFilterer(AsyncFilterer):
+
+	async def filter(self, fileList):
+		await asyncio.sleep(0)
+		return [ path for path in fileList if path != "/programs/cat.bin" ]
+
+class MockAsyncExtractor(AsyncExtractor):
+
+	def __init__(self):
+		self.active = 0
+		self.maxActive = 0
+
+	async def extract(self, filePath):
+		self.active += 1
+		self.maxActive = max(self.maxActive, self.active)
+		await asyncio.sleep(0.01)
+		self.active -= 1
+		return filePath + ": PROCESSED"
+
 class TestFileProcessor(unittest.TestCase):
 
 	def setUp(self):
@@ -74,6 +134,11 @@ class TestFileProcessor(unittest.TestCase):
 		self.assertEqual(self.fileProcessor.searcher, self.mockSearcher)
 		self.assertEqual(self.fileProcessor.filterers, self.mockFilterers)
 		self.assertEqual(self.fileProcessor.extractor, self.mockExtractor)
+		self.assertEqual(self.fileProcessor.executor, "serial")
+		# Test unknown executor
+		with self.assertRaises(ValueError):
+			FileProcessor(self.mockSearcher, self.mockFilterers,
+				self.mockExtractor, executor="non-existent")
 
 	def test_process_failure(self):
 		# Invalid directory (type)
@@ -104,4 +169,165 @@ class TestFileProcessor(unittest.TestCase):
 			EXPECTED_DATA)
 		# Test with multiple directores, where they all exist
 		self.assertEqual(self.fileProcessor.process( ["root_dir", "second_dir"] ),
-			EXPECTED_DATA_WITH_MULTIPLE_DIRECTORIES)
\ No newline at end of file
+			EXPECTED_DATA_WITH_MULTIPLE_DIRECTORIES)
+		# Test filter chain records what happened in the last run
+		firstStats, secondStats = self.fileProcessor.filterChain.statistics
+		self.assertEqual( (firstStats.tested, firstStats.rejected), (6, 1) )
+		self.assertEqual( (secondStats.tested, secondStats.rejected), (5, 1) )
+
+	def test_iterprocess(self):
+		# Invalid directory (type) should be reported straight away
+		with self.assertRaises(TypeError):
+			self.fileProcessor.iterprocess(5454)
+		self.assertEqual(list(self.fileProcessor.iterprocess("empty_dir")), [])
+		self.assertEqual(sorted(self.fileProcessor.iterprocess("root_dir")), [
+			("/another_path/test.txt", "/another_path/test.txt: PROCESSED"),
+			("/path/to/stuff.txt", "/path/to/stuff.txt: PROCESSED")
+		])
+		# Test first result is produced before the search has finished
+		searcher = MockLazyFileSearcher()
+		processor = FileProcessor(searcher, [], self.mockExtractor)
+		results = processor.iterprocess("root_dir")
+		self.assertEqual(next(results), ("/path/to/stuff.txt", "/path/to/stuff.txt: PROCESSED"))
+		self.assertEqual(searcher.found, 1)
+		self.assertEqual(len(list(results)), 3)
+		self.assertEqual(searcher.found, 4)
+
+	def test_process_parallel(self):
+		EXPECTED_DATA = {
+			"/path/to/stuff.txt" : "/path/to/stuff.txt: PROCESSED",
+			"/another_path/test.txt" : "/another_path/test.txt: PROCESSED",
+			"two_more_.txt" : "two_more_.txt: PROCESSED",
+			"files.txt" : "files.txt: PROCESSED"
+		}
+		# Use batches smaller than the listing so more than one is sent
+		processor = FileProcessor(self.mockSearcher, self.mockFilterers,
+			self.mockExtractor, executor="process", workers=2, batchSize=1)
+		self.assertEqual(processor.process( ["root_dir", "second_dir"] ), EXPECTED_DATA)
+		self.assertEqual(processor.process("empty_dir"), {})
+		processor = FileProcessor(self.mockSearcher, self.mockFilterers,
+			self.mockExtractor, executor="thread", workers=2)
+		self.assertEqual(processor.process( ["root_dir", "second_dir"] ), EXPECTED_DATA)
+		# Files which can't be stat'd count as empty when bounding
+		# the bytes in flight, so they're still processed
+		processor = FileProcessor(self.mockSearcher, self.mockFilterers,
+			self.mockExtractor, executor="thread", workers=2,
+			maxInFlightBytes=1024, maxQueuedResults=1)
+		self.assertEqual(processor.process( ["root_dir", "second_dir"] ), EXPECTED_DATA)
+
+	def test_process_batches(self):
+		EXPECTED_DATA = {
+			"/path/to/stuff.txt" : "/path/to/stuff.txt: PROCESSED",
+			"/another_path/test.txt" : "/another_path/test.txt: PROCESSED",
+			"two_more_.txt" : "two_more_.txt: PROCESSED",
+			"files.txt" : "files.txt: PROCESSED"
+		}
+		# Batch extractors are given every file at once by default
+		extractor = MockBatchExtractor()
+		processor = FileProcessor(self.mockSearcher, self.mockFilterers, extractor)
+		self.assertEqual(processor.process( ["root_dir", "second_dir"] ), EXPECTED_DATA)
+		self.assertEqual(len(extractor.batches), 1)
+		# Test smaller batches, in the calling thread and in worker threads
+		for executor in ("serial", "thread"):
+			extractor = MockBatchExtractor()
+			processor = FileProcessor(self.mockSearcher, self.mockFilterers,
+				extractor, executor=executor, workers=2, batchSize=3)
+			self.assertEqual(processor.process( ["root_dir", "second_dir"] ), EXPECTED_DATA)
+			self.assertEqual(sorted( len(batch) for batch in extractor.batches ), [ 1, 3 ])
+		# Test batches are limited by the total size of their files
+		directory = tempfile.mkdtemp()
+		try:
+			for name, size in (("a.txt", 50), ("b.txt", 50), ("c.txt", 50)):
+				with open(os.path.join(directory, name), "wb") as f:
+					f.write(b"x" * size)
+			extractor = MockBatchExtractor()
+			processor = FileProcessor(FileSearcher(), [], extractor, maxBatchBytes=100)
+			self.assertEqual(len(processor.process(directory)), 3)
+			self.assertEqual(sorted( len(batch) for batch in extractor.batches ), [ 1, 2 ])
+		finally:
+			shutil.rmtree(directory)
+
+	def test_process_parallel_failure(self):
+		processor = FileProcessor(self.mockSearcher, self.mockFilterers,
+			MockFailingExtractor(), executor="process", workers=2)
+		with self.assertRaises(ExtractionError) as context:
+			processor.process("root_dir")
+		self.assertEqual(context.exception.path, "/another_path/test.txt")
+		self.assertTrue( isinstance(context.exception.error, ValueError) )
+
+
+class TestAsyncFileProcessor(unittest.TestCase):
+
+	EXPECTED_DATA = {
+		"/path/to/stuff.txt" : "/path/to/stuff.txt: PROCESSED",
+		"/another_path/test.txt" : "/another_path/test.txt: PROCESSED",
+		"two_more_.txt" : "two_more_.txt: PROCESSED",
+		"files.txt" : "files.txt: PROCESSED"
+	}
+
+	def setUp(self):
+		self.mockSearcher = MockFileSearcher()
+		os.mkdir("empty_dir")
+		os.mkdir("root_dir")
+		os.mkdir("second_dir")
+
+	def tearDown(self):
+		self.mockSearcher = None
+		os.rmdir("empty_dir")
+		os.rmdir("root_dir")
+		os.rmdir("second_dir")
+
+	def test_construction(self):
+		with self.assertRaises(ValueError):
+			AsyncFileProcessor(self.mockSearcher, [], MockDataExtractor(), concurrency=0)
+
+	def test_process_failure(self):
+		processor = AsyncFileProcessor(self.mockSearcher, [], MockDataExtractor())
+		with self.assertRaises(TypeError):
+			asyncio.run( processor.process(5454) )
+		processor = AsyncFileProcessor(self.mockSearcher,
+			[ MockFilterer(), MockFilterer2() ], MockFailingExtractor())
+		with self.assertRaises(ExtractionError) as context:
+			asyncio.run( processor.process("root_dir") )
+		self.assertEqual(context.exception.path, "/another_path/test.txt")
+
+	def test_process_success(self):
+		# Test with normal, blocking components
+		processor = AsyncFileProcessor(self.mockSearcher,
+			[ MockFilterer(), MockFilterer2() ], MockDataExtractor())
+		self.assertEqual(asyncio.run( processor.process("non-existent") ), {})
+		self.assertEqual(asyncio.run( processor.process("empty_dir") ), {})
+		self.assertEqual(asyncio.run( processor.process( ["root_dir", "second_dir"] ) ),
+			self.EXPECTED_DATA)
+		# Test with mixture of normal and asynchronous components
+		extractor = MockAsyncExtractor()
+		processor = AsyncFileProcessor(self.mockSearcher,
+			[ MockFilterer(), MockAsyncFilterer() ], extractor, concurrency=2)
+		self.assertEqual(asyncio.run( processor.process( ["root_dir", "second_dir"] ) ),
+			self.EXPECTED_DATA)
+		self.assertEqual(extractor.maxActive, 2)
+
+	def test_directoryCheckOffLoop(self):
+		# Checking the directories exist shouldn't block the event loop
+		threads = []
+		isdir = os.path.isdir
+		def recordingIsdir(path):
+			threads.append( threading.current_thread() )
+			return isdir(path)
+		processor = AsyncFileProcessor(self.mockSearcher, [], MockDataExtractor())
+		with unittest.mock.patch("os.path.isdir", recordingIsdir):
+			asyncio.run( processor.process( ["root_dir", "non-existent"] ) )
+		self.assertEqual(len(threads), 2)
+		self.assertNotIn(threading.main_thread(), threads)
+
+	def test_iterprocess(self):
+		async def collect(processor):
+			return [ pair async for pair in processor.iterprocess("root_dir") ]
+
+		processor = AsyncFileProcessor(self.mockSearcher,
+			[ MockFilterer(), MockFilterer2() ], MockAsyncExtractor())
+		pairs = asyncio.run( collect(processor) )
+		self.assertEqual(sorted(pairs), [
+			("/another_path/test.txt", "/another_path/test.txt: PROCESSED"),
+			("/path/to/stuff.txt", "/path/to/stuff.txt: PROCESSED")
+		])
\ No newline at end of file
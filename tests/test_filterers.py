@@ -3,7 +3,34 @@ import sys
 import os
 sys.path.append(os.environ.get("PROJECT_ROOT_DIRECTORY", "."))
 
+import datetime
+import fnmatch
+import time
 from fileprocessor.filterers import *
+from helpers import TemporaryDirectoryMixin
+
+class TestCompileGlobPatterns(unittest.TestCase):
+
+	def test_compileGlobPatterns(self):
+		patterns = [ "*.txt", "/root/hello/*", "test_?.py", "[ab]*.c", "*/.git/*" ]
+		paths = [ "a.txt", "a.txt~", "/root/hello/x/y", "/root/hellox", "test_1.py",
+			"test_12.py", "a.c", "b/c.c", "c.c", "/repo/.git/HEAD", "/repo/.gitignore",
+			"line\nbreak.txt" ]
+		self.assertIsNone(compileGlobPatterns([]))
+		matches = compileGlobPatterns(patterns)
+		# Combined pattern should agree with fnmatch on every path
+		for path in paths:
+			expected = any(fnmatch.fnmatch(path, pattern) for pattern in patterns)
+			self.assertEqual(bool(matches(path)), expected, path)
+		# Test pattern which matches everything
+		matches = compileGlobPatterns([ "*.txt", "**" ])
+		self.assertTrue( all(matches(path) for path in paths) )
+		# Test matching the start of paths
+		matchesStart = compileGlobPatterns([ "/root/hello/", "*/.git/" ], prefix=True)
+		self.assertTrue(matchesStart("/root/hello/x/y"))
+		self.assertTrue(matchesStart("/repo/.git/objects/"))
+		self.assertFalse(matchesStart("/root/hellox"))
+		self.assertFalse(matchesStart("/repo/.gitignore"))
 
 class TestExcludeListFilterer(unittest.TestCase):
 
@@ -58,6 +85,31 @@ class TestExcludeListFilterer(unittest.TestCase):
 		self.assertEqual(self.listFilterer.filter(self.originalFileListing),
 			FILTERED_LISTING)
 
+	def test_iterFilter(self):
+		with self.assertRaises(TypeError):
+			self.emptyListFilterer.iterFilter(543)
+		self.assertEqual(list(self.listFilterer.iterFilter( iter(self.originalFileListing) )),
+			self.listFilterer.filter(self.originalFileListing))
+
+	def test_accepts(self):
+		for filterer in (self.emptyListFilterer, self.listFilterer):
+			self.assertEqual([ path for path in self.originalFileListing if filterer.accepts(path) ],
+				filterer.filter(self.originalFileListing))
+
+	def test_prunes(self):
+		self.assertFalse(self.emptyListFilterer.prunes("/root/hello"))
+		self.assertTrue(self.listFilterer.prunes("/root/hello"))
+		self.assertTrue(self.listFilterer.prunes("/root/hello/sub"))
+		# Only some files in these directories match the patterns
+		self.assertFalse(self.listFilterer.prunes("/root"))
+		self.assertFalse(self.listFilterer.prunes("/root/hello_world"))
+		filterer = ExcludeListFilterer([ "*/node_modules/*", "*/.snapshot*", "*.txt" ])
+		self.assertTrue(filterer.prunes(os.path.join("/src", "node_modules")))
+		self.assertTrue(filterer.prunes(os.path.join("/src", "lib", "node_modules", "dep")))
+		self.assertTrue(filterer.prunes(os.path.join("/src", ".snapshot")))
+		self.assertFalse(filterer.prunes(os.path.join("/src", "node_modules_old")))
+		self.assertFalse(filterer.prunes(os.path.join("/src", "docs.txt")))
+
 class TestIncludeListFilterer(unittest.TestCase):
 
 	def setUp(self):
@@ -111,6 +163,17 @@ class TestIncludeListFilterer(unittest.TestCase):
 		self.assertEqual(self.emptyListFilterer.filter(self.originalFileListing), [])
 		self.assertEqual(self.listFilterer.filter(self.originalFileListing), FILTERED_LISTING)
 
+	def test_iterFilter(self):
+		with self.assertRaises(TypeError):
+			self.emptyListFilterer.iterFilter(543)
+		self.assertEqual(list(self.listFilterer.iterFilter( iter(self.originalFileListing) )),
+			self.listFilterer.filter(self.originalFileListing))
+
+	def test_accepts(self):
+		for filterer in (self.emptyListFilterer, self.listFilterer):
+			self.assertEqual([ path for path in self.originalFileListing if filterer.accepts(path) ],
+				filterer.filter(self.originalFileListing))
+
 class TestExtensionFilterer(unittest.TestCase):
 
 	def setUp(self):
@@ -126,11 +189,13 @@ class TestExtensionFilterer(unittest.TestCase):
 		]
 		self.emptyExtensionFilterer = ExtensionFilterer([])
 		self.extensionFilterer = ExtensionFilterer(["py", "txt"])
+		self.compoundFilterer = ExtensionFilterer([".tar.gz", "JPG"], caseSensitive=False)
 
 	def tearDown(self):
 		self.originalFileListing = None
 		self.emptyExtensionFilterer = None
 		self.extensionFilterer = None
+		self.compoundFilterer = None
 
 	def test_construction(self):
 		# Test invalid type for extension
@@ -139,6 +204,8 @@ class TestExtensionFilterer(unittest.TestCase):
 		# Test stub filterers was constructed correctly
 		self.assertEqual(self.emptyExtensionFilterer.allowedExtensions, [])
 		self.assertEqual(self.extensionFilterer.allowedExtensions, ["py", "txt"])
+		self.assertTrue(self.extensionFilterer.caseSensitive)
+		self.assertFalse(self.compoundFilterer.caseSensitive)
 
 	def test_filter(self):
 		FILTERED_LISTING = [ 
@@ -149,4 +216,222 @@ class TestExtensionFilterer(unittest.TestCase):
 		# Test having no extensions allowed
 		self.assertEqual(self.emptyExtensionFilterer.filter(self.originalFileListing), [])
 		# Test having some extensions allowed
-		self.assertEqual(self.extensionFilterer.filter(self.originalFileListing), FILTERED_LISTING)
\ No newline at end of file
+		self.assertEqual(self.extensionFilterer.filter(self.originalFileListing), FILTERED_LISTING)
+
+	def test_iterFilter(self):
+		with self.assertRaises(TypeError):
+			self.extensionFilterer.iterFilter(543)
+		self.assertEqual(list(self.extensionFilterer.iterFilter( iter(self.originalFileListing) )),
+			self.extensionFilterer.filter(self.originalFileListing))
+
+	def test_accepts(self):
+		for filterer in (self.emptyExtensionFilterer, self.extensionFilterer):
+			self.assertEqual([ path for path in self.originalFileListing if filterer.accepts(path) ],
+				filterer.filter(self.originalFileListing))
+
+	def test_filterCompoundAndCase(self):
+		listing = [
+			# Stuff that should be allowed
+			"/backups/data.tar.gz", "/backups/DATA.TAR.GZ", "/backups/v1.2.tar.gz",
+			"photo.jpg", "/photos/photo.JPG", "/photos/.hidden.jpg",
+			# Stuff that shouldn't be allowed
+			"/backups/data.gz", "/backups/data.tar", "/backups/.tar.gz",
+			"/backups/tar.gz/file", "photo.jpeg", "jpg"
+		]
+		self.assertEqual(self.compoundFilterer.filter(listing), listing[:6])
+		# Test case sensitive filterer doesn't allow different cases
+		self.assertEqual(self.extensionFilterer.filter( ["a.py", "a.PY", "a.Txt"] ), ["a.py"])
+		# Test files without extensions are only allowed if "" is
+		self.assertEqual(ExtensionFilterer([""]).filter( ["README", "a.py", "b."] ),
+			["README", "b."])
+
+
+class TestSizeFilterer(TemporaryDirectoryMixin, unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.filenames = [ self.createFile("{}.txt".format(size), b"x" * size)
+			for size in (0, 10, 100) ]
+		self.fileListing = self.filenames + [ "non-existent.txt" ]
+
+	def test_construction(self):
+		with self.assertRaises(ValueError):
+			SizeFilterer(10, 5)
+		filterer = SizeFilterer(5, 10)
+		self.assertEqual( (filterer.minSize, filterer.maxSize), (5, 10) )
+		self.assertTrue(decidesPerFile(filterer))
+
+	def test_filter(self):
+		with self.assertRaises(TypeError):
+			SizeFilterer().filter(5)
+		self.assertEqual(SizeFilterer().filter(self.fileListing), self.filenames)
+		self.assertEqual(SizeFilterer(minSize=10).filter(self.fileListing), self.filenames[1:])
+		self.assertEqual(SizeFilterer(maxSize=10).filter(self.fileListing), self.filenames[:2])
+		self.assertEqual(SizeFilterer(1, 99).filter(self.fileListing), self.filenames[1:2])
+		self.assertEqual(list(SizeFilterer(minSize=1).iterFilter( iter(self.fileListing) )),
+			self.filenames[1:])
+
+	def test_acceptsInfo(self):
+		filterer = SizeFilterer(maxSize=50)
+		self.assertTrue(filterer.acceptsInfo( FileInfo(self.filenames[1]) ))
+		self.assertFalse(filterer.acceptsInfo( FileInfo(self.filenames[2]) ))
+		self.assertFalse(filterer.acceptsInfo( FileInfo("non-existent.txt") ))
+		# Test metadata already in the FileInfo is used
+		stat = os.stat(self.filenames[2])
+		self.assertTrue(filterer.acceptsInfo( FileInfo("non-existent.txt", stat=os.stat(self.filenames[0])) ))
+		self.assertFalse(filterer.acceptsInfo( FileInfo(self.filenames[0], stat=stat) ))
+
+class TestMTimeFilterer(TemporaryDirectoryMixin, unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.filenames = []
+		for mtime in (1000, 2000, 3000):
+			filename = self.createFile("{}.txt".format(mtime), b"mtime")
+			os.utime(filename, (mtime, mtime))
+			self.filenames.append(filename)
+		self.fileListing = self.filenames + [ "non-existent.txt" ]
+
+	def test_construction(self):
+		with self.assertRaises(ValueError):
+			MTimeFilterer(after=10, before=5)
+		with self.assertRaises(TypeError):
+			MTimeFilterer(after="yesterday")
+		with self.assertRaises(TypeError):
+			MTimeFilterer(before=True)
+		filterer = MTimeFilterer(after=datetime.datetime.fromtimestamp(1500))
+		self.assertEqual(filterer.after, 1500)
+		self.assertIsNone(filterer.before)
+
+	def test_filter(self):
+		with self.assertRaises(TypeError):
+			MTimeFilterer().filter(5)
+		self.assertEqual(MTimeFilterer().filter(self.fileListing), self.filenames)
+		self.assertEqual(MTimeFilterer(after=2000).filter(self.fileListing), self.filenames[1:])
+		self.assertEqual(MTimeFilterer(before=2000).filter(self.fileListing), self.filenames[:1])
+		self.assertEqual(MTimeFilterer(1500, 2500).filter(self.fileListing), self.filenames[1:2])
+		self.assertEqual(list(MTimeFilterer(after=1500).iterFilter( iter(self.fileListing) )),
+			self.filenames[1:])
+
+	def test_acceptsInfo(self):
+		filterer = MTimeFilterer(after=2500)
+		self.assertTrue(filterer.acceptsInfo( FileInfo(self.filenames[2]) ))
+		self.assertFalse(filterer.acceptsInfo( FileInfo(self.filenames[0]) ))
+		self.assertFalse(filterer.acceptsInfo( FileInfo("non-existent.txt") ))
+
+class MockPerFileFilterer(Filterer):
+
+	"""Rejects files containing a substring, recording every file it tests."""
+
+	def __init__(self, rejectSubstring, delay=0):
+		self.rejectSubstring = rejectSubstring
+		self.delay = delay
+		self.tested = []
+
+	def filter(self, fileListing):
+		return [ path for path in fileListing if self.accepts(path) ]
+
+	def accepts(self, path):
+		self.tested.append(path)
+		if self.delay:
+			time.sleep(self.delay)
+		return self.rejectSubstring not in path
+
+class MockWholeListFilterer:
+
+	"""Keeps only the first two files it's given, so can't decide per file."""
+
+	def filter(self, fileListing):
+		return list(fileListing)[:2]
+
+class TestFilterChain(unittest.TestCase):
+
+	def setUp(self):
+		self.fileListing = [ "a.py", "b.txt", "c.py", "d.bin", "e.py", "f.txt" ]
+
+	def test_construction(self):
+		with self.assertRaises(TypeError):
+			FilterChain(5)
+		filterers = [ ExtensionFilterer(["py"]), MockWholeListFilterer() ]
+		chain = FilterChain(filterers)
+		self.assertEqual(chain.filterers, filterers)
+		self.assertEqual([ stats.filterer for stats in chain.statistics ], filterers)
+		self.assertTrue(decidesPerFile(filterers[0]))
+		self.assertFalse(decidesPerFile(filterers[1]))
+		self.assertFalse(decidesPerFile(Filterer()))
+
+	def test_filter(self):
+		# Test empty chain allows everything
+		self.assertEqual(FilterChain([]).filter(self.fileListing), self.fileListing)
+		with self.assertRaises(TypeError):
+			FilterChain([]).filter(5)
+		# Test result is same as running filterers one after another
+		filterers = [ ExcludeListFilterer(["a*"]), ExtensionFilterer(["py", "txt"]),
+			MockWholeListFilterer(), IncludeListFilterer(["*.py"]) ]
+		expected = self.fileListing
+		for filterer in filterers:
+			expected = filterer.filter(expected)
+		chain = FilterChain(filterers, reorderInterval=1)
+		self.assertEqual(chain.filter(self.fileListing), expected)
+		self.assertEqual(list(chain.iterFilter( iter(self.fileListing) )), expected)
+		self.assertEqual([ path for path in self.fileListing
+			if FilterChain(filterers[:2]).accepts(path) ], [ "b.txt", "c.py", "e.py", "f.txt" ])
+
+	def test_prunes(self):
+		self.assertFalse(FilterChain([]).prunes("/src/.git"))
+		chain = FilterChain([ ExtensionFilterer(["py"]), MockWholeListFilterer(),
+			ExcludeListFilterer(["*/.git/*"]) ])
+		self.assertTrue(chain.prunes("/src/.git"))
+		self.assertFalse(chain.prunes("/src"))
+		self.assertFalse(Filterer().prunes("/src/.git"))
+
+	def test_iterFilterInfo(self):
+		with self.assertRaises(TypeError):
+			FilterChain([]).iterFilterInfo(5)
+		# Test result is the same as filtering paths
+		filterers = [ ExcludeListFilterer(["a*"]), ExtensionFilterer(["py", "txt"]),
+			MockWholeListFilterer(), IncludeListFilterer(["*.py"]) ]
+		expected = FilterChain(filterers).filter(self.fileListing)
+		infos = [ FileInfo(path) for path in self.fileListing ]
+		passed = list(FilterChain(filterers).iterFilterInfo( iter(infos) ))
+		self.assertEqual([ info.path for info in passed ], expected)
+		# Test the same FileInfo objects are passed on, even by
+		# filterers which don't decide per file
+		self.assertTrue( all(info in infos for info in passed) )
+		self.assertIs(passed[0], infos[2])
+		self.assertEqual([ info.path for info in infos
+			if FilterChain(filterers).acceptsInfo(info) ], [ "c.py", "e.py" ])
+		# Test filterers using metadata are given the FileInfo
+		stat = os.stat(".")
+		sizeInfo = FileInfo("non-existent.py", stat=stat)
+		chain = FilterChain([ ExtensionFilterer(["py"]), SizeFilterer(maxSize=stat.st_size) ])
+		self.assertEqual(list(chain.iterFilterInfo([ sizeInfo, FileInfo("other.py") ])), [ sizeInfo ])
+
+	def test_shortCircuit(self):
+		first = MockPerFileFilterer(".bin")
+		second = MockPerFileFilterer(".txt")
+		chain = FilterChain([ first, second ], reorderInterval=None)
+		self.assertEqual(chain.filter(self.fileListing), [ "a.py", "c.py", "e.py" ])
+		# Files rejected by the first filterer aren't tested by the second
+		self.assertEqual(first.tested, self.fileListing)
+		self.assertNotIn("d.bin", second.tested)
+		# Test statistics. Only some files are timed, so test enough
+		# files for at least one to be timed.
+		chain.filter(self.fileListing * 7)
+		firstStats, secondStats = chain.statistics
+		self.assertEqual( (firstStats.tested, firstStats.rejected, firstStats.passed), (48, 8, 40) )
+		self.assertEqual( (secondStats.tested, secondStats.rejected), (40, 16) )
+		self.assertAlmostEqual(secondStats.rejectRate, 0.4)
+		self.assertGreater(firstStats.seconds, 0)
+		self.assertGreater(firstStats.costPerFile, 0)
+
+	def test_reorder(self):
+		# Slow filterer which never rejects anything should be moved
+		# behind quick filterers which do
+		slow = MockPerFileFilterer("never matches", delay=0.001)
+		quick = MockPerFileFilterer(".txt")
+		chain = FilterChain([ slow, quick ], reorderInterval=2)
+		self.assertEqual(chain.filter(self.fileListing * 4), [ "a.py", "c.py", "d.bin", "e.py" ] * 4)
+		self.assertLess(len(slow.tested), len(quick.tested))
+		# Statistics should still be listed in the order filterers were given
+		self.assertEqual([ stats.filterer for stats in chain.statistics ], [ slow, quick ])
\ No newline at end of file
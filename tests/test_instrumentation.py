@@ -0,0 +1,130 @@
+import unittest
+import sys
+import os
+sys.path.append(os.environ.get("PROJECT_ROOT_DIRECTORY", "."))
+
+import json
+import shutil
+import tempfile
+from fileprocessor import FileProcessor, ExtractionError
+from fileprocessor.searchers import FileSearcher
+from fileprocessor.filterers import ExtensionFilterer, SizeFilterer
+from fileprocessor.caches import ExtractionCache
+from fileprocessor.instrumentation import *
+from helpers import TemporaryDirectoryMixin, MockLengthExtractor
+
+
+
+class MockFailingLengthExtractor(MockLengthExtractor):
+
+	def extractFromBytes(self, data):
+		if data == b"fail":
+			raise ValueError("Cannot extract")
+		return super().extractFromBytes(data)
+
+class MockRecordingInstrumentation(Instrumentation):
+
+	"""Records every hook call it receives."""
+
+	def __init__(self):
+		self.calls = []
+
+	def onFileStart(self, path):
+		self.calls.append( ("start", os.path.basename(path)) )
+
+	def onFileDone(self, path, data):
+		self.calls.append( ("done", os.path.basename(path), data) )
+
+	def onStageDone(self, stage):
+		self.calls.append( ("stage", stage.name) )
+
+	def onRunDone(self, statistics):
+		self.calls.append( ("run", statistics) )
+
+
+class TestInstrumentation(TemporaryDirectoryMixin, unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.createFile("a.txt", b"a" * 10)
+		self.createFile("b.txt", b"b" * 20)
+		self.createFile("c.txt", b"")
+		self.createFile("d.bin", b"d" * 40)
+		self.instrumentation = MockRecordingInstrumentation()
+
+	def createProcessor(self, **kwargs):
+		return FileProcessor(FileSearcher(), [ ExtensionFilterer([ "txt" ]), SizeFilterer(minSize=1) ],
+			MockFailingLengthExtractor(), instrumentation=self.instrumentation, **kwargs)
+
+	def test_disabled(self):
+		processor = FileProcessor(FileSearcher(), [], MockLengthExtractor())
+		self.assertEqual(len(processor.process(self.directory)), 4)
+		self.assertIsNone(processor.statistics)
+
+	def test_statistics(self):
+		processor = self.createProcessor()
+		results = processor.process([ self.directory, os.path.join(self.directory, "missing") ])
+		self.assertEqual(results, {
+			os.path.join(self.directory, "a.txt") : 10,
+			os.path.join(self.directory, "b.txt") : 20
+		})
+		statistics = processor.statistics
+		self.assertEqual([ stage.name for stage in statistics.stages ], [ "search", "filter", "extract" ])
+		self.assertEqual( (statistics.search.filesOut, statistics.search.errors), (4, 1) )
+		self.assertEqual( (statistics.filter.filesIn, statistics.filter.filesOut), (4, 2) )
+		self.assertEqual( (statistics.extract.filesIn, statistics.extract.filesOut), (2, 2) )
+		self.assertEqual(statistics.extract.bytes, 30)
+		self.assertEqual(statistics.extract.errors, 0)
+		self.assertIsNone(statistics.error)
+		for stage in statistics.stages:
+			self.assertGreaterEqual(stage.seconds, 0)
+		self.assertGreaterEqual(statistics.seconds, sum(stage.seconds for stage in statistics.stages))
+		# Test per-filterer statistics
+		self.assertEqual([ (type(stats.filterer), stats.tested, stats.rejected)
+			for stats in statistics.filterers ],
+			[ (ExtensionFilterer, 4, 1), (SizeFilterer, 3, 1) ])
+		# Test statistics can be serialised
+		serialised = json.loads( json.dumps(statistics.asDict()) )
+		self.assertEqual(serialised["stages"][2]["bytes"], 30)
+		self.assertEqual(serialised["filterers"][0]["filterer"], "ExtensionFilterer")
+
+	def test_hooks(self):
+		processor = self.createProcessor()
+		processor.process(self.directory)
+		calls = self.instrumentation.calls
+		self.assertEqual(calls[-1], ("run", processor.statistics))
+		self.assertEqual(calls[-4:-1], [ ("stage", "search"), ("stage", "filter"), ("stage", "extract") ])
+		fileCalls = sorted(calls[:-4])
+		self.assertEqual(fileCalls, [ ("done", "a.txt", 10), ("done", "b.txt", 20),
+			("start", "a.txt"), ("start", "b.txt") ])
+		# Each file is started before it's done
+		self.assertLess(calls.index( ("start", "a.txt") ), calls.index( ("done", "a.txt", 10) ))
+
+	def test_cache(self):
+		cacheFilename = os.path.join(tempfile.mkdtemp(), "cache.sqlite")
+		try:
+			with ExtractionCache(cacheFilename) as cache:
+				processor = self.createProcessor(cache=cache)
+				processor.process(self.directory)
+				self.assertEqual(processor.statistics.cacheHits, 0)
+				processor.process(self.directory)
+				self.assertEqual(processor.statistics.cacheHits, 2)
+		finally:
+			shutil.rmtree( os.path.dirname(cacheFilename) )
+
+	def test_errors(self):
+		self.createFile("e.txt", b"fail")
+		for executor in ("serial", "thread"):
+			processor = self.createProcessor(executor=executor)
+			with self.assertRaises( (ValueError, ExtractionError) ):
+				processor.process(self.directory)
+			statistics = processor.statistics
+			self.assertEqual( (statistics.search.errors, statistics.filter.errors,
+				statistics.extract.errors), (0, 0, 1) )
+			self.assertIsNotNone(statistics.error)
+			self.assertEqual(self.instrumentation.calls[-1], ("run", statistics))
+
+	def test_parallel(self):
+		processor = self.createProcessor(executor="process", workers=2)
+		self.assertEqual(len(processor.process(self.directory)), 2)
+		self.assertEqual(processor.statistics.extract.filesOut, 2)
@@ -0,0 +1,97 @@
+import unittest
+import sys
+import os
+sys.path.append(os.environ.get("PROJECT_ROOT_DIRECTORY", "."))
+
+import time
+import tracemalloc
+from fileprocessor import FileProcessor
+from fileprocessor.searchers import FileSearcher
+from fileprocessor.extractors import ByteExtractor
+from fileprocessor.profiling import *
+from helpers import TemporaryDirectoryMixin
+
+
+
+class MockCostlyExtractor(ByteExtractor):
+
+	"""Sleeps for a millisecond per byte and allocates a kilobyte per byte of each file."""
+
+	def extractFromBytes(self, data):
+		time.sleep(len(data) / 1000)
+		allocated = [ bytearray(1024) for i in range(len(data)) ]
+		return len(allocated)
+
+
+class TestProfiler(TemporaryDirectoryMixin, unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.paths = {}
+		for name, size in (("a.txt", 5), ("b.bin", 50), ("c.txt", 20), ("d", 1)):
+			self.paths[name] = self.createFile(name, b"x" * size)
+
+	def test_construction(self):
+		with self.assertRaises(ValueError):
+			Profiler(top=0)
+
+	def test_slowest(self):
+		profiler = Profiler(top=2)
+		processor = FileProcessor(FileSearcher(), [], MockCostlyExtractor(),
+			executor="thread", profiler=profiler)
+		self.assertEqual(processor.process(self.directory), {
+			self.paths["a.txt"] : 5,
+			self.paths["b.bin"] : 50,
+			self.paths["c.txt"] : 20,
+			self.paths["d"] : 1
+		})
+		self.assertEqual(profiler.files, 4)
+		slowest = profiler.slowest()
+		self.assertEqual([ profile.path for profile in slowest ],
+			[ self.paths["b.bin"], self.paths["c.txt"] ])
+		self.assertEqual( (slowest[0].size, slowest[0].extension), (50, ".bin") )
+		self.assertGreaterEqual(slowest[0].wallSeconds, 0.05)
+		self.assertGreaterEqual(slowest[0].wallSeconds, slowest[0].cpuSeconds)
+		self.assertIsNone(slowest[0].peakBytes)
+		self.assertEqual(profiler.slowest(1), slowest[:1])
+		# Memory wasn't traced
+		self.assertEqual(profiler.hungriest(), [])
+		self.assertFalse(tracemalloc.is_tracing())
+		self.assertIsNone(profiler.callStatistics())
+		# Test totals by extension
+		self.assertEqual(sorted(profiler.byExtension), [ "", ".bin", ".txt" ])
+		self.assertEqual(profiler.byExtension[".txt"][:2], [ 2, 25 ])
+
+	def test_traceMemory(self):
+		profiler = Profiler(top=3, traceMemory=True)
+		processor = FileProcessor(FileSearcher(), [], MockCostlyExtractor(), profiler=profiler)
+		processor.process(self.directory)
+		self.assertFalse(tracemalloc.is_tracing())
+		hungriest = profiler.hungriest()
+		self.assertEqual([ profile.path for profile in hungriest ],
+			[ self.paths["b.bin"], self.paths["c.txt"], self.paths["a.txt"] ])
+		self.assertGreaterEqual(hungriest[0].peakBytes, 50 * 1024)
+		report = profiler.report(2)
+		self.assertIn("Most memory-hungry files:", report)
+		self.assertIn(self.paths["b.bin"], report)
+		self.assertNotIn(self.paths["a.txt"], report)
+
+	def test_profileCalls(self):
+		profiler = Profiler(profileCalls=True)
+		processor = FileProcessor(FileSearcher(), [], MockCostlyExtractor(), profiler=profiler)
+		processor.process(self.directory)
+		statistics = profiler.callStatistics()
+		functions = [ function[2] for function in statistics.stats ]
+		self.assertIn("extractFromBytes", functions)
+		# Test profiles can be reset between runs
+		profiler.reset()
+		self.assertEqual( (profiler.files, profiler.slowest(), profiler.byExtension), (0, [], {}) )
+
+	def test_extractorErrors(self):
+		profiler = Profiler()
+		extractor = profiler.wrap(MockCostlyExtractor())
+		with self.assertRaises(FileNotFoundError):
+			extractor.extract( os.path.join(self.directory, "missing") )
+		# Failed calls are still profiled
+		self.assertEqual(profiler.files, 1)
+		self.assertIsNone(profiler.slowest()[0].size)
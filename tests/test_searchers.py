@@ -4,8 +4,12 @@ import os
 sys.path.append(os.environ.get("PROJECT_ROOT_DIRECTORY", "."))
 
 import shutil
+import threading
 
 from fileprocessor.searchers import *
+from fileprocessor.filterers import ExcludeListFilterer
+from fileprocessor.fileinfo import FileInfo
+from helpers import TemporaryDirectoryMixin
 
 
 
@@ -18,6 +22,57 @@ class MockSearcher(Searcher):
 		return self.filesToReturn
 
 
+class MockBarrierSearcher(Searcher):
+
+	"""Waits for the other searchers sharing its barrier, to test searchers run concurrently.
+
+	The barrier is broken if they don't all arrive within a few
+	seconds, in which case search() raises an error.
+
+	"""
+
+	def __init__(self, filesToReturn, barrier):
+		self.filesToReturn = filesToReturn
+		self.barrier = barrier
+
+	def search(self, rootDirectory):
+		self.barrier.wait()
+		return self.filesToReturn
+
+class MockBlockingSearcher(Searcher):
+
+	"""Doesn't return until released."""
+
+	def __init__(self):
+		self.release = threading.Event()
+		self.finished = threading.Event()
+
+	def search(self, rootDirectory):
+		self.release.wait(5)
+		self.finished.set()
+		return [ "blocked.txt" ]
+
+class MockFailingSearcher(Searcher):
+
+	"""Finds some files before raising an error."""
+
+	def iterSearch(self, rootDirectory):
+		yield "partial.txt"
+		raise IOError("Search failed")
+
+
+class MockPausingSearcher(Searcher):
+
+	"""Finds one file, then waits until released before finding another."""
+
+	def __init__(self):
+		self.release = threading.Event()
+
+	def iterSearch(self, rootDirectory):
+		yield "/a"
+		self.release.wait(5)
+		yield "/b"
+
 
 class TestFileSearcher(unittest.TestCase):
 
@@ -50,6 +105,8 @@ class TestFileSearcher(unittest.TestCase):
 		# Test flags for both searchers were set cotrrectly
 		self.assertTrue(self.recursiveSearcher.recurse)
 		self.assertFalse(self.nonRecursiveSearcher.recurse)
+		self.assertEqual(self.recursiveSearcher.walkers, 1)
+		self.assertFalse(self.recursiveSearcher.sort)
 
 	def test_search(self):
 		NONRECURSIVE_RESULT = [
@@ -74,6 +131,180 @@ class TestFileSearcher(unittest.TestCase):
 		# Test valid directory with a RECURSIVE search
 		self.assertEqual(self.recursiveSearcher.search(".test_dir"), RECURSIVE_RESULT)
 
+	def test_iterSearch(self):
+		# Test invalid arguments are reported straight away
+		with self.assertRaises(TypeError):
+			self.nonRecursiveSearcher.iterSearch(46435)
+		with self.assertRaises(IOError):
+			self.recursiveSearcher.iterSearch("04378485678576875876857738")
+		# Test results match those of search()
+		self.assertEqual(sorted(self.nonRecursiveSearcher.iterSearch(".test_dir")),
+			sorted(self.nonRecursiveSearcher.search(".test_dir")))
+		self.assertEqual(sorted(self.recursiveSearcher.iterSearch(".test_dir")),
+			sorted(self.recursiveSearcher.search(".test_dir")))
+		# Test files in the root directory are found before its sub-directories are listed
+		results = self.recursiveSearcher.iterSearch(".test_dir")
+		self.assertEqual(os.path.dirname(next(results)),
+			os.path.join(self.basePath, ".test_dir"))
+		# Test symbolic links to directories are not descended into
+		if hasattr(os, "symlink"):
+			os.symlink(os.path.abspath(".test_dir/sub_dir"), ".test_dir/link_dir")
+			self.assertEqual(len(list(self.recursiveSearcher.iterSearch(".test_dir"))), 4)
+
+	def test_parallelSearch(self):
+		with self.assertRaises(ValueError):
+			FileSearcher(recurse=True, walkers=0)
+		# Add enough directories to keep several walkers busy
+		for i in range(20):
+			directory = os.path.join(".test_dir", "sub_dir", "sub_dir3", "dir{}".format(i), "nested")
+			os.makedirs(directory)
+			with open(os.path.join(directory, "file.txt"), "w") as f:
+				f.write("TEST_FILE")
+		parallelSearcher = FileSearcher(recurse=True, walkers=4)
+		expected = sorted(self.recursiveSearcher.search(".test_dir"))
+		self.assertEqual(len(expected), 24)
+		self.assertEqual(sorted(parallelSearcher.search(".test_dir")), expected)
+		self.assertEqual(sorted(info.path for info in parallelSearcher.iterSearchInfo(".test_dir")), expected)
+		# Test sorting gives a deterministic order
+		self.assertEqual(FileSearcher(recurse=True, walkers=4, sort=True).search(".test_dir"), expected)
+		self.assertEqual(FileSearcher(recurse=True, sort=True).search(".test_dir"), expected)
+		# Test walkers stop if the search is abandoned
+		threadsBefore = threading.active_count()
+		results = parallelSearcher.iterSearch(".test_dir")
+		next(results)
+		results.close()
+		self.assertEqual(threading.active_count(), threadsBefore)
+
+	def test_pruners(self):
+		with self.assertRaises(TypeError):
+			FileSearcher(recurse=True, pruners=5)
+		excludeFilterer = ExcludeListFilterer([ "*/sub_dir2/*" ])
+		expected = [ path for path in self.recursiveSearcher.search(".test_dir")
+			if "sub_dir2" not in path ]
+		for walkers in (1, 4):
+			searcher = FileSearcher(recurse=True, walkers=walkers, pruners=[ excludeFilterer ])
+			self.assertEqual(searcher.pruners, [ excludeFilterer ])
+			self.assertEqual(sorted(searcher.search(".test_dir")), sorted(expected))
+		# Test pruned directories are never listed
+		listed = []
+		class MockRecordingSearcher(FileSearcher):
+			def _listDirectory(self, directory):
+				listed.append(directory)
+				return super()._listDirectory(directory)
+		MockRecordingSearcher(recurse=True, pruners=[ excludeFilterer ]).search(".test_dir")
+		self.assertEqual(len(listed), 3)
+		self.assertFalse( any("sub_dir2" in directory for directory in listed) )
+
+	def test_iterSearchInfo(self):
+		with self.assertRaises(TypeError):
+			self.nonRecursiveSearcher.iterSearchInfo(46435)
+		# Test results match those of iterSearch()
+		for searcher in (self.nonRecursiveSearcher, self.recursiveSearcher):
+			infos = list(searcher.iterSearchInfo(".test_dir"))
+			self.assertTrue( all(isinstance(info, FileInfo) for info in infos) )
+			self.assertEqual(sorted(info.path for info in infos),
+				sorted(searcher.iterSearch(".test_dir")))
+		# Test metadata is available
+		for info in infos:
+			self.assertEqual(info.size, os.path.getsize(info.path))
+
+
+class TestIndexedSearcher(TemporaryDirectoryMixin, unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.indexFilename = os.path.join(self.directory, "index.sqlite")
+		self.root = os.path.join(self.directory, "root")
+		for subdirectory in ("a", os.path.join("a", "b"), "c"):
+			os.makedirs(os.path.join(self.root, subdirectory))
+			self.createFile(os.path.join(subdirectory, "file.txt"))
+		self.createFile("top.txt")
+		self.age()
+		self.searcher = IndexedSearcher(self.indexFilename)
+
+	def tearDown(self):
+		self.searcher.close()
+		self.searcher = None
+		super().tearDown()
+
+	def createFile(self, name):
+		return super().createFile(os.path.join("root", name), b"TEST_FILE")
+
+	def age(self):
+		"""Make every changed directory look like it was last modified long ago."""
+		# Each call uses a later time, so changed directories still
+		# have a different modification time to last time
+		self.lastModified = getattr(self, "lastModified", 1000000) + 1000
+		for directory, subdirectories, files in os.walk(self.root):
+			if os.stat(directory).st_mtime > self.lastModified:
+				os.utime(directory, (self.lastModified, self.lastModified))
+
+	def walk(self):
+		return sorted(FileSearcher(recurse=True).search(self.root))
+
+	def test_construction(self):
+		self.assertTrue(self.searcher.recurse)
+		self.assertEqual(self.searcher.indexFilename, self.indexFilename)
+		self.assertEqual(len(self.searcher), 0)
+
+	def test_search(self):
+		# Test first search lists every directory
+		self.assertEqual(sorted(self.searcher.search(self.root)), self.walk())
+		self.assertEqual( (self.searcher.listed, self.searcher.reused), (4, 0) )
+		self.assertEqual(len(self.searcher), 4)
+		# Test unchanged directories come from the index
+		self.assertEqual(sorted(self.searcher.search(self.root)), self.walk())
+		self.assertEqual( (self.searcher.listed, self.searcher.reused), (4, 4) )
+		infos = list(self.searcher.iterSearchInfo(self.root))
+		self.assertEqual(sorted(info.path for info in infos), self.walk())
+		for info in infos:
+			self.assertEqual(info.inode, os.stat(info.path).st_ino)
+			self.assertEqual(info.size, 9)
+		# Test only changed directories are listed again
+		self.createFile( os.path.join("a", "new.txt") )
+		shutil.rmtree( os.path.join(self.root, "c") )
+		self.age()
+		self.assertEqual(sorted(self.searcher.search(self.root)), self.walk())
+		self.assertEqual(self.searcher.listed, 6)
+		# Test removed sub-directories are removed from the index
+		self.assertEqual(len(self.searcher), 3)
+		# Test the index persists
+		self.searcher.close()
+		self.searcher = IndexedSearcher(self.indexFilename)
+		self.assertEqual(sorted(self.searcher.search(self.root)), self.walk())
+		self.assertEqual( (self.searcher.listed, self.searcher.reused), (0, 3) )
+
+	def test_recentlyModified(self):
+		# Directories modified just before being listed are listed again
+		os.utime(self.root, None)
+		self.searcher.search(self.root)
+		self.searcher.search(self.root)
+		self.assertEqual( (self.searcher.listed, self.searcher.reused), (5, 3) )
+
+	def test_verify(self):
+		self.searcher.search(self.root)
+		self.assertEqual(self.searcher.verify(self.root), ([], []))
+		# Test changes the index can't see are reported
+		self.createFile( os.path.join("a", "new.txt") )
+		os.remove( os.path.join(self.root, "c", "file.txt") )
+		self.age()
+		self.assertEqual(self.searcher.verify(self.root),
+			([ os.path.join(self.root, "a", "new.txt") ], [ os.path.join(self.root, "c", "file.txt") ]))
+		# Test rebuilding the index brings it up to date
+		self.searcher.rebuild(self.root)
+		self.assertEqual(self.searcher.verify(self.root), ([], []))
+		self.searcher.rebuild()
+		self.assertEqual(len(self.searcher), 0)
+		self.assertEqual(self.searcher.verify(self.root)[0], self.walk())
+
+	def test_pruners(self):
+		searcher = IndexedSearcher(self.indexFilename, walkers=2,
+			pruners=[ ExcludeListFilterer(["*/a/*"]) ])
+		expected = [ os.path.join(self.root, "c", "file.txt"), os.path.join(self.root, "top.txt") ]
+		self.assertEqual(sorted(searcher.search(self.root)), expected)
+		self.assertEqual(sorted(searcher.search(self.root)), expected)
+		self.assertEqual(searcher.verify(self.root), ([], []))
+		searcher.close()
 
 class TestCompositeSearcher(unittest.TestCase):
 
@@ -106,4 +337,44 @@ class TestCompositeSearcher(unittest.TestCase):
 		self.assertEqual(self.compositeSearcher.search("something"), EXPECTED_RESULT)
 
 		# No need to test invalid type or if directory exists, the responsibilty
-		# for checking that value is up to the atomic searchers
\ No newline at end of file
+		# for checking that value is up to the atomic searchers
+
+	def test_iterSearch(self):
+		# Test each resource is only yielded once, and errors are ignored
+		self.atomicSearchers.append( MockSearcher(["README", "one.js", "new.txt"]) )
+		self.atomicSearchers.append( MockFailingSearcher() )
+		results = list(self.compositeSearcher.iterSearch("something"))
+		self.assertEqual(len(results), len(set(results)))
+		self.assertEqual(set(results), set( ["one.js", "hello.html", "something.bin",
+			"README", "new.txt", "partial.txt"] ))
+		# Test with no searchers
+		self.assertEqual(list(CompositeSearcher([]).iterSearch("something")), [])
+		self.assertEqual(CompositeSearcher([]).search("something"), set())
+
+	def test_concurrency(self):
+		# Each searcher waits for the others, so they only all finish
+		# if they're run at the same time
+		barrier = threading.Barrier(3, timeout=5)
+		searchers = [ MockBarrierSearcher(["a.txt"], barrier), MockBarrierSearcher(["b.txt"], barrier),
+			MockBarrierSearcher(["a.txt", "c.txt"], barrier) ]
+		compositeSearcher = CompositeSearcher(searchers)
+		self.assertEqual(compositeSearcher.search("something"), set(["a.txt", "b.txt", "c.txt"]))
+		barrier.reset()
+		self.assertEqual(set(compositeSearcher.iterSearch("something")), set(["a.txt", "b.txt", "c.txt"]))
+		# Test abandoning a streaming search doesn't wait for searchers
+		# which are still running
+		blockingSearcher = MockBlockingSearcher()
+		compositeSearcher = CompositeSearcher([ blockingSearcher, MockSearcher(["d.txt"]) ])
+		results = compositeSearcher.iterSearch("something")
+		self.assertEqual(next(results), "d.txt")
+		results.close()
+		self.assertFalse(blockingSearcher.finished.is_set())
+		blockingSearcher.release.set()
+		# Test paths are handed over as soon as they're found, even if
+		# the searcher takes a while to find the next one
+		pausingSearcher = MockPausingSearcher()
+		results = CompositeSearcher([ pausingSearcher ]).iterSearch("something")
+		self.assertEqual(next(results), "/a")
+		self.assertFalse(pausingSearcher.release.is_set())
+		pausingSearcher.release.set()
+		self.assertEqual(list(results), [ "/b" ])
@@ -0,0 +1,177 @@
+import unittest
+import sys
+import os
+sys.path.append(os.environ.get("PROJECT_ROOT_DIRECTORY", "."))
+
+import io
+import csv
+import json
+import time
+import shutil
+import tempfile
+from fileprocessor import FileProcessor
+from fileprocessor.searchers import FileSearcher
+from fileprocessor.filterers import ExtensionFilterer
+from fileprocessor.extractors import ByteExtractor
+from fileprocessor.sinks import *
+from helpers import TemporaryDirectoryMixin
+
+
+
+class MockSizeExtractor(ByteExtractor):
+
+	def extractFromBytes(self, data):
+		return { "size" : len(data), "first" : data[:1].decode("ascii") }
+
+
+class TestBufferedSinks(TemporaryDirectoryMixin, unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.filename = os.path.join(self.directory, "results")
+		self.results = [
+			("/data/one.txt", { "size" : 1, "first" : "a" }),
+			("/data/two, three.txt", { "size" : 2 }),
+			("/data/é.txt", { "size" : 3, "first" : "\"" })
+		]
+
+	def writeAll(self, sink):
+		with sink:
+			for path, data in self.results:
+				sink.write(path, data)
+		self.assertEqual(sink.written, 3)
+
+	def test_construction(self):
+		with self.assertRaises(ValueError):
+			JSONLinesSink(self.filename, batchSize=0)
+		with self.assertRaises(NotImplementedError):
+			BufferedSink(io.StringIO()).write("/data/one.txt", 1)
+
+	def test_batching(self):
+		stream = io.StringIO()
+		sink = JSONLinesSink(stream, batchSize=2, flushInterval=60)
+		sink.write(*self.results[0])
+		self.assertEqual(stream.getvalue(), "")
+		sink.write(*self.results[1])
+		self.assertEqual(len(stream.getvalue().splitlines()), 2)
+		sink.write(*self.results[2])
+		self.assertEqual(len(stream.getvalue().splitlines()), 2)
+		sink.close()
+		self.assertEqual(len(stream.getvalue().splitlines()), 3)
+		# File objects given to the sink are left open
+		self.assertFalse(stream.closed)
+
+	def test_flushInterval(self):
+		stream = io.StringIO()
+		sink = JSONLinesSink(stream, batchSize=100, flushInterval=0.05)
+		sink.write(*self.results[0])
+		self.assertEqual(stream.getvalue(), "")
+		time.sleep(0.06)
+		sink.write(*self.results[1])
+		self.assertEqual(len(stream.getvalue().splitlines()), 2)
+
+	def test_jsonLines(self):
+		self.writeAll( JSONLinesSink(self.filename, batchSize=2) )
+		with open(self.filename, "r", encoding="utf-8") as f:
+			records = [ json.loads(line) for line in f ]
+		self.assertEqual(records, [ { "path" : path, "data" : data } for path, data in self.results ])
+		# Test data JSON can't serialise
+		sink = JSONLinesSink(io.StringIO())
+		with self.assertRaises(TypeError):
+			sink.write("/data/one.txt", b"bytes")
+		sink = JSONLinesSink(io.StringIO(), default=repr)
+		sink.write("/data/one.txt", b"bytes")
+
+	def test_csv(self):
+		self.writeAll( CSVSink(self.filename, fields=[ "size", "first" ]) )
+		with open(self.filename, "r", encoding="utf-8", newline="") as f:
+			rows = list( csv.reader(f) )
+		self.assertEqual(rows, [
+			[ "path", "size", "first" ],
+			[ "/data/one.txt", "1", "a" ],
+			[ "/data/two, three.txt", "2", "" ],
+			[ "/data/é.txt", "3", "\"" ]
+		])
+		# Test writing data as a single column, without a header
+		stream = io.StringIO(newline="")
+		with CSVSink(stream, header=False) as sink:
+			sink.write("/data/one.txt", 42)
+		self.assertEqual(stream.getvalue(), "/data/one.txt,42\r\n")
+
+	def test_undecodablePaths(self):
+		badPath = os.fsdecode(b"/data/\xff.txt")
+		# JSON escapes the path, so the line is still valid JSON
+		with JSONLinesSink(self.filename) as sink:
+			sink.write(*self.results[0])
+			sink.write(badPath, 1)
+		with open(self.filename, "r", encoding="ascii") as f:
+			records = [ json.loads(line) for line in f ]
+		self.assertEqual([ record["path"] for record in records ], [ "/data/one.txt", badPath ])
+		# CSV files keep the path's original bytes
+		with CSVSink(self.filename) as sink:
+			sink.write(*self.results[0])
+			sink.write(badPath, 1)
+			# Strings which can't be encoded at all fail on their own,
+			# without losing the rest of the batch
+			with self.assertRaises(UnicodeEncodeError):
+				sink.write("/data/\ud800.txt", 2)
+			sink.write(*self.results[2])
+		with open(self.filename, "rb") as f:
+			self.assertIn(b"/data/\xff.txt,1", f.read())
+		with open(self.filename, "r", encoding="utf-8", errors="surrogateescape", newline="") as f:
+			rows = list( csv.reader(f) )
+		self.assertEqual([ row[0] for row in rows ], [ "path", "/data/one.txt", badPath, "/data/é.txt" ])
+
+	def test_closeAfterError(self):
+		sink = JSONLinesSink(self.filename)
+		sink.write(*self.results[0])
+		f = sink._file
+		def failingWritelines(lines):
+			raise OSError("Disk full")
+		f.writelines = failingWritelines
+		with self.assertRaises(OSError):
+			sink.close()
+		# The file is still closed, and closing again does nothing
+		self.assertTrue(f.closed)
+		sink.close()
+
+	def test_binary(self):
+		self.writeAll( BinarySink(self.filename, batchSize=1) )
+		self.assertEqual(list( readBinary(self.filename) ), self.results)
+		# Test incomplete results at the end of the file are ignored
+		with open(self.filename, "rb") as f:
+			contents = f.read()
+		self.assertEqual(list( readBinary(io.BytesIO(contents[:-1])) ), self.results[:2])
+		with self.assertRaises(ValueError):
+			list( readBinary(io.BytesIO(b"not a sink file")) )
+
+
+class TestProcessInto(TemporaryDirectoryMixin, unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.expected = {}
+		for name, contents in (("a.txt", b"abc"), ("b.txt", b"b"), ("c.bin", b"cc")):
+			path = self.createFile(name, contents)
+			self.expected[path] = { "size" : len(contents), "first" : contents[:1].decode("ascii") }
+		self.processor = FileProcessor(FileSearcher(), [ ExtensionFilterer([ "txt", "bin" ]) ],
+			MockSizeExtractor())
+
+	def test_processInto(self):
+		outputDirectory = tempfile.mkdtemp()
+		filename = os.path.join(outputDirectory, "results.bin")
+		try:
+			with BinarySink(filename) as sink:
+				self.assertEqual(self.processor.processInto(self.directory, sink), 3)
+				# Results are flushed, so they can be read before the sink is closed
+				self.assertEqual(dict( readBinary(filename) ), self.expected)
+		finally:
+			shutil.rmtree(outputDirectory)
+
+	def test_processIntoStream(self):
+		stream = io.StringIO()
+		sink = JSONLinesSink(stream)
+		self.assertEqual(self.processor.processInto(self.directory, sink), 3)
+		results = dict( (record["path"], record["data"])
+			for record in map(json.loads, stream.getvalue().splitlines()) )
+		self.assertEqual(results, self.expected)
@@ -0,0 +1,168 @@
+import unittest
+import sys
+import os
+sys.path.append(os.environ.get("PROJECT_ROOT_DIRECTORY", "."))
+
+import io
+import time
+import errno
+import contextlib
+import unittest.mock
+import threading
+from fileprocessor import FileProcessor
+from fileprocessor.searchers import FileSearcher
+from fileprocessor.filterers import ExcludeListFilterer
+from fileprocessor.watchers import *
+from helpers import TemporaryDirectoryMixin, MockLengthExtractor
+
+
+
+def pollUntil(watcher, expected, timeout = 5.0):
+	"""Poll watcher until all expected paths have been reported, returning every path reported."""
+	reported = set()
+	deadline = time.monotonic() + timeout
+	while not expected <= reported and time.monotonic() < deadline:
+		reported.update( watcher.poll(0.1) )
+	return reported
+
+
+class WatcherTests(TemporaryDirectoryMixin):
+
+	"""Tests shared by all watchers. Subclasses define createWatcher()."""
+
+	def setUp(self):
+		super().setUp()
+		os.mkdir( os.path.join(self.directory, "sub") )
+		os.mkdir( os.path.join(self.directory, "ignored") )
+		self.existing = self.createFile("existing.txt", b"old")
+
+	def test_createdAndModified(self):
+		with self.createWatcher(True) as watcher:
+			created = self.createFile("new.txt", b"new")
+			nested = self.createFile("sub/nested.txt", b"nested")
+			modified = self.createFile("existing.txt", b"modified")
+			reported = pollUntil(watcher, { created, nested, modified })
+			self.assertEqual(reported, { created, nested, modified })
+			# Nothing has changed since
+			self.assertEqual(pollUntil(watcher, { "never" }, 0.3), set())
+
+	def test_newDirectory(self):
+		with self.createWatcher(True) as watcher:
+			os.makedirs( os.path.join(self.directory, "made", "deeper") )
+			nested = self.createFile("made/deeper/file.txt", b"nested")
+			self.assertIn(nested, pollUntil(watcher, { nested }))
+
+	def test_noRecurse(self):
+		with self.createWatcher(False) as watcher:
+			created = self.createFile("new.txt", b"new")
+			self.createFile("sub/nested.txt", b"nested")
+			self.assertEqual(pollUntil(watcher, { created }, 1.0), { created })
+
+	def test_pruned(self):
+		pruner = ExcludeListFilterer([ os.path.join(self.directory, "ignored", "*") ])
+		with self.createWatcher(True, pruner) as watcher:
+			created = self.createFile("new.txt", b"new")
+			self.createFile("ignored/skipped.txt", b"skipped")
+			self.assertEqual(pollUntil(watcher, { created }, 1.0), { created })
+
+
+class TestPollingWatcher(WatcherTests, unittest.TestCase):
+
+	def createWatcher(self, recurse, pruner = None):
+		return PollingWatcher([ self.directory ], recurse, 0.05, pruner)
+
+@unittest.skipUnless(InotifyWatcher.available(), "inotify is not available")
+class TestInotifyWatcher(WatcherTests, unittest.TestCase):
+
+	def createWatcher(self, recurse, pruner = None):
+		return InotifyWatcher([ self.directory ], recurse, pruner)
+
+	def test_createWatcher(self):
+		with createWatcher([ self.directory ]) as watcher:
+			self.assertIsInstance(watcher, InotifyWatcher)
+		with createWatcher([ self.directory ], polling=True) as watcher:
+			self.assertIsInstance(watcher, PollingWatcher)
+
+	def test_watchErrors(self):
+		def failingWatch(watcher, directory):
+			raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC), directory)
+		# Running out of watches should fall back to polling
+		with unittest.mock.patch.object(InotifyWatcher, "_watch", failingWatch):
+			with self.assertRaises(OSError):
+				InotifyWatcher([ self.directory ])
+			with contextlib.redirect_stderr(io.StringIO()):
+				watcher = createWatcher([ self.directory ], pollInterval=0.05)
+		with watcher:
+			self.assertIsInstance(watcher, PollingWatcher)
+			created = self.createFile("new.txt", b"new")
+			self.assertIn(created, pollUntil(watcher, { created }))
+		# Sub-directories which vanish while being watched are skipped
+		watch = InotifyWatcher._watch
+		def vanishingWatch(watcher, directory):
+			if directory.endswith("sub"):
+				raise OSError(errno.ENOENT, os.strerror(errno.ENOENT), directory)
+			watch(watcher, directory)
+		with unittest.mock.patch.object(InotifyWatcher, "_watch", vanishingWatch):
+			with InotifyWatcher([ self.directory ]) as watcher:
+				self.assertNotIn(os.path.join(self.directory, "sub"), watcher._watches.values())
+				self.assertIn(self.directory, watcher._watches.values())
+
+
+class TestFileProcessorWatch(TemporaryDirectoryMixin, unittest.TestCase):
+
+	def setUp(self):
+		super().setUp()
+		self.existing = self.createFile("existing.txt", b"old")
+		self.createFile("skipped.log", b"skipped")
+		self.processor = FileProcessor(FileSearcher(True),
+			[ ExcludeListFilterer([ "*.log" ]) ], MockLengthExtractor())
+		self.results = []
+		self.stopEvent = threading.Event()
+
+	def tearDown(self):
+		self.stopEvent.set()
+		super().tearDown()
+
+	def startWatching(self, **kwargs):
+		thread = threading.Thread(target=self.processor.watch,
+			args=(self.directory, lambda path, data: self.results.append( (path, data) )),
+			kwargs=dict(stopEvent=self.stopEvent, pollInterval=0.05, **kwargs))
+		thread.start()
+		return thread
+
+	def waitForResults(self, count, timeout = 5.0):
+		deadline = time.monotonic() + timeout
+		while len(self.results) < count and time.monotonic() < deadline:
+			time.sleep(0.01)
+
+	def checkWatch(self, polling):
+		thread = self.startWatching(debounce=0.3, polling=polling)
+		self.waitForResults(1)
+		self.assertEqual(self.results, [ (self.existing, 3) ])
+		# Rapid rewrites should only be extracted once, with the final contents
+		for i in range(5):
+			created = self.createFile("new.txt", b"x" * (i + 1))
+			time.sleep(0.02)
+		self.createFile("another.log", b"filtered")
+		self.waitForResults(2)
+		time.sleep(0.5)
+		self.stopEvent.set()
+		thread.join(5)
+		self.assertFalse(thread.is_alive())
+		self.assertEqual(self.results, [ (self.existing, 3), (created, 5) ])
+
+	def test_watchPolling(self):
+		self.checkWatch(True)
+
+	@unittest.skipUnless(InotifyWatcher.available(), "inotify is not available")
+	def test_watchInotify(self):
+		self.checkWatch(False)
+
+	def test_noInitialPass(self):
+		thread = self.startWatching(debounce=0, initialPass=False)
+		time.sleep(0.2)
+		created = self.createFile("new.txt", b"new")
+		self.waitForResults(1)
+		self.stopEvent.set()
+		thread.join(5)
+		self.assertEqual(self.results, [ (created, 3) ])